@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+ansible进度跟踪基准测试：按固定速率回放一份记录的事件流，对比
+原来的轮询方式（每轮重新读取job_events目录下的所有事件文件）与事件回调方式（每个事件只处理一次）
+的CPU耗时、解析的事件数量与任务写库次数
+
+用法: python benchmark_ansible_progress.py [job_events_dir|synthetic] [events_per_second]
+  job_events_dir  ansible-runner的artifacts/<ident>/job_events目录
+  synthetic       生成合成的部署事件流（默认）
+任务的写库只计数，不写数据库
+"""
+
+import sys
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dingo_command.celery_api.ansible import AnsibleProgressTracker
+from dingo_command.celery_api.workers import deploy_stages
+from dingo_command.db.models.cluster.models import Taskinfo
+
+# 合成事件流的主机数量
+SYNTHETIC_HOSTS = 20
+# 合成事件流的task数量（包含部署的各阶段task）
+SYNTHETIC_TASKS = 200
+# 默认回放速率（事件/秒）
+DEFAULT_EVENTS_PER_SECOND = 1000
+
+
+def synthetic_events():
+    stage_names = [stage[0] for stage in deploy_stages]
+    # 阶段task均匀分布在playbook中
+    stage_positions = {(i + 1) * SYNTHETIC_TASKS // (len(stage_names) + 1): name for i, name in enumerate(stage_names)}
+    events = []
+    counter = 0
+    for task_index in range(SYNTHETIC_TASKS):
+        task_name = stage_positions.get(task_index, f"synthetic task {task_index}")
+        for host_index in range(SYNTHETIC_HOSTS):
+            for event_type in ("runner_on_start", "runner_on_ok"):
+                counter += 1
+                events.append({"uuid": f"event-{counter}", "counter": counter, "event": event_type,
+                               "stdout": f"ok: [node-{host_index}]",
+                               "event_data": {"task": task_name, "host": f"node-{host_index}",
+                                              "res": {"changed": False, "msg": "synthetic"}}})
+    return events
+
+
+def load_events(job_events_dir):
+    events = []
+    for file_name in os.listdir(job_events_dir):
+        if file_name.endswith(".json"):
+            with open(os.path.join(job_events_dir, file_name)) as f:
+                events.append(json.load(f))
+    return sorted(events, key=lambda event: event.get("counter", 0))
+
+
+def read_events(job_events_dir):
+    # 与ansible-runner的runner.events一致：每次都读取并解析目录下的所有事件文件
+    events = []
+    for file_name in sorted(os.listdir(job_events_dir), key=lambda name: int(name.split("-", 1)[0])):
+        with open(os.path.join(job_events_dir, file_name)) as f:
+            events.append(json.load(f))
+    return events
+
+
+def replay(events, job_events_dir, events_per_second, event_handler=None):
+    # 按速率回放事件：写入事件文件，并调用事件回调
+    interval = 1.0 / events_per_second
+    start = time.monotonic()
+    for index, event in enumerate(events):
+        delay = start + index * interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        with open(os.path.join(job_events_dir, f"{event['counter']}-{event['uuid']}.json"), "w") as f:
+            json.dump(event, f)
+        if event_handler:
+            event_handler(event)
+
+
+def start_replay(events, events_per_second, event_handler=None):
+    job_events_dir = tempfile.mkdtemp(prefix="job_events_")
+    thread = threading.Thread(target=replay, args=(events, job_events_dir, events_per_second, event_handler))
+    thread.start()
+    return thread, job_events_dir
+
+
+def run_polling(events, events_per_second):
+    # 原来的方式：runner结束前反复遍历runner.events（deploy_kubernetes中没有sleep），阶段变化时立即写库
+    stage_names = [stage[0] for stage in deploy_stages]
+    done = [False] * len(stage_names)
+    parsed = 0
+    writes = 0
+    thread, job_events_dir = start_replay(events, events_per_second)
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    while thread.is_alive():
+        for event in read_events(job_events_dir):
+            parsed += 1
+            if 'event_data' in event and 'task' in event['event_data']:
+                task_name = event['event_data'].get('task')
+                if task_name in stage_names and event['event_data'].get('host') is not None:
+                    index = stage_names.index(task_name)
+                    if not done[index]:
+                        done[index] = True
+                        # 更新当前阶段、写入下一阶段
+                        writes += 2
+    thread.join()
+    result = (time.perf_counter() - wall_start, time.process_time() - cpu_start, parsed, writes, writes)
+    shutil.rmtree(job_events_dir)
+    return result
+
+
+class ReplayTracker(AnsibleProgressTracker):
+    # 只统计写库次数与批次，不写数据库
+
+    def __init__(self, task_info, stages):
+        super().__init__(task_info, stages)
+        self.handled = 0
+        self.writes = 0
+        self.batches = 0
+
+    def handle_event(self, event):
+        self.handled += 1
+        super().handle_event(event)
+
+    def flush(self):
+        if self.pending:
+            self.writes += len(self.pending)
+            self.batches += 1
+            self.pending = []
+
+
+def run_tracker(events, events_per_second):
+    task_info = Taskinfo(id=1, task_id="benchmark", cluster_id="benchmark", state="progress")
+    tracker = ReplayTracker(task_info, deploy_stages)
+    thread, job_events_dir = start_replay(events, events_per_second, tracker.event_handler)
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    tracker.wait(thread)
+    thread.join()
+    result = (time.perf_counter() - wall_start, time.process_time() - cpu_start, tracker.handled, tracker.writes,
+              tracker.batches)
+    shutil.rmtree(job_events_dir)
+    return result
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else "synthetic"
+    events_per_second = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_EVENTS_PER_SECOND
+    events = synthetic_events() if source == "synthetic" else load_events(source)
+    print(f"replay {len(events)} events at {events_per_second} events/s")
+    print(f"{'mode':>8} | {'wall s':>7} | {'cpu s':>7} | {'events parsed':>13} | {'task writes':>11} | {'db batches':>10}")
+    for name, func in (("polling", run_polling), ("tracker", run_tracker)):
+        wall, cpu, parsed, writes, batches = func(events, events_per_second)
+        print(f"{name:>8} | {wall:>7.2f} | {cpu:>7.2f} | {parsed:>13} | {writes:>11} | {batches:>10}")
+
+
+if __name__ == "__main__":
+    main()
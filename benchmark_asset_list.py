@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+资产列表基准测试：对比逐行查询配件与批量查询配件时，不同分页大小下的耗时与SQL次数
+
+用法: python benchmark_asset_list.py [page_size ...]
+依赖 /etc/dingo-command/dingo-command.conf 中配置的数据库
+"""
+
+import sys
+import os
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+
+from dingo_command.db.engines.mysql import get_engine
+from dingo_command.services.assets import AssetsService
+
+# 默认测试的分页大小
+DEFAULT_PAGE_SIZES = [10, 50, 100, 200, 500]
+# 每个分页大小重复次数
+REPEAT = 3
+
+
+class QueryCounter:
+    """统计引擎上执行的SQL次数"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+class PerRowPartsAssetsService(AssetsService):
+    """还原逐行查询配件的旧实现，作为对照组"""
+
+    def list_assets_parts_by_asset_ids(self, asset_ids):
+        return {asset_id: self.list_assets_parts(asset_id) for asset_id in asset_ids}
+
+
+def run(service, page_size):
+    engine = get_engine()
+    elapsed = []
+    queries = 0
+    for _ in range(REPEAT):
+        with QueryCounter(engine) as counter:
+            start = time.perf_counter()
+            service.list_assets({}, 1, page_size, None, None)
+            elapsed.append(time.perf_counter() - start)
+        queries = counter.count
+    return min(elapsed) * 1000, queries
+
+
+def main():
+    page_sizes = [int(i) for i in sys.argv[1:]] or DEFAULT_PAGE_SIZES
+    print(f"{'page_size':>10} | {'per-row ms':>11} | {'per-row sql':>11} | {'batched ms':>11} | {'batched sql':>11}")
+    for page_size in page_sizes:
+        old_ms, old_queries = run(PerRowPartsAssetsService(), page_size)
+        new_ms, new_queries = run(AssetsService(), page_size)
+        print(f"{page_size:>10} | {old_ms:>11.1f} | {old_queries:>11} | {new_ms:>11.1f} | {new_queries:>11}")
+
+
+if __name__ == "__main__":
+    main()
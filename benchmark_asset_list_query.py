@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+资产列表查询基准测试：在合成数据集（默认10万资产）上对比
+OFFSET分页与游标分页在不同深度的耗时，以及extra生成列查询、配件查询、总数统计的耗时
+
+用法: python benchmark_asset_list_query.py [seed|run|cleanup] [asset_count]
+  seed     写入合成资产数据（资产大类为 BENCHMARK，便于清理）
+  run      执行查询基准测试（默认）
+  cleanup  删除合成资产数据
+依赖 /etc/dingo-command/dingo-command.conf 中配置的数据库，且数据库已升级到 0025
+"""
+
+import sys
+import os
+import time
+import json
+import uuid
+import random
+from datetime import datetime, timedelta
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dingo_command.db.engines.mysql import get_session
+from dingo_command.db.models.asset.models import AssetBasicInfo, AssetPartsInfo, AssetPositionsInfo
+from dingo_command.db.models.asset.sql import AssetSQL
+
+# 合成数据的资产大类
+BENCHMARK_CATEGORY = "BENCHMARK"
+# 默认合成资产数量
+DEFAULT_ASSET_COUNT = 100000
+# 每批写入数量
+SEED_BATCH_SIZE = 2000
+# 每页数量
+PAGE_SIZE = 20
+# 测试的页码深度
+PAGE_DEPTHS = [1, 50, 500, 2500]
+# 每项重复次数
+REPEAT = 3
+
+
+def seed(asset_count):
+    start_date = datetime(2024, 1, 1)
+    session = get_session()
+    for batch_start in range(0, asset_count, SEED_BATCH_SIZE):
+        basic, positions, parts = [], [], []
+        for i in range(batch_start, min(batch_start + SEED_BATCH_SIZE, asset_count)):
+            asset_id = uuid.uuid4().hex
+            basic.append({"id": asset_id, "asset_category": BENCHMARK_CATEGORY, "asset_type": "SERVER_GPU", "name": f"bench-{i}",
+                          "asset_number": f"BENCH{i:08d}", "sn_number": f"SN{i:08d}", "asset_status": "online",
+                          "create_date": start_date + timedelta(seconds=i),
+                          "extra": json.dumps({"host_name": f"bench-host-{i}", "ip": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+                                               "idrac": f"192.168.{i // 256 % 256}.{i % 256}", "use_to": random.choice(["train", "infer", "storage"]),
+                                               "operate_system": random.choice(["ubuntu22.04", "centos7", "rocky9"])})})
+            positions.append({"id": uuid.uuid4().hex, "asset_id": asset_id, "frame_position": f"F{i % 20}",
+                              "cabinet_position": f"C{i % 400}", "u_position": str(i % 42)})
+            parts.append({"id": uuid.uuid4().hex, "asset_id": asset_id, "part_type": "gpu", "part_config": random.choice(["A100*8", "H100*8", "L40S*4"])})
+            parts.append({"id": uuid.uuid4().hex, "asset_id": asset_id, "part_type": "memory", "part_config": random.choice(["512G", "1T", "2T"])})
+        with session.begin():
+            session.bulk_insert_mappings(AssetBasicInfo, basic)
+            session.bulk_insert_mappings(AssetPositionsInfo, positions)
+            session.bulk_insert_mappings(AssetPartsInfo, parts)
+        print(f"seeded {min(batch_start + SEED_BATCH_SIZE, asset_count)}/{asset_count}")
+
+
+def cleanup():
+    session = get_session()
+    with session.begin():
+        asset_ids = session.query(AssetBasicInfo.id).filter(AssetBasicInfo.asset_category == BENCHMARK_CATEGORY)
+        session.query(AssetPartsInfo).filter(AssetPartsInfo.asset_id.in_(asset_ids)).delete(synchronize_session=False)
+        session.query(AssetPositionsInfo).filter(AssetPositionsInfo.asset_id.in_(asset_ids)).delete(synchronize_session=False)
+        count = session.query(AssetBasicInfo).filter(AssetBasicInfo.asset_category == BENCHMARK_CATEGORY).delete(synchronize_session=False)
+    print(f"deleted {count} benchmark assets")
+
+
+def timed(func):
+    elapsed = []
+    result = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func()
+        elapsed.append(time.perf_counter() - start)
+    return min(elapsed) * 1000, result
+
+
+def keyset_page(query_params, depth):
+    # 游标分页需要逐页前进，只计最后一页的耗时
+    cursor = None
+    for _ in range(depth - 1):
+        _, _, cursor = AssetSQL.list_asset_by_cursor(query_params, PAGE_SIZE, cursor)
+    return timed(lambda: AssetSQL.list_asset_by_cursor(query_params, PAGE_SIZE, cursor))[0]
+
+
+def run():
+    query_params = {"asset_category": BENCHMARK_CATEGORY}
+    print(f"{'page':>6} | {'offset ms':>10} | {'keyset ms':>10}")
+    for depth in PAGE_DEPTHS:
+        offset_ms, _ = timed(lambda: AssetSQL.list_asset(query_params, depth, PAGE_SIZE))
+        print(f"{depth:>6} | {offset_ms:>10.1f} | {keyset_page(query_params, depth):>10.1f}")
+
+    print()
+    print(f"{'filter':>24} | {'count ms':>9} | {'page ms':>8} | {'total':>7}")
+    filters = [{}, {"host_name": "bench-host-4242"}, {"ip": "10.1."}, {"operate_system": "rocky"},
+               {"asset_part_gpu": "H100"}, {"frame_position": "F3"}]
+    for extra_params in filters:
+        params = dict(query_params, **extra_params)
+        count_ms, total = timed(lambda: AssetSQL.count_asset(params))
+        page_ms, _ = timed(lambda: AssetSQL.list_asset(params, 1, PAGE_SIZE))
+        name = ",".join(extra_params) or "none"
+        print(f"{name:>24} | {count_ms:>9.1f} | {page_ms:>8.1f} | {total:>7}")
+
+
+def main():
+    action = sys.argv[1] if len(sys.argv) > 1 else "run"
+    if action == "seed":
+        seed(int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_ASSET_COUNT)
+    elif action == "cleanup":
+        cleanup()
+    else:
+        run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+外部消息消费基准测试：使用内存中的broker替身投递消息，对比逐条消费（自动确认、逐条写库）
+与批量消费（预取、攒批写库、提交后批量确认）的吞吐量
+
+用法: python benchmark_message_consumer.py [message_count] [batch_size ...]
+依赖 /etc/dingo-command/dingo-command.conf 中配置的数据库，测试消息写入后会被删除
+"""
+
+import sys
+import os
+import time
+import json
+from collections import deque
+from types import SimpleNamespace
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dingo_command.db.engines.mysql import get_session
+from dingo_command.db.models.message.models import ExternalMessage
+from dingo_command.services.message import MessageService
+from dingo_command.services.rabbitmqconfig import BatchedQueueConsumer
+
+# 测试消息的类型，便于清理
+BENCHMARK_MESSAGE_TYPE = "Benchmark_Message"
+# 默认消息数量
+DEFAULT_MESSAGE_COUNT = 5000
+# 默认测试的批次大小
+DEFAULT_BATCH_SIZES = [50, 200, 500]
+# 批量消费的预取数量
+PREFETCH_COUNT = 1000
+# 攒批的最长等待时间（毫秒）
+FLUSH_INTERVAL_MS = 200
+
+
+class StandInChannel:
+    """内存中的broker替身：按预取数量投递消息，支持单条/批量确认与重新入队"""
+
+    def __init__(self, bodies):
+        self.pending = deque(enumerate(bodies, 1))
+        self.prefetch_count = 0
+        self.callback = None
+        self.auto_ack = True
+        self.unacked = {}
+        self.acked = 0
+        self.connection = self
+
+    def basic_qos(self, prefetch_count):
+        self.prefetch_count = prefetch_count
+
+    def basic_consume(self, queue, on_message_callback, auto_ack):
+        self.callback = on_message_callback
+        self.auto_ack = auto_ack
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        tags = [tag for tag in self.unacked if tag <= delivery_tag] if multiple else [delivery_tag]
+        for tag in tags:
+            self.unacked.pop(tag)
+        self.acked += len(tags)
+
+    def basic_nack(self, delivery_tag, multiple=False, requeue=True):
+        tags = sorted(tag for tag in self.unacked if tag <= delivery_tag) if multiple else [delivery_tag]
+        for tag in reversed(tags):
+            body = self.unacked.pop(tag)
+            if requeue:
+                self.pending.appendleft((tag, body))
+
+    def process_data_events(self, time_limit=None):
+        # 投递所有可投递的消息（未确认的消息数不超过预取数量）
+        while self.pending and (self.auto_ack or len(self.unacked) < self.prefetch_count):
+            tag, body = self.pending.popleft()
+            if self.auto_ack:
+                self.acked += 1
+            else:
+                self.unacked[tag] = body
+            self.callback(self, SimpleNamespace(delivery_tag=tag), None, body)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+def create_bodies(message_count):
+    return [json.dumps({"region": "RegionBench", "az": "az1", "message_type": BENCHMARK_MESSAGE_TYPE,
+                        "message_data": {"index": i, "value": i * 1.5, "name": f"bench-{i}"}}).encode()
+            for i in range(message_count)]
+
+
+def cleanup():
+    session = get_session()
+    with session.begin():
+        session.query(ExternalMessage).filter(ExternalMessage.message_type == BENCHMARK_MESSAGE_TYPE).delete()
+
+
+def run_per_message(message_count):
+    channel = StandInChannel(create_bodies(message_count))
+    channel.basic_consume(queue="benchmark", on_message_callback=MessageService().callback, auto_ack=True)
+    start = time.perf_counter()
+    channel.process_data_events()
+    elapsed = time.perf_counter() - start
+    cleanup()
+    return elapsed
+
+
+def run_batched(message_count, batch_size):
+    channel = StandInChannel(create_bodies(message_count))
+    consumer = BatchedQueueConsumer(channel, "benchmark", MessageService().batch_callback, batch_size, FLUSH_INTERVAL_MS)
+    consumer.start(PREFETCH_COUNT)
+    start = time.perf_counter()
+    while channel.acked < message_count:
+        consumer.poll()
+    elapsed = time.perf_counter() - start
+    cleanup()
+    return elapsed
+
+
+def main():
+    message_count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_MESSAGE_COUNT
+    batch_sizes = [int(i) for i in sys.argv[2:]] or DEFAULT_BATCH_SIZES
+    print(f"{'mode':>16} | {'seconds':>8} | {'msg/s':>9}")
+    elapsed = run_per_message(message_count)
+    print(f"{'per-message':>16} | {elapsed:>8.2f} | {message_count / elapsed:>9.0f}")
+    for batch_size in batch_sizes:
+        elapsed = run_batched(message_count, batch_size)
+        print(f"{'batch ' + str(batch_size):>16} | {elapsed:>8.2f} | {message_count / elapsed:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
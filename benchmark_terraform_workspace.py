@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+terraform工作目录基准测试：对比原来的方式（复制模板目录后冷启动terraform init，provider逐个目录安装）
+与工作目录管理（共享provider缓存、预先init的模板、锁文件不变时跳过init）创建集群工作目录的耗时与磁盘占用
+
+用法: python benchmark_terraform_workspace.py [workspace_count]
+依赖terraform命令与配置的provider文件系统镜像（terraform_provider_mirror），所有目录都在临时目录中创建
+"""
+
+import sys
+import os
+import time
+import shutil
+import tempfile
+import subprocess
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dingo_command.celery_api import CONF
+from dingo_command.celery_api.workspace import TerraformWorkspace, MIRROR_INCLUDE
+
+# 集群terraform模板目录，与workers.TERRAFORM_DIR相同；不导入workers，避免连接celery的broker
+TERRAFORM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dingo_command", "templates", "terraform")
+# 默认创建的工作目录数量
+DEFAULT_WORKSPACE_COUNT = 5
+# provider文件系统镜像
+PROVIDER_MIRROR = CONF.DEFAULT.terraform_provider_mirror or "/var/lib/dingo-command/terraform-cache"
+
+
+def dir_size(path):
+    # 目录占用的磁盘大小，不跟随软链接
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for file_name in files:
+            file_path = os.path.join(root, file_name)
+            if not os.path.islink(file_path):
+                total += os.path.getsize(file_path)
+    return total
+
+
+def cold_cli_config(work_dir):
+    # 不使用provider缓存，每个工作目录从镜像安装provider
+    config_file = os.path.join(work_dir, "cold.terraformrc")
+    with open(config_file, "w") as f:
+        f.write('disable_checkpoint = true\n'
+                'provider_installation {\n'
+                '  filesystem_mirror {\n'
+                f'    path    = "{PROVIDER_MIRROR}"\n'
+                f'    include = ["{MIRROR_INCLUDE}"]\n'
+                '  }\n'
+                '  direct {\n'
+                f'    exclude = ["{MIRROR_INCLUDE}"]\n'
+                '  }\n'
+                '}\n')
+    return config_file
+
+
+def run_cold(work_dir, workspace_count):
+    env = os.environ.copy()
+    env["TF_CLI_CONFIG_FILE"] = cold_cli_config(work_dir)
+    env.pop("TF_PLUGIN_CACHE_DIR", None)
+    elapsed = []
+    for i in range(workspace_count):
+        cluster_dir = os.path.join(work_dir, "cold", f"cluster-{i}")
+        os.makedirs(cluster_dir)
+        start = time.perf_counter()
+        subprocess.run(["cp", "-r", TERRAFORM_DIR, cluster_dir], capture_output=True)
+        res = subprocess.run(["terraform", "init", "-input=false"], cwd=os.path.join(cluster_dir, "terraform"),
+                             env=env, capture_output=True, text=True)
+        if res.returncode != 0:
+            raise Exception(f"Terraform init error: {res.stderr}")
+        elapsed.append(time.perf_counter() - start)
+    return elapsed, dir_size(os.path.join(work_dir, "cold"))
+
+
+def run_cached(work_dir, workspace_count):
+    workspace = TerraformWorkspace(TERRAFORM_DIR, os.path.join(work_dir, "terraform-workspace"),
+                                   os.path.join(work_dir, "plugin-cache"), PROVIDER_MIRROR)
+    elapsed = []
+    for i in range(workspace_count):
+        cluster_dir = os.path.join(work_dir, "cached", f"cluster-{i}")
+        os.makedirs(cluster_dir)
+        start = time.perf_counter()
+        workspace.prepare(cluster_dir)
+        res = workspace.init(cluster_dir)
+        if res.returncode != 0:
+            raise Exception(f"Terraform init error: {res.stderr}")
+        elapsed.append(time.perf_counter() - start)
+    # 模板与共享缓存只占用一份
+    shared = dir_size(os.path.join(work_dir, "terraform-workspace")) + dir_size(os.path.join(work_dir, "plugin-cache"))
+    return elapsed, dir_size(os.path.join(work_dir, "cached")) + shared
+
+
+def check_environment():
+    # 基准测试需要真实的terraform与provider镜像，缺少时直接退出
+    if not shutil.which("terraform"):
+        sys.exit("terraform command not found, install terraform >= 1.3.0 first")
+    if not os.path.isdir(os.path.join(PROVIDER_MIRROR, "dingo.com")):
+        sys.exit(f"provider mirror {PROVIDER_MIRROR} has no dingo.com providers, set terraform_provider_mirror")
+    version = subprocess.run(["terraform", "version"], capture_output=True, text=True).stdout.splitlines()
+    print(version[0] if version else "terraform version unknown")
+
+
+def main():
+    workspace_count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_WORKSPACE_COUNT
+    check_environment()
+    work_dir = tempfile.mkdtemp(prefix="terraform_workspace_")
+    try:
+        print(f"create {workspace_count} cluster workspaces, provider mirror: {PROVIDER_MIRROR}")
+        print(f"{'mode':>8} | {'first s':>8} | {'avg rest s':>10} | {'total s':>8} | {'disk MB':>8}")
+        for name, func in (("cold", run_cold), ("cached", run_cached)):
+            elapsed, size = func(work_dir, workspace_count)
+            rest = elapsed[1:] or elapsed
+            print(f"{name:>8} | {elapsed[0]:>8.2f} | {sum(rest) / len(rest):>10.2f} | {sum(elapsed):>8.2f} | "
+                  f"{size / 1024 / 1024:>8.1f}")
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,8 @@ from dingo_command.api.model.assets import AssetCreateApiModel, AssetManufacture
     AssetPartApiModel, AssetTypeApiModel, AssetFlowApiModel, AssetBatchDownloadApiModel, AssetBatchUpdateApiModel, \
     AssetExtendColumnApiModel
 from dingo_command.api.model.system import OperateLogApiModel
+from dingo_command.services.asset_export import AssetStreamingExporter
+from dingo_command.services.asset_import import AssetBulkImporter
 from dingo_command.services.assets import AssetsService
 from dingo_command.services.custom_exception import Fail
 from dingo_command.services.system import SystemService
@@ -232,11 +234,34 @@ async def update_asset_type_by_id(id:str, asset_type:AssetTypeApiModel):
 
 # 以下是资产的类型相关的接口 end
 
+def stream_assets_xlsx(asset_type: str, asset_ids: Optional[str] = None):
+    # 流式导出资产文件，分块返回，不支持流式导出的类型返回None
+    result_file_name = "asset_" + format_d8q_timestamp() + ".xlsx"
+    result_file_path = EXCEL_TEMP_DIR + result_file_name
+    try:
+        if not AssetStreamingExporter().export(asset_type, result_file_path, asset_ids):
+            return None
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        file_utils.cleanup_temp_file(result_file_path)
+        raise HTTPException(status_code=400, detail="asset export error")
+    headers = {
+        'Content-Disposition': f'attachment; filename="{result_file_name}"'
+    }
+    return StreamingResponse(file_utils.iter_file_chunks(result_file_path), headers=headers,
+                             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
 @router.get("/assets/download/batch", summary="批量下载资产信息", description="根据不同类型下载对应的资产文件")
-async def download_assets_xlsx(asset_type: str, asset_ids: str):
+async def download_assets_xlsx(asset_type: str, asset_ids: str, stream: bool = False):
     # 类型是空
     if asset_type is None or len(asset_type) <= 0:
         return None
+    # 流式导出
+    if stream:
+        response = stream_assets_xlsx(asset_type, asset_ids)
+        if response:
+            return response
     # 把数据库中的资产数据导出资产信息数据
     result_file_name = "asset_" + format_d8q_timestamp() + ".xlsx"
     # 导出文件路径
@@ -262,10 +287,15 @@ async def download_assets_xlsx(asset_type: str, asset_ids: str):
     return {"error": "File not found"}
 
 @router.get("/assets/download", summary="下载资产信息", description="根据不同类型下载对应的资产文件")
-async def download_assets_xlsx(asset_type: str, asset_id: Optional[str]=None):
+async def download_assets_xlsx(asset_type: str, asset_id: Optional[str]=None, stream: bool = False):
     # 类型是空
     if asset_type is None or len(asset_type) <= 0:
         return None
+    # 流式导出
+    if stream:
+        response = stream_assets_xlsx(asset_type)
+        if response:
+            return response
     # 把数据库中的资产数据导出资产信息数据
     result_file_name = "asset_" + format_d8q_timestamp() + ".xlsx"
     # 导出文件路径
@@ -290,7 +320,12 @@ async def download_assets_xlsx(asset_type: str, asset_id: Optional[str]=None):
     return {"error": "File not found"}
 
 @router.post("/assets/download", summary="批量下载指定资产信息", description="根据选择好的数据下载对应的资产文件")
-async def download_assets_xlsx_4select(item:AssetBatchDownloadApiModel):
+async def download_assets_xlsx_4select(item:AssetBatchDownloadApiModel, stream: bool = False):
+    # 流式导出
+    if stream and item is not None and item.asset_type and item.asset_ids:
+        response = stream_assets_xlsx(item.asset_type, item.asset_ids)
+        if response:
+            return response
     # 把选中的id的字符串数据库中的资产数据导出资产信息数据
     result_file_name = "asset_" + format_d8q_timestamp() + ".xlsx"
     # 导出文件路径
@@ -370,7 +405,9 @@ async def list_assets(
         page: int = Query(1, description="页码"),
         page_size: int = Query(10, description="页数量大小"),
         sort_keys:str = Query(None, description="排序字段"),
-        sort_dirs:str = Query(None, description="排序方式"),):
+        sort_dirs:str = Query(None, description="排序方式"),
+        keyset: bool = Query(False, description="是否游标分页（按创建时间倒序，忽略page与排序参数）"),
+        cursor: str = Query(None, description="游标分页的游标，取上一页返回的nextCursor，首页为空"),):
     # 接收查询参数
     # 返回数据接口
     try:
@@ -450,7 +487,7 @@ async def list_assets(
         if asset_relation_resource_flag is not None:
             query_params['asset_relation_resource_flag'] = asset_relation_resource_flag
         # 查询成功
-        result = assert_service.list_assets(query_params, page, page_size, sort_keys, sort_dirs)
+        result = assert_service.list_assets(query_params, page, page_size, sort_keys, sort_dirs, keyset, cursor)
         return result
     except Exception as e:
         raise HTTPException(status_code=400, detail="asset not found")
@@ -588,50 +625,20 @@ async def upload_asset_xlsx(asset_type: str, file: UploadFile = File(...)):
         buffer = BytesIO(contents)
         # 服务器类型
         if asset_type == "server":
-            # 1、资产设备sheet
-            df = pandas.read_excel(buffer, sheet_name=ASSET_TEMPLATE_ASSET_SHEET)
-            # 遍历
-            # 定义错误行号
-            server_error_index = []
-            for index, row in df.iterrows():
-                # 存入一行
-                try:
-                    assert_service.import_asset(row)
-                except Exception as e:
-                    error_index = index + 2
-                    LOG.error(f"import server failed, error row number:{error_index}" )
-                    server_error_index.append(error_index)
+            # 资产设备与配件sheet批量导入
+            result = AssetBulkImporter().import_server_workbook(buffer)
+            LOG.info(f"import server result: {result.to_dict()}")
+            server_error_index = result.error_rows(ASSET_TEMPLATE_ASSET_SHEET)
             if server_error_index:
                 raise Fail("import server data error", error_message=f"导入服务器失败, sheet[asset]页错误行号:{server_error_index}")
-            # 2、资产设备sheet
-            df = pandas.read_excel(buffer, sheet_name=ASSET_TEMPLATE_PART_SHEET, dtype={'资产编号': str},)
-            # 遍历
-            # 定义错误行号
-            server_part_error_index = []
-            for index, row in df.iterrows():
-                # 存入一行
-                try:
-                    assert_service.import_asset_part(row)
-                except Exception as e:
-                    error_index = index + 2
-                    LOG.error(f"import server part failed, error row number:{error_index}" )
-                    server_part_error_index.append(error_index)
+            server_part_error_index = result.error_rows(ASSET_TEMPLATE_PART_SHEET)
             if server_part_error_index:
                 raise Fail("import server part data error", error_message=f"导入服务器失败, sheet[part]页错误行号:{server_part_error_index}")
         elif asset_type == "network":
-            # 1、网络设备sheet
-            df = pandas.read_excel(buffer, sheet_name=ASSET_TEMPLATE_NETWORK_SHEET)
-            # 遍历
-            # 定义错误行号
-            network_error_index = []
-            for index, row in df.iterrows():
-                # 存入一行
-                try:
-                    assert_service.import_asset_network(row)
-                except Exception as e:
-                    error_index = index + 2
-                    LOG.error(f"import network failed, error row number:{error_index}" )
-                    network_error_index.append(error_index)
+            # 网络设备sheet批量导入
+            result = AssetBulkImporter().import_network_workbook(buffer)
+            LOG.info(f"import network result: {result.to_dict()}")
+            network_error_index = result.error_rows(ASSET_TEMPLATE_NETWORK_SHEET)
             if network_error_index:
                 raise Fail("import network data error", error_message=f"导入网络设备失败, sheet[network]页错误行号:{network_error_index}")
         elif asset_type == "network_flow":
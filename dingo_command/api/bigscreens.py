@@ -11,6 +11,11 @@ async def get_bigscreen_metrics(name: str, region: str = None):
     return BigScreensService.get_bigscreen_metrics(name, region)
 
 
+@router.get("/bigscreen/metrics/batch", summary="批量获取大屏指标数据", description="names: 多个指标名称以逗号分隔")
+async def get_bigscreen_metrics_batch(names: str, region: str = None):
+    return BigScreensService.get_bigscreen_metrics_batch([name for name in names.split(',') if name], region)
+
+
 @router.get("/bigscreen/metrics_configs", summary="获取大屏指标配置信息")
 # TODO: name 可选参数做筛选
 async def list_bigscreen_metrics_configs():
@@ -219,7 +219,7 @@ async def sync_repo(repo_id: Union[str, int], background_tasks: BackgroundTasks)
         if not data.get("data"):
             raise ValueError("repo not found")
         repo_data = data.get("data")
-        # 先删除原来的repo的charts应用
+        # 获取原来的repo的charts应用
         data = chart_service.get_repo_from_name(repo_id)
         repo = data.get("data")[0]
         if repo.status == util.repo_status_create:
@@ -228,9 +228,7 @@ async def sync_repo(repo_id: Union[str, int], background_tasks: BackgroundTasks)
             raise ValueError("repo is updating, please wait")
         if repo.status == util.repo_status_sync:
             raise ValueError("repo is syncing, please wait")
-        if data.get("data"):
-            chart_service.delete_charts_repo_id(data.get("data"))
-        # 再添加新的repo的charts应用
+        # 增量同步repo的charts应用，不需要先删除原来的charts应用
         repo_data_info = CreateRepoObject(
             id=repo_id,
             name=repo_data.name,
@@ -8,7 +8,7 @@ from kubernetes.dynamic import DynamicClient
 from pydantic import BaseModel
 # from models import K8sResourceQueryParams #, PodResponse, DeploymentResponse, GenericResourceResponse
 from dingo_command.common import k8s_client
-from dingo_command.common.k8s_client import K8sClient  # Adjust the import path as needed
+from dingo_command.common.k8s_client import K8sClient, k8s_client_cache  # Adjust the import path as needed
 from dingo_command.services.cluster import ClusterService
 router = APIRouter()
 
@@ -50,8 +50,8 @@ def get_k8s_client_by_cluster(cluster_id: str) -> K8sClient:
 
         kubeconfig_content = cluster.kube_info.kube_config
 
-        # 4. 使用kubeconfig内容创建K8sClient
-        k8s_client = K8sClient(kubeconfig_content=kubeconfig_content)
+        # 4. 使用kubeconfig内容获取K8sClient，同一集群复用已完成API发现的客户端
+        k8s_client = k8s_client_cache.get_client(kubeconfig_content)
 
         return k8s_client
             
@@ -136,6 +136,9 @@ async def list_resources(
     page_size: str = Query(None, description="每页大小"),
     sort_by: str = Query(None, description="排序字段"),
     sort_order: str = Query(None, description="排序顺序"),
+    server_side: bool = Query(False, description="是否使用服务端分页（limit + continue），不支持排序和名称模糊搜索"),
+    continue_token: str = Query(None, description="服务端分页的continue token，来自上一页返回的pagination.continue"),
+    resource_version: str = Query(None, description="资源列表快照版本，来自上一页返回的k8s_metadata.resourceVersion"),
     token: str = Depends(get_token),
 ):
     #根据cluster_id获取对应的kubeconfig，然后获取kubeclient
@@ -150,10 +153,13 @@ async def list_resources(
         resource_type=resource,
         namespace=namespace,
         search_terms=search_terms_list,
-        page=page,
-        page_size=page_size,
+        page=page or 1,
+        page_size=page_size or 10,
         sort_by=sort_by,
-        sort_order=sort_order
+        sort_order=sort_order or "asc",
+        server_side=server_side,
+        continue_token=continue_token,
+        resource_version=resource_version
     )
     if resources is None:
         raise HTTPException(status_code=500, detail=f"查询资源 '{resource}' 失败。")
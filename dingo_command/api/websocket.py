@@ -25,15 +25,15 @@ async def websocket_endpoint(websocket: WebSocket, websocket_type: str):
         await websocket_service.subscribe_redis_channel_ws(websocket_type, websocket)
     # 客户端断开连接，捕获WebSocketDisconnect异常
     except WebSocketDisconnect:
-        websocket_connection_manager.disconnect(websocket_type, websocket)
+        await websocket_connection_manager.disconnect(websocket_type, websocket)
         return None
     except Fail as e:
-        websocket_connection_manager.disconnect(websocket_type, websocket)
+        await websocket_connection_manager.disconnect(websocket_type, websocket)
         raise HTTPException(status_code=400, detail=e.error_message)
     except Exception as e:
         import traceback
         traceback.print_exc()
-        websocket_connection_manager.disconnect(websocket_type, websocket)
+        await websocket_connection_manager.disconnect(websocket_type, websocket)
         raise HTTPException(status_code=400, detail="websocket连接失败")
 
 # websocket的测试接口，向大屏订阅发送个测试消息
@@ -45,4 +45,9 @@ async def send_websocket_message(websocket_type: str):
     except Exception as e:
         import traceback
         traceback.print_exc()
-        raise HTTPException(status_code=400, detail="发送大屏评到测试消息失败")
\ No newline at end of file
+        raise HTTPException(status_code=400, detail="发送大屏评到测试消息失败")
+
+# websocket连接的统计信息：各类型的连接数、发送耗时、丢弃与移除数量
+@router.get("/websocket/stats", summary="websocket连接统计", description="各类型websocket的连接数、发送耗时、丢弃消息与移除连接数量")
+async def get_websocket_stats():
+    return websocket_connection_manager.get_stats()
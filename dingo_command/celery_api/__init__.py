@@ -30,6 +30,8 @@ default_opts = [
     cfg.StrOpt('pushgateway_pass', default="", help='the cluster router id'),
     cfg.ListOpt('customize_hosts', default=[], help='the cluster router id'),
     cfg.ListOpt('nameservers', default=[], help='the cluster router id'),
+    cfg.StrOpt('terraform_plugin_cache_dir', default='/root/.terraform.d/plugin-cache', help='the terraform provider plugin cache dir'),
+    cfg.StrOpt('terraform_provider_mirror', default='/var/lib/dingo-command/terraform-cache', help='the terraform provider filesystem mirror'),
 ]
 
 CONF.register_group(default_group)
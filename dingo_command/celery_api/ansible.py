@@ -1,6 +1,14 @@
 import os
+import queue
+import time
+from datetime import datetime
 import ansible_runner
 from ansible.plugins.callback import CallbackBase
+from dingo_command.db.models.cluster.models import Taskinfo
+from dingo_command.db.models.cluster.sql import TaskSQL
+
+# 攒批处理ansible事件的时间窗口（秒），窗口内的任务状态变化一次写库
+EVENT_FLUSH_INTERVAL = 1
 
 class CustomCallback(CallbackBase):
     def __init__(self):
@@ -25,12 +33,108 @@ class CustomCallback(CallbackBase):
 
 
 
-def run_playbook(playbook_name, inventory, data_dir, ssh_key, extravars=None, limit=None):
+class AnsibleProgressTracker:
+    """
+    基于ansible-runner的event_handler跟踪playbook的进度
+    事件由runner线程放入队列，调用wait的线程阻塞读取，每个事件只处理一次；
+    按阶段推进Taskinfo，一个时间窗口内的任务状态变化一次写库
+    stages: [(触发阶段完成的task名称, 阶段完成的detail, 下一阶段的msg, 失败的事件是否不触发)]
+    """
+
+    def __init__(self, task_info: Taskinfo, stages, flush_interval=EVENT_FLUSH_INTERVAL):
+        self.current_task = task_info
+        self.stages = stages
+        self.stage_index = 0
+        self.stage_names = {stage[0]: index for index, stage in enumerate(stages)}
+        self.flush_interval = flush_interval
+        self.events = queue.Queue()
+        # 待写库的任务
+        self.pending = []
+
+    def event_handler(self, event):
+        # ansible-runner的事件回调，在runner线程中调用，只放入队列；返回True保留事件文件
+        self.events.put(event)
+        return True
+
+    def handle_event(self, event):
+        event_data = event.get("event_data") or {}
+        task_name = event_data.get("task")
+        if task_name is None or event_data.get("host") is None:
+            return
+        index = self.stage_names.get(task_name)
+        if index is None or index < self.stage_index:
+            return
+        task_status = event.get("event", "").split("_")[-1]  # 例如 runner_on_ok -> ok
+        if self.stages[index][3] and task_status == "failed":
+            return
+        self.advance(index + 1)
+
+    def advance(self, stop):
+        # 完成当前阶段到stop之前的所有阶段，并写入下一阶段的任务
+        while self.stage_index < stop:
+            _, detail, next_msg, _ = self.stages[self.stage_index]
+            self.current_task.end_time = datetime.fromtimestamp(datetime.now().timestamp())
+            self.current_task.state = "success"
+            self.current_task.detail = detail
+            self.mark(self.current_task)
+            self.current_task = Taskinfo(task_id=self.current_task.task_id, cluster_id=self.current_task.cluster_id,
+                                         state="progress",
+                                         start_time=datetime.fromtimestamp(datetime.now().timestamp()),
+                                         msg=next_msg)
+            self.mark(self.current_task)
+            self.stage_index += 1
+
+    def mark(self, task_info):
+        if not any(task is task_info for task in self.pending):
+            self.pending.append(task_info)
+
+    def flush(self):
+        if self.pending:
+            TaskSQL.save_list(self.pending)
+            self.pending = []
+
+    def wait(self, thread):
+        # 阻塞等待playbook的事件，直到runner线程结束且事件处理完
+        while thread.is_alive() or not self.events.empty():
+            try:
+                event = self.events.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                self.handle_event(event)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    event = self.events.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            self.flush()
+        self.flush()
+
+    def complete_stages(self):
+        # playbook执行成功后完成剩余的阶段，返回最后一个阶段的任务
+        self.advance(len(self.stages))
+        self.flush()
+        return self.current_task
+
+    def fail(self, detail):
+        self.current_task.end_time = datetime.fromtimestamp(datetime.now().timestamp())
+        self.current_task.state = "failed"
+        self.current_task.detail = detail
+        self.mark(self.current_task)
+        self.flush()
+
+
+def run_playbook(playbook_name, inventory, data_dir, ssh_key, extravars=None, limit=None, event_handler=None):
     # 设置环境变量
     envvars = {
         "ANSIBLE_FORKS": 10,
         "ANSIBLE_BECOME": "True",
         "CURRENT_DIR": inventory,
+        # inventory脚本通过环境变量找到集群目录，只对ansible子进程生效
+        "CURRENT_CLUSTER_DIR": inventory,
     }
     inventory_file = os.path.join(inventory, "hosts")
     # 运行 Ansible playbook 异步
@@ -44,6 +148,7 @@ def run_playbook(playbook_name, inventory, data_dir, ssh_key, extravars=None, li
         ssh_key=ssh_key,
         limit=limit,
         forks=50,
+        event_handler=event_handler,
     )
 
     return thread,runner
\ No newline at end of file
@@ -0,0 +1,98 @@
+import os
+import shutil
+import stat
+import subprocess
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from dingo_command.celery_api.util import cluster_env, run_terraform
+from dingo_command.celery_api import ansible
+
+# 假的terraform/ansible-playbook：把工作目录与CURRENT_CLUSTER_DIR写入工作目录下的记录文件
+FAKE_COMMAND = """#!/bin/sh
+sleep 0.2
+echo "$(pwd) $CURRENT_CLUSTER_DIR" >> "$(pwd)/record.txt"
+"""
+
+CLUSTER_COUNT = 6
+
+
+def fake_run_async(private_data_dir, playbook, inventory, quiet, envvars, extravars, ssh_key, limit, forks,
+                   event_handler):
+    # 与ansible-runner一致：子进程的环境变量为os.environ加上envvars，工作目录为private_data_dir
+    def run():
+        env = os.environ.copy()
+        env.update({key: str(value) for key, value in envvars.items()})
+        subprocess.run(["ansible-playbook", playbook], cwd=private_data_dir, env=env, check=True)
+        event_handler({"event": "playbook_on_stats", "event_data": {}})
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, None
+
+
+class TestConcurrentProvisioning(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        bin_dir = os.path.join(self.work_dir, "bin")
+        os.makedirs(bin_dir)
+        for name in ("terraform", "ansible-playbook"):
+            path = os.path.join(bin_dir, name)
+            with open(path, "w") as f:
+                f.write(FAKE_COMMAND)
+            os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        self.cluster_dirs = []
+        for i in range(CLUSTER_COUNT):
+            cluster_dir = os.path.join(self.work_dir, "inventory", f"cluster-{i}")
+            os.makedirs(os.path.join(cluster_dir, "terraform"))
+            os.makedirs(os.path.join(cluster_dir, "data"))
+            self.cluster_dirs.append(cluster_dir)
+        self.path = bin_dir + os.pathsep + os.environ.get("PATH", "")
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def read_record(self, record_dir):
+        with open(os.path.join(record_dir, "record.txt")) as f:
+            return [line.split() for line in f.read().splitlines()]
+
+    def provision(self, cluster_dir):
+        run_terraform(["apply", "-auto-approve"], cluster_dir, check=True)
+        events = []
+        with patch.object(ansible.ansible_runner, "run_async", side_effect=fake_run_async):
+            thread, _ = ansible.run_playbook("cluster.yml", cluster_dir, os.path.join(cluster_dir, "data"), None,
+                                             event_handler=events.append)
+        thread.join()
+        return events
+
+    def test_cluster_env(self):
+        env = cluster_env("/tmp/cluster", TF_LOG="DEBUG")
+        self.assertEqual(env["CURRENT_CLUSTER_DIR"], "/tmp/cluster")
+        self.assertEqual(env["TF_LOG"], "DEBUG")
+        self.assertNotEqual(os.environ.get("CURRENT_CLUSTER_DIR"), "/tmp/cluster")
+
+    def test_parallel_tasks_isolated(self):
+        with patch.dict(os.environ, {"PATH": self.path}):
+            os.environ.pop("CURRENT_CLUSTER_DIR", None)
+            environ_before = dict(os.environ)
+            cwd_before = os.getcwd()
+            with ThreadPoolExecutor(max_workers=CLUSTER_COUNT) as executor:
+                results = list(executor.map(self.provision, self.cluster_dirs))
+            # 并发任务不修改当前进程的工作目录与环境变量
+            self.assertEqual(os.getcwd(), cwd_before)
+            self.assertEqual(dict(os.environ), environ_before)
+        for cluster_dir, events in zip(self.cluster_dirs, results):
+            terraform_dir = os.path.join(cluster_dir, "terraform")
+            data_dir = os.path.join(cluster_dir, "data")
+            # 每个集群的子进程只看到自己的目录
+            self.assertEqual(self.read_record(terraform_dir), [[terraform_dir, cluster_dir]])
+            self.assertEqual(self.read_record(data_dir), [[data_dir, cluster_dir]])
+            self.assertEqual([event["event"] for event in events], ["playbook_on_stats"])
+
+
+if __name__ == '__main__':
+    unittest.main()
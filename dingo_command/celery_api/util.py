@@ -1,6 +1,24 @@
+import os
+import subprocess
+
 from dingo_command.db.models.cluster.models import Taskinfo
 from dingo_command.db.models.cluster.sql import TaskSQL
 
+
+def cluster_env(cluster_dir, **envvars):
+    # 集群子进程的环境变量，不修改当前进程的os.environ，同一个worker进程可以并发执行多个集群任务
+    env = os.environ.copy()
+    env["CURRENT_CLUSTER_DIR"] = cluster_dir
+    env.update(envvars)
+    return env
+
+
+def run_terraform(args, cluster_dir, **kwargs):
+    # 在集群的terraform目录中执行terraform命令，工作目录与环境变量只对子进程生效
+    return subprocess.run(["terraform"] + list(args), cwd=os.path.join(cluster_dir, "terraform"),
+                          env=cluster_env(cluster_dir), capture_output=True, text=True, **kwargs)
+
+
 def update_task_state(task:Taskinfo):
     # 判空
     query_params = {"task_id": task.task_id}
@@ -12,8 +12,9 @@ import uuid
 from typing import Dict, Optional, List
 from dingo_command.api.model.cluster import ClusterObject
 from dingo_command.api.model.instance import InstanceCreateObject
-from dingo_command.celery_api.ansible import run_playbook
-from dingo_command.celery_api.util import update_task_state
+from dingo_command.celery_api.ansible import run_playbook, AnsibleProgressTracker
+from dingo_command.celery_api.util import update_task_state, cluster_env, run_terraform
+from dingo_command.celery_api.workspace import TerraformWorkspace
 from dingo_command.services.cluster import TaskService
 from dingo_command.db.models.cluster.models import Cluster, Taskinfo
 from dingo_command.db.models.node.models import NodeInfo
@@ -64,6 +65,10 @@ CUSTOM_HOSTS = CONF.DEFAULT.customize_hosts
 NAMESERVERS = CONF.DEFAULT.nameservers
 image_master_id = ServiceConf.DEFAULT.k8s_master_image
 k8s_master_flavor = ServiceConf.DEFAULT.k8s_master_flavor
+# 集群terraform工作目录管理：共享provider缓存，预先init的模板
+terraform_workspace = TerraformWorkspace(TERRAFORM_DIR, os.path.join(WORK_DIR, "terraform-workspace"),
+                                         CONF.DEFAULT.terraform_plugin_cache_dir or "/root/.terraform.d/plugin-cache",
+                                         CONF.DEFAULT.terraform_provider_mirror or "/var/lib/dingo-command/terraform-cache")
 
 runtime_task_name = "Check container-engine status"
 etcd_task_name = "Check etcd cluster status"
@@ -82,6 +87,34 @@ remove_cri_pods = "Reset | stop all cri pods"
 remove_iptables = "Clear IPVS virtual server table"
 remove_file_dirs = "Reset | delete some files and directories"
 
+# playbook的阶段：(触发阶段完成的task名称, 阶段完成的detail, 下一阶段的msg, 失败的事件是否不触发)
+deploy_stages = [
+    (runtime_task_name, TaskService.TaskDetail.runtime_prepair.value, TaskService.TaskMessage.etcd_deploy.name, False),
+    (etcd_task_name, TaskService.TaskDetail.etcd_deploy.value, TaskService.TaskMessage.controller_deploy.name, False),
+    (control_plane_task_name, TaskService.TaskDetail.controller_deploy.value,
+     TaskService.TaskMessage.worker_deploy.name, False),
+    (work_node_task_name, TaskService.TaskDetail.worker_deploy.value, TaskService.TaskMessage.component_deploy.name,
+     True),
+]
+scale_stages = [
+    (scale_download_images, TaskService.TaskDetail.scale_runtime_prepair.value,
+     TaskService.TaskScaleNodeMessage.scale_check_file.name, False),
+    (scale_get_token, TaskService.TaskDetail.scale_install_file.value,
+     TaskService.TaskScaleNodeMessage.scale_check_image.name, False),
+    (scale_install_calico, TaskService.TaskDetail.scale_download_images.value,
+     TaskService.TaskScaleNodeMessage.scale_join_cluster.name, True),
+]
+remove_node_stages = [
+    (remove_from_cluster, TaskService.TaskDetail.remove_pre_install.value,
+     TaskService.TaskRemoveNodeMessage.remove_from_cluster.name, False),
+    (remove_cri_pods, TaskService.TaskDetail.remove_from_cluster.value,
+     TaskService.TaskRemoveNodeMessage.remove_cri_pods.name, False),
+    (remove_iptables, TaskService.TaskDetail.remove_cri_pods.value,
+     TaskService.TaskRemoveNodeMessage.remove_iptables.name, False),
+    (remove_file_dirs, TaskService.TaskDetail.remove_iptables.value,
+     TaskService.TaskRemoveNodeMessage.remove_file_dirs.name, True),
+]
+
 class PortForwards(BaseModel):
     internal_port: Optional[int] = Field(None, description="转发的内部端口")
     external_port: Optional[int] = Field(None, description="转发的外部端口")
@@ -192,21 +225,13 @@ def set_instance_status(cluster, node_list, node_type=None):
                     else:
                         db_instance.status = server.get("status")
 
-def state_remove(node_list):
+def state_remove(node_list, cluster_dir):
     for node in node_list:
         try:
-            subprocess.run(
-                ["terraform", "state", "rm", f"module.compute.openstack_compute_instance_v2.nodes[\"{node}\"]"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            subprocess.run(
-                ["terraform", "state", "rm", f"module.compute.openstack_networking_port_v2.nodes_port[\"{node}\"]"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            run_terraform(["state", "rm", f"module.compute.openstack_compute_instance_v2.nodes[\"{node}\"]"],
+                          cluster_dir, check=True)
+            run_terraform(["state", "rm", f"module.compute.openstack_networking_port_v2.nodes_port[\"{node}\"]"],
+                          cluster_dir, check=True)
         except Exception as e:
             if "No matching objects found" in str(e):
                 continue
@@ -221,9 +246,9 @@ def create_infrastructure(cluster:ClusterTFVarsObject, task_info:Taskinfo, scale
             # 将templat下的terraform目录复制到WORK_DIR/cluster.id目录下
             subprocess.run(["cp", "-LRpf", os.path.join(WORK_DIR, "ansible-deploy", "inventory", "sample-inventory"),
                         str(cluster_dir)], capture_output=True)
-            subprocess.run(["cp", "-r", str(TERRAFORM_DIR), str(cluster_dir)], capture_output=True)
-            # 将celery下面的hosts.py文件复制到WORK_DIR/cluster.id目录下
-        os.chdir(os.path.join(cluster_dir, "terraform"))
+            # 从预先init的模板创建terraform目录
+            terraform_workspace.prepare(str(cluster_dir))
+        terraform_dir = os.path.join(cluster_dir, "terraform")
         # 初始化terraform
         #os.environ['https_proxy']="10.220.70.88:1088"
         if cluster.password == "":
@@ -264,11 +289,10 @@ def create_infrastructure(cluster:ClusterTFVarsObject, task_info:Taskinfo, scale
         cluster.group_vars_path = os.path.join(cluster_dir, "group_vars")
         tfvars_str = json.dumps(cluster, default=lambda o: o.__dict__, indent=2)
         
-        with open("output.tfvars.json", "w") as f:
+        with open(os.path.join(terraform_dir, "output.tfvars.json"), "w") as f:
             f.write(tfvars_str)
             
-        os.environ['CURRENT_CLUSTER_DIR']=cluster_dir
-        res = subprocess.run(["terraform", "init"], capture_output=True, text=True)
+        res = terraform_workspace.init(cluster_dir)
         if res.returncode != 0:
             # 发生错误时更新任务状态为"失败"
             task_info.end_time =datetime.fromtimestamp(datetime.now().timestamp())
@@ -283,13 +307,12 @@ def create_infrastructure(cluster:ClusterTFVarsObject, task_info:Taskinfo, scale
         #os.environ['OS_CLOUD']=region_name
         #判断是否存在名为cluster-router的路由
 
-        res = subprocess.run([
-            "terraform",
+        res = run_terraform([
             "apply",
             "-auto-approve",
             "-var-file=output.tfvars.json",
             "-lock=false"
-        ], capture_output=True, text=True) 
+        ], cluster_dir)
         if res.returncode != 0:
             # 发生错误时更新任务状态为"失败"
             task_info.end_time =datetime.fromtimestamp(datetime.now().timestamp())
@@ -459,10 +482,6 @@ def deploy_kubernetes(cluster: ClusterObject, lb_ip: str, task_id: str = None):
     runtime_task = Taskinfo(task_id=task_id, cluster_id=cluster.id, state="progress",
                          start_time=datetime.fromtimestamp(datetime.now().timestamp()),
                          msg=TaskService.TaskMessage.runtime_prepair.name)
-    etcd_task = Taskinfo(task_id=task_id)
-    control_plane_task = Taskinfo(task_id=task_id)
-    worker_task = Taskinfo(task_id=task_id)
-    component_task = Taskinfo(task_id=task_id)
     try:
         # #替换
         # # 定义上下文字典，包含所有要替换的变量值
@@ -495,10 +514,8 @@ def deploy_kubernetes(cluster: ClusterObject, lb_ip: str, task_id: str = None):
 
         # 将templates下的ansible-deploy目录复制到WORK_DIR/cluster.id目录下
         runtime_task.start_time = datetime.fromtimestamp(datetime.now().timestamp())
-        task_info = runtime_task
         TaskSQL.insert(runtime_task)
         ansible_dir = os.path.join(WORK_DIR, "ansible-deploy")
-        os.chdir(ansible_dir)
         host_file = os.path.join(WORK_DIR, "ansible-deploy", "inventory", str(cluster.id))
         playbook_file = os.path.join(WORK_DIR, "ansible-deploy", "cluster.yml")
         key_file_path = os.path.join(WORK_DIR, "ansible-deploy", "inventory", str(cluster.id), "id_rsa")
@@ -508,89 +525,22 @@ def deploy_kubernetes(cluster: ClusterObject, lb_ip: str, task_id: str = None):
                 private_key_content = key_file.read()
         
         print(f"start deploy kubernetes cluster: {str(cluster.id)}")
-        thread, runner = run_playbook(playbook_file, host_file, ansible_dir, ssh_key=private_key_content)
-        # 处理并打印事件日志
-        runtime_bool = False
-        etcd_bool = False
-        controller_bool = False
-        worker_bool = False
+        tracker = AnsibleProgressTracker(runtime_task, deploy_stages)
+        thread, runner = run_playbook(playbook_file, host_file, ansible_dir, ssh_key=private_key_content,
+                                      event_handler=tracker.event_handler)
+        # 处理事件日志，按阶段推进任务
+        tracker.wait(thread)
         log_file = os.path.join(WORK_DIR, "ansible-deploy", "inventory", str(cluster.id), "ansible_debug.log")
-        while runner.status not in ['canceled', 'successful', 'timeout', 'failed']:
-            # 处理事件日志
-            for event in runner.events:
-                # 检查事件是否包含 task 信息
-                if 'event_data' in event and 'task' in event['event_data']:
-                    task_name = event['event_data'].get('task')
-                    host =  event['event_data'].get('host')
-                    task_status = event['event'].split('_')[-1]  # 例如 runner_on_ok -> ok
-                    # 处理 etcd 任务的特殊逻辑
-                    # print(f"任务 {task_name} 在主机 {host} 上 Status: {event['event']}")
-                    if task_name == runtime_task_name and host is not None:
-                        if not runtime_bool:
-                            runtime_bool = True
-                            runtime_task.end_time = datetime.fromtimestamp(datetime.now().timestamp())
-                            runtime_task.state = "success"
-                            runtime_task.detail = TaskService.TaskDetail.runtime_prepair.value
-                            update_task_state(runtime_task)
-                            # 写入下一个任务
-                            etcd_task = Taskinfo(task_id=task_id, cluster_id=cluster.id, state="progress",
-                                                 start_time=datetime.fromtimestamp(datetime.now().timestamp()),
-                                                 msg=TaskService.TaskMessage.etcd_deploy.name)
-                            TaskSQL.insert(etcd_task)
-                            task_info = etcd_task
-                    if task_name == etcd_task_name and host is not None:
-                        if not etcd_bool:
-                            etcd_bool = True
-                            etcd_task.end_time = datetime.fromtimestamp(datetime.now().timestamp())
-                            etcd_task.state = "success"
-                            etcd_task.detail = TaskService.TaskDetail.etcd_deploy.value
-                            update_task_state(etcd_task)
-                            # 写入下一个任务
-                            control_plane_task = Taskinfo(task_id=task_id, cluster_id=cluster.id, state="progress",
-                                                          start_time=datetime.fromtimestamp(datetime.now().timestamp()),
-                                                          msg=TaskService.TaskMessage.controller_deploy.name)
-                            TaskSQL.insert(control_plane_task)
-                            task_info = control_plane_task
-                    if task_name == control_plane_task_name and host is not None:
-                        if not controller_bool:
-                            controller_bool = True
-                            control_plane_task.end_time = datetime.fromtimestamp(datetime.now().timestamp())
-                            control_plane_task.state = "success"
-                            control_plane_task.detail = TaskService.TaskDetail.controller_deploy.value
-                            update_task_state(control_plane_task)
-                            # 写入下一个任务
-                            worker_task = Taskinfo(task_id=task_id, cluster_id=cluster.id, state="progress",
-                                                   start_time=datetime.fromtimestamp(datetime.now().timestamp()),
-                                                   msg=TaskService.TaskMessage.worker_deploy.name)
-                            TaskSQL.insert(worker_task)
-                            task_info = worker_task
-                    if task_name == work_node_task_name and host is not None and task_status != "failed":
-                        if not worker_bool:
-                            worker_bool = True
-                            worker_task.end_time = datetime.fromtimestamp(datetime.now().timestamp())
-                            worker_task.state = "success"
-                            worker_task.detail = TaskService.TaskDetail.worker_deploy.value
-                            update_task_state(worker_task)
-                            component_task = Taskinfo(task_id=task_id, cluster_id=cluster.id, state="progress",
-                                                      start_time=datetime.fromtimestamp(datetime.now().timestamp()),
-                                                      msg=TaskService.TaskMessage.component_deploy.name)
-                            TaskSQL.insert(component_task)
-                            task_info = component_task
-            #time.sleep(0.01)
-            continue
-        #log_file = os.path.join(WORK_DIR, "ansible-deploy", "inventory", str(cluster.id), "ansible_debug.log")
         with open(log_file, "a") as log_file:
             log_file.write(format(runner.stdout.read()))
         thread.join()
         # 检查最终状态
         if runner.rc != 0:
             # 更新数据库的状态为failed
-            task_info.end_time = datetime.fromtimestamp(datetime.now().timestamp())
-            task_info.state = "failed"
-            task_info.detail = "ansible deploy kubernetes error"
-            update_task_state(task_info)
+            tracker.fail("ansible deploy kubernetes error")
             raise Exception("Deploy kubernetes failed, please check log")
 
+        component_task = tracker.complete_stages()
         component_task.end_time = datetime.fromtimestamp(datetime.now().timestamp())
         component_task.state = "success"
         component_task.detail = TaskService.TaskDetail.component_deploy.value
@@ -650,13 +600,8 @@ def scale_kubernetes(cluster_id, scale_nodes, task_id):
         runtime_task = Taskinfo(task_id=task_id, cluster_id=cluster_id, state="progress",
                                 start_time=datetime.fromtimestamp(datetime.now().timestamp()),
                                 msg=TaskService.TaskScaleNodeMessage.scale_runtime_prepair.name)
-        etcd_task = Taskinfo(task_id=task_id)
-        control_plane_task = Taskinfo(task_id=task_id)
-        worker_task = Taskinfo(task_id=task_id)
-        task_info = runtime_task
         TaskSQL.insert(runtime_task)
         ansible_dir = os.path.join(WORK_DIR, "ansible-deploy")
-        os.chdir(ansible_dir)
         host_file = os.path.join(WORK_DIR, "ansible-deploy", "inventory", str(cluster_id))
         playbook_file = os.path.join(WORK_DIR, "ansible-deploy", "scale.yml")
         key_file_path = os.path.join(WORK_DIR, "ansible-deploy", "inventory", str(cluster_id), "id_rsa")
@@ -666,87 +611,21 @@ def scale_kubernetes(cluster_id, scale_nodes, task_id):
         else:
             private_key_content = None
 
+        tracker = AnsibleProgressTracker(runtime_task, scale_stages)
         thread, runner = run_playbook(playbook_file, host_file, ansible_dir,
-                                      ssh_key=private_key_content, limit=scale_nodes)
-        # 处理并打印事件日志
-        runtime_bool = False
-        etcd_bool = False
-        controller_bool = False
-        worker_bool = False
-        while runner.status not in ['canceled', 'successful', 'timeout', 'failed']:
-            for event in runner.events:
-                # 检查事件是否包含 task 信息
-                if 'event_data' in event and 'task' in event['event_data']:
-                    task_name = event['event_data'].get('task')
-                    host = event['event_data'].get('host')
-                    task_status = event['event'].split('_')[-1]  # 例如 runner_on_ok -> ok
-                    # print(f"任务 {task_name} 在主机 {host} 上 Status: {event['event']}")
-                    # print(f"task_name is: {task_name}")
-                    if task_name == scale_download_images and host is not None:
-                        if not runtime_bool:
-                            runtime_bool = True
-                            runtime_task.end_time = datetime.fromtimestamp(datetime.now().timestamp())
-                            runtime_task.state = "success"
-                            runtime_task.detail = TaskService.TaskDetail.scale_runtime_prepair.value
-                            update_task_state(runtime_task)
-                            # 写入下一个任务
-                            etcd_task = Taskinfo(task_id=task_id, cluster_id=cluster_id, state="progress",
-                                                 start_time=datetime.fromtimestamp(datetime.now().timestamp()),
-                                                 msg=TaskService.TaskScaleNodeMessage.scale_check_file.name)
-                            TaskSQL.insert(etcd_task)
-                            task_info = etcd_task
-                    if task_name == scale_get_token and host is not None:
-                        if not etcd_bool:
-                            etcd_bool = True
-                            etcd_task.end_time = datetime.fromtimestamp(datetime.now().timestamp())
-                            etcd_task.state = "success"
-                            etcd_task.detail = TaskService.TaskDetail.scale_install_file.value
-                            update_task_state(etcd_task)
-                            # 写入下一个任务
-                            control_plane_task = Taskinfo(task_id=task_id, cluster_id=cluster_id, state="progress",
-                                                          start_time=datetime.fromtimestamp(datetime.now().timestamp()),
-                                                          msg=TaskService.TaskScaleNodeMessage.scale_check_image.name)
-                            TaskSQL.insert(control_plane_task)
-                            task_info = control_plane_task
-                    if task_name == scale_install_calico and host is not None and task_status != "failed":
-                        if not controller_bool:
-                            controller_bool = True
-                            control_plane_task.end_time = datetime.fromtimestamp(datetime.now().timestamp())
-                            control_plane_task.state = "success"
-                            control_plane_task.detail = TaskService.TaskDetail.scale_download_images.value
-                            update_task_state(control_plane_task)
-                            # 写入下一个任务
-                            worker_task = Taskinfo(task_id=task_id, cluster_id=cluster_id, state="progress",
-                                                   start_time=datetime.fromtimestamp(datetime.now().timestamp()),
-                                                   msg=TaskService.TaskScaleNodeMessage.scale_join_cluster.name)
-                            TaskSQL.insert(worker_task)
-                            task_info = worker_task
-                    # if task_name == scale_install_calico and host is not None and task_status != "failed":
-                    #     if not worker_bool:
-                    #         worker_bool = True
-                    #         worker_task.end_time = datetime.fromtimestamp(datetime.now().timestamp())
-                    #         worker_task.state = "success"
-                    #         worker_task.detail = TaskService.TaskDetail.scale_join_cluster.value
-                    #         update_task_state(worker_task)
-                    #         component_task = Taskinfo(task_id=task_id, cluster_id=cluster.id, state="progress",
-                    #                                   start_time=datetime.fromtimestamp(datetime.now().timestamp()),
-                    #                                   msg=TaskService.TaskScaleNodeMessage.scale_install_calico.name)
-                    #         TaskSQL.insert(component_task)
-                    #         task_info = component_task
-            time.sleep(0.01)
-            continue
+                                      ssh_key=private_key_content, limit=scale_nodes,
+                                      event_handler=tracker.event_handler)
+        # 处理事件日志，按阶段推进任务
+        tracker.wait(thread)
         log_file = os.path.join(WORK_DIR, "ansible-deploy", "inventory", str(cluster_id), "ansible_scale.log")
         with open(log_file, "a") as log_file:
             log_file.write(format(runner.stdout.read()))
         thread.join()
         if runner.rc != 0:
             # 更新数据库的状态为failed
-            task_info.end_time = datetime.fromtimestamp(datetime.now().timestamp())
-            task_info.state = "failed"
-            task_info.detail = "ansible deploy kubernetes error"
-            update_task_state(task_info)
+            tracker.fail("ansible deploy kubernetes error")
             raise Exception("Deploy kubernetes with sacle node failed, please check log")
-        # 这里component_task为None就报错
+        worker_task = tracker.complete_stages()
         worker_task.end_time = datetime.fromtimestamp(datetime.now().timestamp())
         worker_task.state = "success"
         worker_task.detail = TaskService.TaskDetail.scale_join_cluster.value
@@ -1030,6 +909,8 @@ def check_nodes_connectivity(host_file, key_file_path):
     print(f"config node no password:")
     
     res={}
+    ansible_dir = os.path.join(WORK_DIR, "ansible-deploy")
+    env = cluster_env(os.path.dirname(host_file))
     if key_file_path != "":   
         res = subprocess.run([
             "ansible",
@@ -1039,7 +920,7 @@ def check_nodes_connectivity(host_file, key_file_path):
             "--ssh-common-args=\"-o StrictHostKeyChecking=no\"",
             "--private-key", key_file_path,
             "-o", # 使用简单输出格式
-        ], capture_output=True, text=True)
+        ], capture_output=True, text=True, cwd=ansible_dir, env=env)
     else:
         res = subprocess.run([
             "ansible",
@@ -1047,7 +928,7 @@ def check_nodes_connectivity(host_file, key_file_path):
             "-m", "ping",
             "all",
             "-o", # 使用简单输出格式
-        ], capture_output=True, text=True)
+        ], capture_output=True, text=True, cwd=ansible_dir, env=env)
     
     # 初始化结果
     result = {
@@ -1076,17 +957,9 @@ def remove_bastion_fip_from_state(cluster_dir):
     返回:
         bool: 操作是否成功
     """
-    terraform_dir = os.path.join(cluster_dir, "terraform")
-    os.chdir(terraform_dir)
-    
     try:
         # 执行 terraform state list 获取所有资源
-        result = subprocess.run(
-            ["terraform", "state", "list"], 
-            capture_output=True, 
-            text=True, 
-            check=True
-        )
+        result = run_terraform(["state", "list"], cluster_dir, check=True)
         
         state_resources = result.stdout.strip().split('\n')
         target_resource = "module.ips.openstack_networking_floatingip_v2.bastion_fip[0]"
@@ -1096,24 +969,15 @@ def remove_bastion_fip_from_state(cluster_dir):
             print(f"找到资源 {target_resource}，正在从 state 中移除...")
             
             # 执行 terraform state rm 移除资源
-            remove_result = subprocess.run(
-                ["terraform", "state", "rm", target_resource],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            remove_result = run_terraform(["state", "rm", target_resource], cluster_dir, check=True)
             
             print(f"rm bastion_fip from terraform state ")
             return True
 
         elif "module.network.openstack_networking_router_v2.cluster[0]" in state_resources:
             # 执行 terraform state rm 移除资源
-            remove_result = subprocess.run(
-                ["terraform", "state", "rm", "module.network.openstack_networking_router_v2.cluster[0]"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            remove_result = run_terraform(["state", "rm", "module.network.openstack_networking_router_v2.cluster[0]"],
+                                          cluster_dir, check=True)
             print(f"rm cluster_router from terraform state ")
             return True
         else:
@@ -1262,7 +1126,6 @@ def create_k8s_cluster(self, cluster_tf_dict, cluster_dict, node_list, instance_
         # 执行ansible命令验证是否能够连接到所有节点
         print(f"check all node status {task_id}")
         ansible_dir = os.path.join(WORK_DIR, "ansible-deploy")
-        os.chdir(ansible_dir)
         key_file_path = ""
         if cluster_tfvars.password == "":
             key_file_path = os.path.join(WORK_DIR, "ansible-deploy", "inventory", str(cluster.id), "id_rsa")
@@ -1568,17 +1431,16 @@ def delete_cluster(self, cluster_id, token):
         terraform_dir = os.path.join(cluster_dir, "terraform")
         print(f"Terraform dir: {terraform_dir}")
 
-        os.chdir(terraform_dir)
         # 加载为 ClusterTFVarsObject 对象
         
         tfvars_path = os.path.join(WORK_DIR, "ansible-deploy", "inventory", cluster_id, "terraform", "output.tfvars.json")
         cluster_tfvars = load_tfvars_to_object(tfvars_path)
         cluster_tfvars.token = token
         tfvars_str = json.dumps(cluster_tfvars, default=lambda o: o.__dict__, indent=2)
-        with open("output.tfvars.json", "w") as f:
+        with open(tfvars_path, "w") as f:
             f.write(tfvars_str)
         # 获取 tfvars 文件路径
-        res = subprocess.run(["terraform", "init"], capture_output=True, text=True)
+        res = terraform_workspace.init(cluster_dir)
         if res.returncode != 0:
             # 发生错误时更新任务状态为"失败"
             print(f"Terraform error: {res.stderr}")
@@ -1588,8 +1450,7 @@ def delete_cluster(self, cluster_id, token):
             update_task_state(task_info)
             raise Exception("delete cluster Error terraform init exception: {}".format(res.stderr))
 
-        env = os.environ.copy()
-        env["TF_LOG"] = "DEBUG"
+        env = cluster_env(cluster_dir, TF_LOG="DEBUG")
         resource_inuse = False
         # 创建子进程并实时捕获输出
         process = subprocess.Popen(
@@ -1599,6 +1460,7 @@ def delete_cluster(self, cluster_id, token):
             text=True,
             bufsize=1,
             universal_newlines=True,
+            cwd=terraform_dir,
             env=env
         )
         # 实时读取输出流
@@ -1720,16 +1582,15 @@ def delete_node(self, cluster_id, cluster_name, node_list, instance_list, extrav
             remove_node_err_list = node_err_info.get("node_err").split(",")
             for remove_node in remove_node_err_list:
                 remove_list.append(remove_node.split(cluster_name + "-")[1])
-            terraform_dir = os.path.join(cluster_dir, "terraform")
-            os.chdir(terraform_dir)
-            state_remove(remove_list)
-            with open("output.tfvars.json") as f:
+            tfvars_path = os.path.join(cluster_dir, "terraform", "output.tfvars.json")
+            state_remove(remove_list, cluster_dir)
+            with open(tfvars_path) as f:
                 content = json.loads(f.read())
                 content_new = copy.deepcopy(content)
                 for node in content["nodes"]:
                     if node in remove_list:
                         del content_new["nodes"][node]
-            with open("output.tfvars.json", "w") as f:
+            with open(tfvars_path, "w") as f:
                 json.dump(content_new, f, indent=4)
         cluster_tfvars = None
         hosts_data = None
@@ -1813,11 +1674,8 @@ def delete_node(self, cluster_id, cluster_name, node_list, instance_list, extrav
                     raise Exception("Ansible kubernetes deployment failed, configure sshpass error")
 
             extravars["skip_confirmation"] = "true"
-            os.environ['CURRENT_CLUSTER_DIR'] = cluster_dir
-            # os.environ['OS_CLOUD'] = node.get("region_name")
             # 1、在这里先找到cluster的文件夹，找到对应的目录，先通过发来的node_list组合成extravars的变量，再执行remove-node.yaml
             ansible_dir = os.path.join(WORK_DIR, "ansible-deploy")
-            os.chdir(ansible_dir)
             host_file = os.path.join(WORK_DIR, "ansible-deploy", "inventory", str(cluster_id))
             playbook_file = os.path.join(WORK_DIR, "ansible-deploy", "remove-node.yml")
             key_file_path = os.path.join(WORK_DIR, "ansible-deploy", "inventory", str(cluster_id), "id_rsa")
@@ -1825,86 +1683,21 @@ def delete_node(self, cluster_id, cluster_name, node_list, instance_list, extrav
             if os.path.exists(key_file_path):
                 with open(key_file_path, 'r') as key_file:
                     private_key_content = key_file.read()
+            tracker = AnsibleProgressTracker(runtime_task, remove_node_stages)
             thread, runner = run_playbook(playbook_file, host_file, ansible_dir,
-                                          ssh_key=private_key_content, extravars=extravars)
-            # 处理并打印事件日志
-            runtime_bool = False
-            etcd_bool = False
-            controller_bool = False
-            worker_bool = False
-            while runner.status not in ['canceled', 'successful', 'timeout', 'failed']:
-                for event in runner.events:
-                    # 检查事件是否包含 task 信息
-                    if 'event_data' in event and 'task' in event['event_data']:
-                        task_name = event['event_data'].get('task')
-                        host = event['event_data'].get('host')
-                        task_status = event['event'].split('_')[-1]  # 例如 runner_on_ok -> ok
-                        #print(f"任务 {task_name} 在主机 {host} 上 Status: {event['event']}")
-                        if task_name == remove_from_cluster and host is not None:
-                            if not runtime_bool:
-                                runtime_bool = True
-                                runtime_task.end_time = datetime.fromtimestamp(datetime.now().timestamp())
-                                runtime_task.state = "success"
-                                runtime_task.detail = TaskService.TaskDetail.remove_pre_install.value
-                                update_task_state(runtime_task)
-                                # 写入下一个任务
-                                etcd_task = Taskinfo(task_id=task_id, cluster_id=cluster_id, state="progress",
-                                                     start_time=datetime.fromtimestamp(datetime.now().timestamp()),
-                                                     msg=TaskService.TaskRemoveNodeMessage.remove_from_cluster.name)
-                                TaskSQL.insert(etcd_task)
-                                task_info = etcd_task
-                        if task_name == remove_cri_pods and host is not None:
-                            if not etcd_bool:
-                                etcd_bool = True
-                                etcd_task.end_time = datetime.fromtimestamp(datetime.now().timestamp())
-                                etcd_task.state = "success"
-                                etcd_task.detail = TaskService.TaskDetail.remove_from_cluster.value
-                                update_task_state(etcd_task)
-                                # 写入下一个任务
-                                control_plane_task = Taskinfo(task_id=task_id, cluster_id=cluster_id, state="progress",
-                                                              start_time=datetime.fromtimestamp(datetime.now().timestamp()),
-                                                              msg=TaskService.TaskRemoveNodeMessage.remove_cri_pods.name)
-                                TaskSQL.insert(control_plane_task)
-                                task_info = control_plane_task
-                        if task_name == remove_iptables and host is not None:
-                            if not controller_bool:
-                                controller_bool = True
-                                control_plane_task.end_time = datetime.fromtimestamp(datetime.now().timestamp())
-                                control_plane_task.state = "success"
-                                control_plane_task.detail = TaskService.TaskDetail.remove_cri_pods.value
-                                update_task_state(control_plane_task)
-                                # 写入下一个任务
-                                worker_task = Taskinfo(task_id=task_id, cluster_id=cluster_id, state="progress",
-                                                       start_time=datetime.fromtimestamp(datetime.now().timestamp()),
-                                                       msg=TaskService.TaskRemoveNodeMessage.remove_iptables.name)
-                                TaskSQL.insert(worker_task)
-                                task_info = worker_task
-                        if task_name == remove_file_dirs and host is not None and task_status != "failed":
-                            if not worker_bool:
-                                worker_bool = True
-                                worker_task.end_time = datetime.fromtimestamp(datetime.now().timestamp())
-                                worker_task.state = "success"
-                                worker_task.detail = TaskService.TaskDetail.remove_iptables.value
-                                update_task_state(worker_task)
-                                component_task = Taskinfo(task_id=task_id, cluster_id=cluster_id, state="progress",
-                                                          start_time=datetime.fromtimestamp(datetime.now().timestamp()),
-                                                          msg=TaskService.TaskRemoveNodeMessage.remove_file_dirs.name)
-                                TaskSQL.insert(component_task)
-                                task_info = component_task
-
-                time.sleep(0.01)
-                continue
+                                          ssh_key=private_key_content, extravars=extravars,
+                                          event_handler=tracker.event_handler)
+            # 处理事件日志，按阶段推进任务
+            tracker.wait(thread)
             log_file = os.path.join(WORK_DIR, "ansible-deploy", "inventory", str(cluster_id), "ansible_remove.log")
             with open(log_file, "a") as log_file:
                 log_file.write(format(runner.stdout.read()))
             thread.join()
             if runner.rc != 0:
-                # print("{}".format(runner.stdout.read()))
-                task_info.end_time = datetime.fromtimestamp(datetime.now().timestamp())
-                task_info.state = "failed"
-                task_info.detail = "Ansible remove node failed, please check log"
-                update_task_state(task_info)
+                tracker.fail("Ansible remove node failed, please check log")
                 raise Exception(f"Ansible remove node failed, please check log")
+            component_task = tracker.complete_stages()
+            task_info = component_task
 
         # # 2、执行完删除k8s这些节点之后，再执行terraform销毁这些节点（这里是单独修改output.json文件还是需要通过之前生成的output.json文件生成）
         # 在这里添加需要排除重新创建的虚拟机，从output文件里面取得nodes再和数据库里面的nodes做比较，数据里面没有的就在state删除
@@ -1913,16 +1706,15 @@ def delete_node(self, cluster_id, cluster_name, node_list, instance_list, extrav
             remove_node_list = extravars.get("node").split(",")
             for remove_node in remove_node_list:
                 remove_list.append(remove_node.split(cluster_name + "-")[1])
-            terraform_dir = os.path.join(cluster_dir, "terraform")
-            os.chdir(terraform_dir)
-            state_remove(remove_list)
-            with open("output.tfvars.json") as f:
+            tfvars_path = os.path.join(cluster_dir, "terraform", "output.tfvars.json")
+            state_remove(remove_list, cluster_dir)
+            with open(tfvars_path) as f:
                 content = json.loads(f.read())
                 content_new = copy.deepcopy(content)
                 for node in content["nodes"]:
                     if node in remove_list:
                         del content_new["nodes"][node]
-            with open("output.tfvars.json", "w") as f:
+            with open(tfvars_path, "w") as f:
                 json.dump(content_new, f, indent=4)
 
         # output_file = os.path.join(WORK_DIR, "ansible-deploy", "inventory", str(cluster_id),
@@ -2041,15 +1833,11 @@ def delete_baremetal(self, cluster_id, cluster_name, instance_list, token):
 
         # 执行terraform apply
         cluster_dir = os.path.join(WORK_DIR, "ansible-deploy", "inventory", str(cluster_id))
-        os.environ['CURRENT_CLUSTER_DIR'] = cluster_dir
-        terraform_dir = os.path.join(cluster_dir, "terraform")
-        os.chdir(terraform_dir)
-        res = subprocess.run([
-            "terraform",
+        res = run_terraform([
             "apply",
             "-auto-approve",
             "-var-file=output.tfvars.json"
-        ], capture_output=True, text=True)
+        ], cluster_dir)
         session = get_session()
         if res.returncode != 0:
             # 发生错误时更新集群务状态为"失败"
@@ -0,0 +1,165 @@
+import fcntl
+import hashlib
+import os
+import shutil
+import subprocess
+
+from dingo_command.celery_api.util import cluster_env
+
+# terraform的依赖锁文件
+LOCK_FILE = ".terraform.lock.hcl"
+# 记录上次init时锁文件hash的文件，位于.terraform目录下
+INIT_HASH_FILE = "dingo-init.sha256"
+# 记录模板来源目录hash的文件，位于模板的.terraform目录下
+SOURCE_HASH_FILE = "dingo-source.sha256"
+# 从文件系统镜像安装的provider，与etc/.terraformrc一致
+MIRROR_INCLUDE = "dingo.com/*/*"
+
+
+def file_sha256(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def read_text(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read().strip()
+
+
+def write_text(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+
+
+class TerraformWorkspace:
+    """
+    集群terraform工作目录管理
+    共享的provider缓存与文件系统镜像；按模板内容预先init的模板目录（按hash分版本，旧版本保留给引用它的集群）；
+    集群目录复制模板的配置与锁文件，.terraform/providers软链接到模板，锁文件hash不变时跳过init
+    """
+
+    def __init__(self, source_dir, root_dir, plugin_cache_dir, provider_mirror):
+        self.source_dir = source_dir
+        self.root_dir = root_dir
+        self.plugin_cache_dir = plugin_cache_dir
+        self.provider_mirror = provider_mirror
+        self.cli_config_file = os.path.join(root_dir, "terraformrc")
+
+    def env(self, cluster_dir):
+        return cluster_env(cluster_dir, TF_CLI_CONFIG_FILE=self.cli_config_file,
+                           TF_PLUGIN_CACHE_DIR=self.plugin_cache_dir, TF_IN_AUTOMATION="true")
+
+    def lock(self):
+        # 模板构建与init在多个worker进程间串行，provider缓存目录不支持并发写入
+        os.makedirs(self.root_dir, exist_ok=True)
+        lock_file = open(os.path.join(self.root_dir, ".lock"), "w")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def write_cli_config(self):
+        os.makedirs(self.plugin_cache_dir, exist_ok=True)
+        content = (f'plugin_cache_dir   = "{self.plugin_cache_dir}"\n'
+                   'disable_checkpoint = true\n'
+                   'provider_installation {\n'
+                   '  filesystem_mirror {\n'
+                   f'    path    = "{self.provider_mirror}"\n'
+                   f'    include = ["{MIRROR_INCLUDE}"]\n'
+                   '  }\n'
+                   '  direct {\n'
+                   f'    exclude = ["{MIRROR_INCLUDE}"]\n'
+                   '  }\n'
+                   '}\n')
+        if read_text(self.cli_config_file) != content.strip():
+            write_text(self.cli_config_file, content)
+
+    def source_digest(self):
+        # 模板来源目录的内容hash：相对路径 + 文件内容
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(self.source_dir):
+            dirs[:] = sorted(d for d in dirs if d != ".terraform")
+            for file_name in sorted(files):
+                if file_name == LOCK_FILE:
+                    continue
+                path = os.path.join(root, file_name)
+                digest.update(os.path.relpath(path, self.source_dir).encode())
+                with open(path, "rb") as f:
+                    digest.update(hashlib.sha256(f.read()).digest())
+        return digest.hexdigest()
+
+    def ensure_template(self):
+        # 返回当前模板版本的目录，不存在或未init完成时构建
+        digest = self.source_digest()
+        template_dir = os.path.join(self.root_dir, "templates", digest[:16])
+        if read_text(os.path.join(template_dir, ".terraform", SOURCE_HASH_FILE)) == digest:
+            return template_dir
+        lock_file = self.lock()
+        try:
+            if read_text(os.path.join(template_dir, ".terraform", SOURCE_HASH_FILE)) == digest:
+                return template_dir
+            self.write_cli_config()
+            building_dir = template_dir + ".building"
+            shutil.rmtree(building_dir, ignore_errors=True)
+            shutil.copytree(self.source_dir, building_dir, symlinks=True,
+                            ignore=shutil.ignore_patterns(".terraform"))
+            print(f"init terraform template: {template_dir}")
+            res = subprocess.run(["terraform", "init", "-input=false"], cwd=building_dir, env=self.env(building_dir),
+                                 capture_output=True, text=True)
+            if res.returncode != 0:
+                shutil.rmtree(building_dir, ignore_errors=True)
+                raise Exception(f"Terraform template init error: {res.stderr}")
+            write_text(os.path.join(building_dir, ".terraform", SOURCE_HASH_FILE), digest)
+            shutil.rmtree(template_dir, ignore_errors=True)
+            os.rename(building_dir, template_dir)
+            return template_dir
+        finally:
+            lock_file.close()
+
+    def prepare(self, cluster_dir):
+        # 创建集群的terraform目录：复制模板的配置与锁文件，复用模板已安装的provider与模块清单
+        template_dir = self.ensure_template()
+        terraform_dir = os.path.join(cluster_dir, "terraform")
+        shutil.copytree(template_dir, terraform_dir, symlinks=True, dirs_exist_ok=True,
+                        ignore=shutil.ignore_patterns(".terraform"))
+        dot_terraform = os.path.join(terraform_dir, ".terraform")
+        os.makedirs(dot_terraform, exist_ok=True)
+        providers = os.path.join(dot_terraform, "providers")
+        if os.path.islink(providers):
+            os.unlink(providers)
+        elif os.path.exists(providers):
+            shutil.rmtree(providers)
+        os.symlink(os.path.join(template_dir, ".terraform", "providers"), providers)
+        template_modules = os.path.join(template_dir, ".terraform", "modules")
+        if os.path.exists(template_modules):
+            shutil.copytree(template_modules, os.path.join(dot_terraform, "modules"), dirs_exist_ok=True)
+        write_text(os.path.join(dot_terraform, INIT_HASH_FILE),
+                   file_sha256(os.path.join(terraform_dir, LOCK_FILE)) or "")
+        return terraform_dir
+
+    def init(self, cluster_dir):
+        # 锁文件hash与上次init时一致则跳过init，返回值与subprocess.run一致
+        terraform_dir = os.path.join(cluster_dir, "terraform")
+        dot_terraform = os.path.join(terraform_dir, ".terraform")
+        providers = os.path.join(dot_terraform, "providers")
+        lock_hash = file_sha256(os.path.join(terraform_dir, LOCK_FILE))
+        if lock_hash and read_text(os.path.join(dot_terraform, INIT_HASH_FILE)) == lock_hash \
+                and os.path.exists(providers):
+            print(f"terraform lock file unchanged, skip init: {terraform_dir}")
+            return subprocess.CompletedProcess(["terraform", "init"], 0, "", "")
+        lock_file = self.lock()
+        try:
+            self.write_cli_config()
+            # 需要重新init时不再使用模板的provider目录，避免写入模板
+            if os.path.islink(providers):
+                os.unlink(providers)
+            res = subprocess.run(["terraform", "init", "-input=false"], cwd=terraform_dir, env=self.env(cluster_dir),
+                                 capture_output=True, text=True)
+            if res.returncode == 0:
+                write_text(os.path.join(dot_terraform, INIT_HASH_FILE),
+                           file_sha256(os.path.join(terraform_dir, LOCK_FILE)) or "")
+            return res
+        finally:
+            lock_file.close()
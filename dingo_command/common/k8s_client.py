@@ -1,7 +1,166 @@
+import functools
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
 from kubernetes import client, config, dynamic
 from kubernetes.client.rest import ApiException
+from kubernetes.dynamic.resource import ResourceField
 from typing import List, Dict, Any, Optional, Union
 
+from dingo_command.utils.constant import K8S_LIST_SNAPSHOT_TTL, K8S_LIST_SNAPSHOT_MAX_SIZE, K8S_DISCOVERY_CACHE_DIR, \
+    K8S_DISCOVERY_CACHE_TTL, K8S_CLIENT_CACHE_TTL, K8S_CLIENT_CACHE_MAX_SIZE
+
+# 可下推为 labelSelector 的标签键、值格式
+LABEL_KEY_PATTERN = re.compile(r'^([a-z0-9]([-a-z0-9.]*[a-z0-9])?/)?[A-Za-z0-9]([-A-Za-z0-9_.]*[A-Za-z0-9])?$')
+LABEL_VALUE_PATTERN = re.compile(r'^[A-Za-z0-9]([-A-Za-z0-9_.]*[A-Za-z0-9])?$')
+
+
+class K8sListSnapshotCache:
+    """
+    资源列表快照缓存
+
+    以 (集群, 资源, 命名空间, 选择器) 为键缓存一次全量LIST的原始对象及其 resourceVersion，
+    需要客户端排序/过滤的翻页请求在有效期内复用同一快照；
+    同时记录服务端分页每一页对应的 continue token，便于按页码跳转。
+    """
+
+    def __init__(self, ttl: int = K8S_LIST_SNAPSHOT_TTL, max_size: int = K8S_LIST_SNAPSHOT_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._snapshots = OrderedDict()
+        self._continue_tokens = OrderedDict()
+
+    def get_snapshot(self, key: tuple, resource_version: Optional[str] = None):
+        """返回 (resource_version, items)，快照过期或与指定的 resourceVersion 不一致时返回 None"""
+        with self._lock:
+            entry = self._snapshots.get(key)
+            if entry is None:
+                return None
+            created_at, snapshot_version, items = entry
+            if time.monotonic() - created_at > self.ttl:
+                self._snapshots.pop(key, None)
+                return None
+            if resource_version and resource_version != snapshot_version:
+                return None
+            self._snapshots.move_to_end(key)
+            return snapshot_version, items
+
+    def put_snapshot(self, key: tuple, resource_version: Optional[str], items: list):
+        with self._lock:
+            self._snapshots[key] = (time.monotonic(), resource_version, items)
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > self.max_size:
+                self._snapshots.popitem(last=False)
+
+    def get_continue_token(self, key: tuple, page_size: int, page: int) -> Optional[str]:
+        with self._lock:
+            entry = self._continue_tokens.get((key, page_size, page))
+            if entry is None:
+                return None
+            created_at, token = entry
+            # continue token 在apiserver端也会过期，这里与快照使用相同的有效期
+            if time.monotonic() - created_at > self.ttl:
+                self._continue_tokens.pop((key, page_size, page), None)
+                return None
+            return token
+
+    def put_continue_token(self, key: tuple, page_size: int, page: int, token: str):
+        with self._lock:
+            self._continue_tokens[(key, page_size, page)] = (time.monotonic(), token)
+            self._continue_tokens.move_to_end((key, page_size, page))
+            while len(self._continue_tokens) > self.max_size * 16:
+                self._continue_tokens.popitem(last=False)
+
+    def invalidate(self, key: tuple):
+        with self._lock:
+            self._snapshots.pop(key, None)
+            for token_key in [k for k in self._continue_tokens if k[0] == key]:
+                self._continue_tokens.pop(token_key, None)
+
+
+# 进程内共享的资源列表快照缓存
+k8s_list_snapshot_cache = K8sListSnapshotCache()
+
+
+class K8sResourceMappingCache:
+    """按集群缓存资源类型到 (apiVersion, kind) 的推断结果，避免每次请求都访问版本与发现接口"""
+
+    def __init__(self, ttl: int = K8S_DISCOVERY_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._mappings = {}
+
+    def get(self, cluster_identity, resource_type: str, field: str):
+        with self._lock:
+            entry = self._mappings.get((cluster_identity, resource_type))
+            if entry is None or time.monotonic() - entry["created_at"] > self.ttl:
+                return None
+            return entry.get(field)
+
+    def put(self, cluster_identity, resource_type: str, field: str, value):
+        with self._lock:
+            entry = self._mappings.get((cluster_identity, resource_type))
+            if entry is None or time.monotonic() - entry["created_at"] > self.ttl:
+                entry = {"created_at": time.monotonic()}
+                self._mappings[(cluster_identity, resource_type)] = entry
+            entry[field] = value
+
+    def invalidate(self, cluster_identity):
+        with self._lock:
+            for key in [k for k in self._mappings if k[0] == cluster_identity]:
+                self._mappings.pop(key, None)
+
+
+# 进程内共享的资源类型映射缓存
+k8s_resource_mapping_cache = K8sResourceMappingCache()
+
+
+def _cluster_memoize(field: str):
+    """按集群缓存资源类型的推断结果（api_version 或 kind），推断失败（抛出异常或返回 None）时不缓存"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, resource_type: str):
+            cluster_identity = getattr(self, "_cluster_identity", None)
+            value = k8s_resource_mapping_cache.get(cluster_identity, resource_type, field)
+            if value is None:
+                value = func(self, resource_type)
+                if value is not None:
+                    k8s_resource_mapping_cache.put(cluster_identity, resource_type, field, value)
+            return value
+        return wrapper
+    return decorator
+
+
+def _discovery_cache_file(cluster_identity: str) -> Optional[str]:
+    """
+    返回集群API发现结果的缓存文件路径，文件超过有效期时先删除，由 DynamicClient 重新发现并写入。
+    目录不可用时返回 None，使用 kubernetes 库默认的缓存文件。
+    """
+    try:
+        os.makedirs(K8S_DISCOVERY_CACHE_DIR, exist_ok=True)
+        cache_file = os.path.join(K8S_DISCOVERY_CACHE_DIR, f"{cluster_identity}.json")
+        if os.path.exists(cache_file) and time.time() - os.path.getmtime(cache_file) > K8S_DISCOVERY_CACHE_TTL:
+            os.remove(cache_file)
+        return cache_file
+    except OSError as e:
+        print(f"k8s API发现缓存目录不可用: {e}")
+        return None
+
+
+def _field_get(obj: Any, key: str) -> Any:
+    """从 dict 或 dynamic client 返回的 ResourceField 中取字段，避免将整个对象 to_dict()"""
+    if isinstance(obj, ResourceField):
+        return vars(obj).get(key)
+    if isinstance(obj, dict):
+        return obj.get(key)
+    return None
+
+
 class K8sClient:
     """
     一个统一的 Kubernetes API 客户端，支持查询、创建内置资源和自定义资源。
@@ -17,31 +176,36 @@ class K8sClient:
                                              1. 默认 kubeconfig 文件路径 (~/.kube/config)
                                              2. 集群内配置 (In-cluster config)
         """
-        self._load_kubernetes_config(kubeconfig_path,kubeconfig_content)
-        # 初始化 dynamic_client，它是创建/更新/删除资源的关键
-        self._dynamic_client = dynamic.DynamicClient(client.ApiClient())
+        # 每个实例使用独立的 ApiClient，不修改全局默认配置，多个集群的客户端可以同时存在
+        self._api_client = self._load_kubernetes_config(kubeconfig_path,kubeconfig_content)
+        # 区分不同集群/凭据的标识，用于API发现、资源类型映射与资源列表快照缓存
+        self._cluster_identity = hashlib.sha256((kubeconfig_content or kubeconfig_path or "").encode("utf-8")).hexdigest()
+        # 初始化 dynamic_client，它是创建/更新/删除资源的关键；API发现结果按集群缓存到磁盘
+        self._dynamic_client = dynamic.DynamicClient(self._api_client, cache_file=_discovery_cache_file(self._cluster_identity))
         # 对于查询，为了兼容性或特定优化，保留特定客户端
-        self._core_v1_api = client.CoreV1Api()
-        self._apps_v1_api = client.AppsV1Api()
+        self._core_v1_api = client.CoreV1Api(self._api_client)
+        self._apps_v1_api = client.AppsV1Api(self._api_client)
         print("Kubernetes 客户端初始化成功。")
 
-    def _load_kubernetes_config(self, kubeconfig_path: Optional[str], kubeconfig_content: Optional[str] = None):
-        """内部方法：加载 Kubernetes 配置。"""
+    def _load_kubernetes_config(self, kubeconfig_path: Optional[str], kubeconfig_content: Optional[str] = None) -> client.ApiClient:
+        """内部方法：加载 Kubernetes 配置，返回使用该配置的 ApiClient。"""
         try:
             if kubeconfig_path:
-                config.load_kube_config(config_file=kubeconfig_path)
+                return config.new_client_from_config(config_file=kubeconfig_path)
             elif kubeconfig_content:
                 # 如果提供了 kubeconfig 内容，则从内容加载
                 import yaml
                 kubeconfig_dict = yaml.safe_load(kubeconfig_content)
-                config.load_kube_config_from_dict(kubeconfig_dict)
+                return config.new_client_from_config_dict(kubeconfig_dict)
             else:
-                config.load_kube_config() # 尝试从默认路径加载
+                return config.new_client_from_config() # 尝试从默认路径加载
         except config.config_exception.ConfigException as e_kubeconfig:
             print(f"无法从 kubeconfig 文件加载配置: {e_kubeconfig}")
             try:
-                config.load_incluster_config() # 尝试从集群内服务账户加载
+                configuration = client.Configuration()
+                config.load_incluster_config(client_configuration=configuration) # 尝试从集群内服务账户加载
                 print("已成功从集群内配置加载。")
+                return client.ApiClient(configuration)
             except config.config_exception.ConfigException as e_incluster:
                 raise ConnectionError(
                     f"无法加载 Kubernetes 配置。请检查 kubeconfig 或集群内配置。\n"
@@ -56,16 +220,20 @@ class K8sClient:
         return {k: v for k, v in params.items() if v is not None}
 
     def _get_k8s_server_version(self) -> str:
-        """获取 Kubernetes 集群的版本信息。"""
+        """获取 Kubernetes 集群的版本信息，优先使用API发现缓存中的版本，避免每次请求 /version。"""
         try:
-            version_api = client.VersionApi()
-            version_info = version_api.get_code()
-            # 返回主版本号，如 "1.25", "1.26" 等
-            return f"{version_info.major}.{version_info.minor}"
+            version_info = (self._dynamic_client.version or {}).get('kubernetes') or {}
+            major, minor = version_info.get('major'), version_info.get('minor')
+            if not major or not minor:
+                code = client.VersionApi(self._api_client).get_code()
+                major, minor = code.major, code.minor
+            # 返回主版本号，如 "1.25", "1.26" 等；部分发行版的 minor 带有 "+" 后缀
+            return f"{re.sub(r'[^0-9]', '', str(major))}.{re.sub(r'[^0-9]', '', str(minor))}"
         except Exception as e:
             print(f"获取 Kubernetes 版本信息失败: {e}")
             # 默认假设为较新版本
             return "1.25"
+
     def _infer_kind_from_resource_type(self, resource_type: str) -> str:
         """
         根据资源类型（复数形式）推断对应的 Kind（单数形式）。
@@ -76,6 +244,29 @@ class K8sClient:
         Returns:
             str: 推断出的 Kind
         """
+        kind = self._lookup_kind(resource_type)
+        if kind:
+            return kind
+        
+        # 如果还是找不到，使用简单的规则转换，规则转换的结果不缓存，API发现恢复后可以查到真实的 Kind
+        # 去掉末尾的 's'，然后首字母大写
+        if resource_type.endswith('s') and len(resource_type) > 1:
+            kind = resource_type[:-1].capitalize()
+            # 处理一些特殊情况
+            if kind.endswith('ie'):
+                kind = kind[:-2] + 'y'  # policies -> policy -> Policy
+            elif kind.endswith('sse'):
+                kind = kind[:-1]  # classes -> classe -> class -> Class
+            return kind
+        else:
+            # 如果没有找到合适的映射，返回原始资源类型的大写形式
+            return resource_type.capitalize()
+        
+    @_cluster_memoize("kind")
+    def _lookup_kind(self, resource_type: str) -> Optional[str]:
+        """
+        通过内置映射或 API 发现查找资源类型对应的 Kind，找不到时返回 None。
+        """
         # 常见的复数到单数的映射
         resource_kind_mapping = {
             # Core API resources
@@ -161,21 +352,9 @@ class K8sClient:
                 return api_resource.kind
         except Exception:
             pass
+        return None
         
-        # 如果还是找不到，使用简单的规则转换
-        # 去掉末尾的 's'，然后首字母大写
-        if resource_type.endswith('s') and len(resource_type) > 1:
-            kind = resource_type[:-1].capitalize()
-            # 处理一些特殊情况
-            if kind.endswith('ie'):
-                kind = kind[:-2] + 'y'  # policies -> policy -> Policy
-            elif kind.endswith('sse'):
-                kind = kind[:-1]  # classes -> classe -> class -> Class
-            return kind
-        else:
-            # 如果没有找到合适的映射，返回原始资源类型的大写形式
-            return resource_type.capitalize()
-        
+    @_cluster_memoize("api_version")
     def _infer_api_version(self, resource_type: str) -> str:
         """
         根据资源类型和 Kubernetes 版本推断 API 版本。
@@ -317,9 +496,8 @@ class K8sClient:
                 keys = path.split('.')
                 value = obj
                 for key in keys:
-                    if isinstance(value, dict):
-                        value = value.get(key)
-                    else:
+                    value = _field_get(value, key)
+                    if value is None:
                         return None
                 return value
             except (KeyError, TypeError, AttributeError):
@@ -362,7 +540,7 @@ class K8sClient:
         """
         try:
             parts = field_path.split('.')
-            current = obj.to_dict() if hasattr(obj, 'to_dict') else obj
+            current = obj if isinstance(obj, ResourceField) or not hasattr(obj, 'to_dict') else obj.to_dict()
 
             for part in parts:
                 if '[' in part and ']' in part:
@@ -371,7 +549,7 @@ class K8sClient:
                     index_str = part.split('[')[1].rstrip(']')
                     
                     if field_name:
-                        current = current.get(field_name)
+                        current = _field_get(current, field_name)
                     
                     if current and isinstance(current, list):
                         try:
@@ -380,9 +558,8 @@ class K8sClient:
                         except (ValueError, IndexError):
                             return None
                 else:
-                    if isinstance(current, dict):
-                        current = current.get(part)
-                    else:
+                    current = _field_get(current, part)
+                    if current is None:
                         return None
 
             return current
@@ -526,8 +703,8 @@ class K8sClient:
                 # 标签搜索，如 label.app=nginx
                 label_key = key[6:]  # 去掉 "label." 前缀
                 labels = self._get_nested_field_value(item, 'metadata.labels')
-                if labels and isinstance(labels, dict):
-                    label_value = labels.get(label_key)
+                if labels:
+                    label_value = _field_get(labels, label_key)
                     if label_value and str(label_value).lower() == value.lower():
                         match_found = True
             elif key.lower() == 'status':
@@ -638,6 +815,134 @@ class K8sClient:
         if 'kind' not in result or not result.get('kind'):
             result['kind'] = obj.get('kind', 'Pod')  # 默认值为 Pod
         return result
+    def _translate_search_terms(self, resource_type: str, search_terms: Optional[List[str]]) -> tuple:
+        """
+        将搜索条件尽量转换为服务端选择器，减少apiserver返回的数据量。
+
+        - label.xxx=yyy 转换为 labelSelector xxx=yyy（服务端为精确匹配，区分大小写）
+        - Pod 的 phase=yyy 转换为 fieldSelector status.phase=Yyy
+        - 其余条件（name 模糊匹配、status、image 等）仍在客户端过滤
+
+        Returns:
+            tuple: (标签选择器列表, 字段选择器列表, 客户端过滤条件 [(key, value)])
+        """
+        label_selectors, field_selectors, client_terms = [], [], []
+        for term in search_terms or []:
+            term = term.strip()
+            if not term:
+                continue
+            if '=' not in term:
+                # 如果没有 '=', 则默认按 name 过滤
+                client_terms.append(('name', term))
+                continue
+            key, value = (part.strip() for part in term.split('=', 1))
+            if key.lower().startswith('label.') and LABEL_KEY_PATTERN.match(key[6:]) and LABEL_VALUE_PATTERN.match(value):
+                label_selectors.append(f"{key[6:]}={value}")
+            elif key.lower() == 'phase' and resource_type.lower() in ('pods', 'pod') and value.isalpha():
+                field_selectors.append(f"status.phase={value.capitalize()}")
+            else:
+                client_terms.append((key, value))
+        return label_selectors, field_selectors, client_terms
+
+    def _join_selectors(self, selector: Optional[str], extra_selectors: List[str]) -> Optional[str]:
+        """合并调用方传入的选择器与由搜索条件转换得到的选择器"""
+        selectors = ([selector] if selector else []) + extra_selectors
+        return ",".join(selectors) if selectors else None
+
+    def _list_raw_resources(self, resource_client, namespace: Optional[str], params: Dict[str, Any]):
+        """执行一次 LIST，返回 dynamic client 的原始结果，不做字典转换"""
+        if namespace:
+            return resource_client.get(namespace=namespace, **self._filter_none_params(params))
+        return resource_client.get(**self._filter_none_params(params))
+
+    def _build_k8s_list_metadata(self, resource_list) -> Dict[str, Any]:
+        """构建K8s原生列表元数据"""
+        metadata = getattr(resource_list, 'metadata', None)
+        return {
+            'continue': getattr(metadata, 'continue', None) if metadata else None,
+            'remainingItemCount': getattr(metadata, 'remainingItemCount', None) if metadata else None,
+            'resourceVersion': getattr(metadata, 'resourceVersion', None) if metadata else None
+        }
+
+    def _walk_continue_token(self, resource_client, cache_key: tuple, namespace: Optional[str],
+                             params: Dict[str, Any], page: int, page_size: int) -> Optional[str]:
+        """
+        从第一页开始逐页向后获取 continue token，直到目标页。
+        中间页仍是完整的一页 LIST，只从中取 continue token，不转换对象；每一页的 token 都记录到缓存中，后续按页码跳转时直接使用。
+        返回 None 表示目标页已超出资源总数。
+        """
+        token = None
+        for current_page in range(1, page):
+            resource_list = self._list_raw_resources(resource_client, namespace, dict(params, limit=page_size, _continue=token))
+            token = self._build_k8s_list_metadata(resource_list)['continue']
+            if not token:
+                return None
+            k8s_list_snapshot_cache.put_continue_token(cache_key, page_size, current_page + 1, token)
+        return token
+
+    def _list_resource_page(self, resource_client, cache_key: tuple, namespace: Optional[str], params: Dict[str, Any],
+                            page: int, page_size: int, continue_token: Optional[str]) -> Dict[str, Any]:
+        """
+        服务端分页：通过 limit + continue 只向apiserver请求当前页，只转换当前页的对象。
+        未提供 continue_token 时使用缓存中记录的该页 token，没有记录则从第一页逐页获取。
+        """
+        page = max(page, 1)
+        items, k8s_metadata = [], {'continue': None, 'remainingItemCount': None, 'resourceVersion': None}
+        for attempt in range(2):
+            token = continue_token
+            if not token and page > 1:
+                token = k8s_list_snapshot_cache.get_continue_token(cache_key, page_size, page)
+                if not token:
+                    token = self._walk_continue_token(resource_client, cache_key, namespace, params, page, page_size)
+                    if not token:
+                        break
+            try:
+                resource_list = self._list_raw_resources(resource_client, namespace, dict(params, limit=page_size, _continue=token))
+            except ApiException as e:
+                # continue token 过期（410 Gone）时丢弃已记录的token，从第一页重新获取一次
+                if e.status != 410 or attempt > 0 or page == 1:
+                    raise
+                k8s_list_snapshot_cache.invalidate(cache_key)
+                continue_token = None
+                continue
+            items = resource_list.items if hasattr(resource_list, 'items') and resource_list.items else []
+            k8s_metadata = self._build_k8s_list_metadata(resource_list)
+            break
+
+        next_token = k8s_metadata['continue']
+        if next_token:
+            k8s_list_snapshot_cache.put_continue_token(cache_key, page_size, page + 1, next_token)
+
+        start_index = (page - 1) * page_size
+        remaining = k8s_metadata['remainingItemCount']
+        if remaining is not None:
+            total_count = start_index + len(items) + int(remaining)
+        elif not next_token:
+            total_count = start_index + len(items)
+        else:
+            # 带选择器的查询apiserver不返回剩余数量，总数未知
+            total_count = None
+        pagination_metadata = {
+            'current_page': page,
+            'page_size': page_size,
+            'total_count': total_count,
+            'total_pages': (total_count + page_size - 1) // page_size if total_count is not None else None,
+            'has_previous': page > 1,
+            'has_next': bool(next_token),
+            'previous_page': page - 1 if page > 1 else None,
+            'next_page': page + 1 if next_token else None,
+            'start_index': start_index + 1 if items else 0,
+            'end_index': start_index + len(items),
+            'continue': next_token
+        }
+        return {
+            'items': [self._convert_k8s_object_to_dict(item) for item in items],
+            'pagination': pagination_metadata,
+            'k8s_metadata': k8s_metadata,
+            'total_count_before_pagination': total_count,
+            'total_count_from_server': len(items)
+        }
+
     def list_resource(
             self,
             resource_type: str,
@@ -652,72 +957,76 @@ class K8sClient:
             sort_by: Optional[str] = None,
             sort_order: str = "asc",
             search_terms: Optional[List[str]] = None,
+            server_side: bool = False,
+            resource_version: Optional[str] = None,
         ) -> Dict[str, Any]:
+        """
+        查询资源列表，支持过滤、排序与分页。
+
+        - 可转换的搜索条件（标签、Pod phase）下推为服务端选择器
+        - server_side=True 且没有排序和客户端过滤条件时，使用 limit + continue 做服务端分页
+        - 其余情况做一次全量LIST，结果作为快照缓存一段时间；只有翻页请求传入前一页返回的
+          resource_version 时才复用该版本的快照，不传时总是重新LIST，避免写操作后读到旧数据
+        - 只对当前页返回的对象做字典转换
+        """
         #根据资源类型组织不同的filter
         try:
             if not api_version:
                 api_version = self._infer_api_version(resource_type)
+            kind = self._infer_kind_from_resource_type(resource_type)
+            resource_client = self._dynamic_client.resources.get(api_version=api_version, kind=kind)
 
-            resource_client = self._dynamic_client.resources.get(api_version=api_version, kind=self._infer_kind_from_resource_type(resource_type))
+            extra_label_selectors, extra_field_selectors, client_terms = self._translate_search_terms(resource_type, search_terms)
+            label_selector = self._join_selectors(label_selector, extra_label_selectors)
+            field_selector = self._join_selectors(field_selector, extra_field_selectors)
+            page = int(page or 1)
+            page_size = int(page_size or 10)
+            cache_key = (self._cluster_identity, api_version, kind, namespace, label_selector, field_selector)
 
             # 构建查询参数
             params = {
                 'label_selector': label_selector,
                 'field_selector': field_selector,
-                'limit': limit,
-                '_continue': continue_token
             }
-
-            # 执行查询
-            if namespace:
-                resource_list = resource_client.get(namespace=namespace, **self._filter_none_params(params))
+            if server_side and not sort_by and not client_terms:
+                return self._list_resource_page(resource_client, cache_key, namespace, params, page, page_size, continue_token)
+
+            params.update({'limit': limit, '_continue': continue_token})
+            # 调用方自行指定 limit/continue 时结果不完整，不使用快照；未传入 resource_version 的请求重新LIST并刷新快照
+            use_snapshot = not limit and not continue_token
+            snapshot = k8s_list_snapshot_cache.get_snapshot(cache_key, resource_version) \
+                if use_snapshot and resource_version else None
+            if snapshot:
+                snapshot_version, items = snapshot
+                k8s_metadata = {'continue': None, 'remainingItemCount': None, 'resourceVersion': snapshot_version}
             else:
-                resource_list = resource_client.get(**self._filter_none_params(params))
+                resource_list = self._list_raw_resources(resource_client, namespace, params)
+                items = list(resource_list.items) if hasattr(resource_list, 'items') and resource_list.items else []
+                k8s_metadata = self._build_k8s_list_metadata(resource_list)
+                if use_snapshot:
+                    k8s_list_snapshot_cache.put_snapshot(cache_key, k8s_metadata['resourceVersion'], items)
 
-            # 获取资源列表
-            items = resource_list.items if hasattr(resource_list, 'items') else []
-            
-            # 转换为字典格式
-            items_dict = []
-            for item in items:
-               items_dict.append(self._convert_k8s_object_to_dict(item))
-               
-            
-           # 应用多个自定义过滤器
-            if search_terms:
-                for term in search_terms:
-                    # 这里假设 term 是一个简单的字符串，可以是字段名或值
-                    if '=' in term:
-                        key, value = term.split('=', 1)
-                        items_dict = self._filter_by_key_value(items, key.strip(), value.strip())
-                    else:
-                        # 如果没有 '=', 则默认按 name 过滤
-                        items_dict = self._filter_by_key_value(items, 'name', term.strip())
-                #result['total_count'] = len(result['items'])
+            # 应用多个自定义过滤器，直接作用于原始对象，条件之间为“与”关系
+            filtered_items = items
+            for key, value in client_terms:
+                filtered_items = self._filter_by_key_value(filtered_items, key, value)
 
             # 应用排序
             if sort_by:
-                items_dict = self._sort_resources(items_dict, sort_by, sort_order)
+                filtered_items = self._sort_resources(filtered_items, sort_by, sort_order)
             # 应用客户端分页
-            paginated_items, pagination_metadata = self._paginate_items(items_dict, page, page_size)
+            paginated_items, pagination_metadata = self._paginate_items(filtered_items, page, page_size)
 
-            # 构建K8s原生元数据
-            k8s_metadata = {
-                'continue': getattr(resource_list.metadata, 'continue', None) if hasattr(resource_list, 'metadata') else None,
-                'remainingItemCount': getattr(resource_list.metadata, 'remainingItemCount', None) if hasattr(resource_list, 'metadata') else None,
-                'resourceVersion': getattr(resource_list.metadata, 'resourceVersion', None) if hasattr(resource_list, 'metadata') else None
-            }
-            # 构建完整响应
+            # 构建完整响应，只转换当前页的对象
             result = {
-                'items': paginated_items,
+                'items': [self._convert_k8s_object_to_dict(item) for item in paginated_items],
                 'pagination': pagination_metadata,
                 'k8s_metadata': k8s_metadata,
-                'total_count_before_pagination': len(items_dict),  # 过滤和排序后但分页前的总数
+                'total_count_before_pagination': len(filtered_items),  # 过滤和排序后但分页前的总数
                 'total_count_from_server': len(items)  # 从服务器获取的原始总数
             }
 
             return result
-
         except ApiException as e:
             print(f"查询 Kubernetes 资源 '{resource_type}' (API Version: {api_version}) 时发生 API 错误: {e}")
             return {
@@ -1139,4 +1448,56 @@ class K8sClient:
             raise e
         except Exception as e:
             print(f"创建 Kubernetes 资源 '{resource_type}' 时发生未知错误: {e}")
-            raise e
\ No newline at end of file
+            raise e
+
+class K8sClientCache:
+    """按 kubeconfig 缓存 K8sClient 实例，同一集群的请求复用已完成API发现的客户端"""
+
+    def __init__(self, ttl: int = K8S_CLIENT_CACHE_TTL, max_size: int = K8S_CLIENT_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._clients = OrderedDict()
+
+    def get_client(self, kubeconfig_content: str) -> K8sClient:
+        cache_key = hashlib.sha256(kubeconfig_content.encode("utf-8")).hexdigest()
+        with self._lock:
+            entry = self._clients.get(cache_key)
+            if entry and time.monotonic() - entry[0] <= self.ttl:
+                self._clients.move_to_end(cache_key)
+                return entry[1]
+        # 创建客户端可能需要做API发现，不在锁内执行，避免阻塞其他集群的请求
+        k8s_client = K8sClient(kubeconfig_content=kubeconfig_content)
+        evicted = []
+        with self._lock:
+            entry = self._clients.get(cache_key)
+            if entry and entry[1] is not k8s_client:
+                evicted.append(entry[1])
+            self._clients[cache_key] = (time.monotonic(), k8s_client)
+            self._clients.move_to_end(cache_key)
+            while len(self._clients) > self.max_size:
+                evicted.append(self._clients.popitem(last=False)[1][1])
+        # 被替换（过期）或按 LRU 淘汰的客户端在锁外关闭连接池
+        for old_client in evicted:
+            self._close(old_client)
+        return k8s_client
+
+    def invalidate(self, kubeconfig_content: str):
+        cache_key = hashlib.sha256(kubeconfig_content.encode("utf-8")).hexdigest()
+        with self._lock:
+            entry = self._clients.pop(cache_key, None)
+        if entry:
+            self._close(entry[1])
+        k8s_resource_mapping_cache.invalidate(cache_key)
+
+    @staticmethod
+    def _close(k8s_client: K8sClient):
+        """关闭被淘汰的 K8sClient 的 ApiClient 连接池，正在使用该客户端的请求会在下次调用时重新建立连接"""
+        try:
+            k8s_client._api_client.close()
+        except Exception as e:
+            print(f"关闭k8s api client失败: {e}")
+
+
+# 进程内共享的 K8sClient 缓存
+k8s_client_cache = K8sClientCache()
@@ -0,0 +1,284 @@
+# k8s资源的informer：LIST + WATCH 维护本地缓存，替代周期性的全量LIST
+import threading
+from typing import Callable, Dict, Optional
+
+from kubernetes import watch
+from kubernetes.client import ApiException
+from oslo_log import log
+
+from dingo_command.utils.constant import RESOURCE_TYPE, AI_INSTANCE
+from dingo_command.utils.k8s_client import get_k8s_core_client, get_k8s_app_client
+
+LOG = log.getLogger(__name__)
+
+# 容器实例资源的标签
+AI_INSTANCE_LABEL_SELECTOR = f"{RESOURCE_TYPE}={AI_INSTANCE}"
+
+
+def _object_key(namespace, name):
+    return f"{namespace}/{name}"
+
+
+class K8sInformer:
+    """
+    reflector 风格的资源 informer
+
+    先分页 LIST 全量数据并记录 resourceVersion，再从该版本开始 WATCH 增量事件，
+    维护以 namespace/name 为主键的本地缓存，并按 indexers 建立二级索引；
+    WATCH 返回 410 Gone 时重新 LIST。
+    """
+
+    def __init__(self, name: str, list_func_provider: Callable, label_selector: str = None,
+                 indexers: Dict[str, Callable] = None, page_size: int = 500, watch_timeout: int = 300):
+        """
+        :param name: informer 名称，用于日志
+        :param list_func_provider: 返回 list_xxx_for_all_namespaces 方法的函数，每次重连时调用以获取最新的client
+        :param label_selector: 标签选择器
+        :param indexers: 索引名称 -> 从对象中提取索引值的函数
+        :param page_size: LIST 分页大小
+        :param watch_timeout: 单次 WATCH 的超时时间（秒）
+        """
+        self.name = name
+        self.list_func_provider = list_func_provider
+        self.label_selector = label_selector
+        self.indexers = indexers or {}
+        self.page_size = page_size
+        self.watch_timeout = watch_timeout
+        self._lock = threading.RLock()
+        self._items = {}
+        self._indices = {index_name: {} for index_name in self.indexers}
+        self._handlers = {}
+        self._resource_version = None
+        self._synced = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._watch = None
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name=f"informer-{self.name}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._watch:
+            self._watch.stop()
+
+    def has_synced(self) -> bool:
+        return self._synced.is_set()
+
+    def wait_for_sync(self, timeout: float = None) -> bool:
+        return self._synced.wait(timeout)
+
+    def add_event_handler(self, handler_name: str, handler: Callable):
+        """
+        注册事件处理函数，同名处理函数只保留一个
+        handler(event_type, obj, old_obj)，event_type 为 ADDED/MODIFIED/DELETED
+        """
+        with self._lock:
+            self._handlers[handler_name] = handler
+
+    def get(self, namespace: str, name: str):
+        with self._lock:
+            return self._items.get(_object_key(namespace, name))
+
+    def list(self, namespace: str = None) -> list:
+        with self._lock:
+            if namespace:
+                return [obj for obj in self._items.values() if obj.metadata.namespace == namespace]
+            return list(self._items.values())
+
+    def by_index(self, index_name: str, index_value) -> list:
+        with self._lock:
+            keys = self._indices.get(index_name, {}).get(index_value, ())
+            return [self._items[key] for key in keys]
+
+    def _run(self):
+        backoff = 1
+        while not self._stopped.is_set():
+            try:
+                if self._resource_version is None:
+                    self._list()
+                self._watch_once()
+                backoff = 1
+            except ApiException as e:
+                if e.status == 410:
+                    LOG.info(f"informer[{self.name}] resource version {self._resource_version} expired, relist")
+                    self._resource_version = None
+                    continue
+                LOG.error(f"informer[{self.name}] watch failed: {e.status} {e.reason}")
+                self._sleep_backoff(backoff)
+                backoff = min(backoff * 2, 60)
+            except Exception as e:
+                LOG.error(f"informer[{self.name}] watch failed: {str(e)}")
+                self._sleep_backoff(backoff)
+                backoff = min(backoff * 2, 60)
+
+    def _sleep_backoff(self, seconds):
+        self._stopped.wait(seconds)
+
+    def _list(self):
+        list_func = self.list_func_provider()
+        new_items = {}
+        continue_token = None
+        while True:
+            resp = list_func(label_selector=self.label_selector, limit=self.page_size, _continue=continue_token)
+            for obj in resp.items:
+                new_items[_object_key(obj.metadata.namespace, obj.metadata.name)] = obj
+            continue_token = resp.metadata._continue
+            if not continue_token:
+                break
+
+        with self._lock:
+            old_items = self._items
+            self._items = new_items
+            self._rebuild_indices()
+            self._resource_version = resp.metadata.resource_version
+            notify = self.has_synced()
+        self._synced.set()
+        LOG.info(f"informer[{self.name}] listed {len(new_items)} objects at resource version {self._resource_version}")
+
+        # 首次同步不触发事件，重新LIST时按差异补发事件
+        if notify:
+            for key, obj in new_items.items():
+                old_obj = old_items.get(key)
+                if old_obj is None:
+                    self._dispatch("ADDED", obj, None)
+                elif old_obj.metadata.resource_version != obj.metadata.resource_version:
+                    self._dispatch("MODIFIED", obj, old_obj)
+            for key, old_obj in old_items.items():
+                if key not in new_items:
+                    self._dispatch("DELETED", old_obj, old_obj)
+
+    def _watch_once(self):
+        self._watch = watch.Watch()
+        try:
+            for event in self._watch.stream(self.list_func_provider(),
+                                            label_selector=self.label_selector,
+                                            resource_version=self._resource_version,
+                                            timeout_seconds=self.watch_timeout,
+                                            allow_watch_bookmarks=True):
+                if self._stopped.is_set():
+                    break
+                event_type = event["type"]
+                if event_type == "ERROR":
+                    raw_object = event.get("raw_object") or {}
+                    if raw_object.get("code") == 410:
+                        self._resource_version = None
+                        return
+                    raise RuntimeError(f"watch error event: {raw_object}")
+                if event_type == "BOOKMARK":
+                    raw_object = event.get("raw_object") or {}
+                    self._resource_version = raw_object.get("metadata", {}).get("resourceVersion", self._resource_version)
+                    continue
+                self._apply(event_type, event["object"])
+        finally:
+            self._watch.stop()
+
+    def _apply(self, event_type, obj):
+        key = _object_key(obj.metadata.namespace, obj.metadata.name)
+        with self._lock:
+            old_obj = self._items.get(key)
+            if old_obj is not None:
+                self._remove_from_indices(key, old_obj)
+            if event_type == "DELETED":
+                self._items.pop(key, None)
+            else:
+                self._items[key] = obj
+                self._add_to_indices(key, obj)
+            self._resource_version = obj.metadata.resource_version
+        self._dispatch(event_type, obj, old_obj)
+
+    def _dispatch(self, event_type, obj, old_obj):
+        with self._lock:
+            handlers = list(self._handlers.items())
+        for handler_name, handler in handlers:
+            try:
+                handler(event_type, obj, old_obj)
+            except Exception as e:
+                LOG.error(f"informer[{self.name}] handler[{handler_name}] failed: {str(e)}")
+
+    def _rebuild_indices(self):
+        self._indices = {index_name: {} for index_name in self.indexers}
+        for key, obj in self._items.items():
+            self._add_to_indices(key, obj)
+
+    def _add_to_indices(self, key, obj):
+        for index_name, index_func in self.indexers.items():
+            index_value = index_func(obj)
+            if index_value is not None:
+                self._indices[index_name].setdefault(index_value, set()).add(key)
+
+    def _remove_from_indices(self, key, obj):
+        for index_name, index_func in self.indexers.items():
+            index_value = index_func(obj)
+            keys = self._indices[index_name].get(index_value)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    self._indices[index_name].pop(index_value, None)
+
+
+def _pod_node_name(pod):
+    return pod.spec.node_name if pod.spec else None
+
+
+class AiInstanceInformerManager:
+    """按 k8s_id 管理容器实例 Pod 与 StatefulSet 的 informer"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pod_informers = {}
+        self._sts_informers = {}
+
+    def get_pod_informer(self, k8s_id: str) -> K8sInformer:
+        with self._lock:
+            informer = self._pod_informers.get(k8s_id)
+            if informer is None:
+                informer = K8sInformer(
+                    name=f"{k8s_id}-pods",
+                    list_func_provider=lambda: get_k8s_core_client(k8s_id).list_pod_for_all_namespaces,
+                    label_selector=AI_INSTANCE_LABEL_SELECTOR,
+                    indexers={"node": _pod_node_name}
+                )
+                self._pod_informers[k8s_id] = informer
+        informer.start()
+        return informer
+
+    def get_sts_informer(self, k8s_id: str) -> K8sInformer:
+        with self._lock:
+            informer = self._sts_informers.get(k8s_id)
+            if informer is None:
+                informer = K8sInformer(
+                    name=f"{k8s_id}-statefulsets",
+                    list_func_provider=lambda: get_k8s_app_client(k8s_id).list_stateful_set_for_all_namespaces,
+                    label_selector=AI_INSTANCE_LABEL_SELECTOR
+                )
+                self._sts_informers[k8s_id] = informer
+        informer.start()
+        return informer
+
+    def get_synced_pod_informer(self, k8s_id: str) -> Optional[K8sInformer]:
+        """返回已完成首次同步的 Pod informer，未同步完成时返回None，调用方应回退到apiserver查询"""
+        informer = self.get_pod_informer(k8s_id)
+        return informer if informer.has_synced() else None
+
+    def get_synced_sts_informer(self, k8s_id: str) -> Optional[K8sInformer]:
+        """返回已完成首次同步的 StatefulSet informer，未同步完成时返回None"""
+        informer = self.get_sts_informer(k8s_id)
+        return informer if informer.has_synced() else None
+
+    def stop(self, k8s_id: str):
+        """集群被移除时停止对应的informer"""
+        with self._lock:
+            informers = [self._pod_informers.pop(k8s_id, None), self._sts_informers.pop(k8s_id, None)]
+        for informer in informers:
+            if informer:
+                informer.stop()
+
+
+# 进程内共享的informer管理器
+ai_instance_informer_manager = AiInstanceInformerManager()
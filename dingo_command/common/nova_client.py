@@ -87,6 +87,27 @@ class NovaClient:
             raise Exception(f"nova请求失败: {response.text}")
         return response.json()['servers']
 
+    # 分页查询所有虚拟机详情，changes_since不为空时只返回该时间之后变化的虚拟机（包含已删除的）
+    def nova_list_servers_detail(self, all_tenants=True, changes_since=None, limit=1000):
+        endpoint = self.get_service_endpoint('compute')
+        params = {"limit": limit}
+        if all_tenants:
+            params["all_tenants"] = 1
+        if changes_since:
+            params["changes-since"] = changes_since
+        servers = []
+        while True:
+            response = self.session.get(f"{endpoint}/servers/detail", params=params)
+            if response.status_code != 200:
+                raise Exception(f"nova列表请求失败: {response.text}")
+            data = response.json()
+            servers.extend(data['servers'])
+            # 存在下一页的链接时以本页最后一个虚拟机为marker继续查询
+            has_next = any(link.get('rel') == 'next' for link in data.get('servers_links', []))
+            if not has_next or not data['servers']:
+                return servers
+            params["marker"] = data['servers'][-1]['id']
+
     # 虚拟机详情
     def nova_get_server_detail(self, server_id):
         endpoint = self.get_service_endpoint('compute')
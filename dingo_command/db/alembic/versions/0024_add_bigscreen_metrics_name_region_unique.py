@@ -0,0 +1,32 @@
+"""add unique key on ops_bigscreen_metrics name and region
+
+Revision ID: 0024
+Revises: 0023
+Create Date: 2026-10-17 10:12:31.418207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0024'
+down_revision: Union[str, None] = '0023'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 清理同一指标同一region的重复数据，保留最近修改的一条
+    op.execute(
+        "DELETE m1 FROM ops_bigscreen_metrics m1 "
+        "JOIN ops_bigscreen_metrics m2 ON m1.name = m2.name AND m1.region = m2.region "
+        "AND (m1.last_modified < m2.last_modified OR (m1.last_modified <=> m2.last_modified AND m1.id < m2.id))"
+    )
+    # 指标名称和region的唯一键，用于批量 INSERT ... ON DUPLICATE KEY UPDATE
+    op.create_unique_constraint('uk_ops_bigscreen_metrics_name_region', 'ops_bigscreen_metrics', ['name', 'region'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uk_ops_bigscreen_metrics_name_region', 'ops_bigscreen_metrics', type_='unique')
@@ -0,0 +1,63 @@
+"""add stored generated columns for asset extra keys and asset list indexes
+
+Revision ID: 0025
+Revises: 0024
+Create Date: 2026-10-17 15:40:12.503117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0025'
+down_revision: Union[str, None] = '0024'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 资产列表按extra中的key查询，提升为存储的生成列：列名 -> json路径
+ASSET_EXTRA_GENERATED_COLUMNS = {
+    "extra_host_name": "$.host_name",
+    "extra_ip": "$.ip",
+    "extra_idrac": "$.idrac",
+    "extra_use_to": "$.use_to",
+    "extra_operate_system": "$.operate_system",
+}
+
+# 资产关联表的asset_id索引，资产列表联表与配件查询使用
+ASSET_ID_INDEX_TABLES = [
+    "ops_assets_parts_info",
+    "ops_assets_manufactures_relations_info",
+    "ops_assets_positions_info",
+    "ops_assets_contracts_info",
+    "ops_assets_belongs_info",
+    "ops_assets_customers_info",
+    "ops_assets_resources_relations_info",
+]
+
+
+def upgrade() -> None:
+    for column_name, json_path in ASSET_EXTRA_GENERATED_COLUMNS.items():
+        # extra是text类型，非法json时生成列为NULL，避免历史脏数据导致写入失败
+        op.add_column("ops_assets_basic_info", sa.Column(
+            column_name, sa.String(length=255),
+            sa.Computed(f"left(if(json_valid(extra), json_unquote(json_extract(extra, '{json_path}')), NULL), 255)", persisted=True),
+            nullable=True))
+        op.create_index(f"ix_ops_assets_basic_info_{column_name}", "ops_assets_basic_info", [column_name], unique=False)
+    # 列表默认排序与游标分页
+    op.create_index("ix_ops_assets_basic_info_create_date_id", "ops_assets_basic_info", ["create_date", "id"], unique=False)
+    for table_name in ASSET_ID_INDEX_TABLES:
+        op.create_index(f"ix_{table_name}_asset_id", table_name, ["asset_id"], unique=False)
+    # 配件按类型过滤
+    op.create_index("ix_ops_assets_parts_info_part_type_asset_id", "ops_assets_parts_info", ["part_type", "asset_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ops_assets_parts_info_part_type_asset_id", table_name="ops_assets_parts_info")
+    for table_name in ASSET_ID_INDEX_TABLES:
+        op.drop_index(f"ix_{table_name}_asset_id", table_name=table_name)
+    op.drop_index("ix_ops_assets_basic_info_create_date_id", table_name="ops_assets_basic_info")
+    for column_name in ASSET_EXTRA_GENERATED_COLUMNS:
+        op.drop_index(f"ix_ops_assets_basic_info_{column_name}", table_name="ops_assets_basic_info")
+        op.drop_column("ops_assets_basic_info", column_name)
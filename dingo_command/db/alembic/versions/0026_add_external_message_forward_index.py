@@ -0,0 +1,27 @@
+"""add index on ops_external_message for keyset forwarding
+
+Revision ID: 0026
+Revises: 0025
+Create Date: 2026-10-17 17:05:48.271943
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0026'
+down_revision: Union[str, None] = '0025'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 按类型、状态过滤并按 (create_date, id) 游标读取待转发的消息
+    op.create_index('ix_ops_external_message_type_status_create_date_id', 'ops_external_message',
+                    ['message_type', 'message_status', 'create_date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ops_external_message_type_status_create_date_id', table_name='ops_external_message')
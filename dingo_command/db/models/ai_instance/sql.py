@@ -73,6 +73,13 @@ class AiInstanceSQL:
         with (session.begin()):
             return session.query(AiInstanceInfo).filter(AiInstanceInfo.id == id).first()
 
+    @classmethod
+    def get_ai_instance_info_by_k8s_id_and_real_name(cls, k8s_id, instance_real_name):
+        session = get_session()
+        with session.begin():
+            return session.query(AiInstanceInfo).filter(AiInstanceInfo.instance_k8s_id == k8s_id,
+                                                         AiInstanceInfo.instance_real_name == instance_real_name).first()
+
     @classmethod
     def list_ai_instance_info_by_k8s_id(cls, k8s_id):
         session = get_session()
@@ -192,6 +199,17 @@ class AiInstanceSQL:
         with (session.begin()):
             session.merge(k8s_node_resource_db)
 
+    @classmethod
+    def save_k8s_node_resource_list(cls, k8s_node_resource_list):
+        session = get_session()
+        try:
+            with session.begin():
+                # 新增与更新在同一事务中批量提交
+                session.bulk_save_objects(k8s_node_resource_list, update_changed_only=True)
+        except Exception as e:
+            session.rollback()
+            raise
+
     @classmethod
     def list_instances_to_auto_stop(cls, now_time):
         session = get_session()
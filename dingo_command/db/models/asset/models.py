@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from sqlalchemy import Column, String, Text, DateTime, Integer, Boolean
+from sqlalchemy import Column, String, Text, DateTime, Integer, Boolean, Computed, Index
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -31,6 +31,14 @@ class AssetType(Base):
 # 资产基础信息对象
 class AssetBasicInfo(Base):
     __tablename__ = "ops_assets_basic_info"
+    __table_args__ = (
+        Index('ix_ops_assets_basic_info_extra_host_name', 'extra_host_name'),
+        Index('ix_ops_assets_basic_info_extra_ip', 'extra_ip'),
+        Index('ix_ops_assets_basic_info_extra_idrac', 'extra_idrac'),
+        Index('ix_ops_assets_basic_info_extra_use_to', 'extra_use_to'),
+        Index('ix_ops_assets_basic_info_extra_operate_system', 'extra_operate_system'),
+        Index('ix_ops_assets_basic_info_create_date_id', 'create_date', 'id'),
+    )
 
     id = Column(String(length=128), primary_key= True, nullable=False, index=True, unique=False)
     asset_type_id = Column(String(length=128), nullable=True)
@@ -47,11 +55,21 @@ class AssetBasicInfo(Base):
     extra = Column(Text)
     extend_column_extra = Column(Text)
     create_date = Column(DateTime, nullable=True)
+    # extra中常用查询key的存储生成列（带索引），由数据库维护，不需要写入
+    extra_host_name = Column(String(length=255), Computed("left(if(json_valid(extra), json_unquote(json_extract(extra, '$.host_name')), NULL), 255)", persisted=True))
+    extra_ip = Column(String(length=255), Computed("left(if(json_valid(extra), json_unquote(json_extract(extra, '$.ip')), NULL), 255)", persisted=True))
+    extra_idrac = Column(String(length=255), Computed("left(if(json_valid(extra), json_unquote(json_extract(extra, '$.idrac')), NULL), 255)", persisted=True))
+    extra_use_to = Column(String(length=255), Computed("left(if(json_valid(extra), json_unquote(json_extract(extra, '$.use_to')), NULL), 255)", persisted=True))
+    extra_operate_system = Column(String(length=255), Computed("left(if(json_valid(extra), json_unquote(json_extract(extra, '$.operate_system')), NULL), 255)", persisted=True))
 
 
 # 资产设备的配件信息对象
 class AssetPartsInfo(Base):
     __tablename__ = "ops_assets_parts_info"
+    __table_args__ = (
+        Index('ix_ops_assets_parts_info_asset_id', 'asset_id'),
+        Index('ix_ops_assets_parts_info_part_type_asset_id', 'part_type', 'asset_id'),
+    )
 
     id = Column(String(length=128), primary_key= True, nullable=False, index=True, unique=False)
     asset_id = Column(String(length=128), nullable=True)
@@ -96,6 +114,7 @@ class AssetManufacturesInfo(Base):
 # 资产设备的厂商关联信息对象
 class AssetManufactureRelationInfo(Base):
     __tablename__ = "ops_assets_manufactures_relations_info"
+    __table_args__ = (Index('ix_ops_assets_manufactures_relations_info_asset_id', 'asset_id'),)
 
     id = Column(String(length=128), primary_key= True, nullable=False, index=True, unique=False)
     asset_id = Column(String(length=128), nullable=True)
@@ -105,6 +124,7 @@ class AssetManufactureRelationInfo(Base):
 # 资产设备的位置信息对象
 class AssetPositionsInfo(Base):
     __tablename__ = "ops_assets_positions_info"
+    __table_args__ = (Index('ix_ops_assets_positions_info_asset_id', 'asset_id'),)
 
     id = Column(String(length=128), primary_key= True, nullable=False, index=True, unique=False)
     asset_id = Column(String(length=128), nullable=True)
@@ -117,6 +137,7 @@ class AssetPositionsInfo(Base):
 # 资产设备的合同信息对象
 class AssetContractsInfo(Base):
     __tablename__ = "ops_assets_contracts_info"
+    __table_args__ = (Index('ix_ops_assets_contracts_info_asset_id', 'asset_id'),)
 
     id = Column(String(length=128), primary_key= True, nullable=False, index=True, unique=False)
     asset_id = Column(String(length=128), nullable=True)
@@ -129,6 +150,7 @@ class AssetContractsInfo(Base):
 # 资产设备的归属用户信息对象
 class AssetBelongsInfo(Base):
     __tablename__ = "ops_assets_belongs_info"
+    __table_args__ = (Index('ix_ops_assets_belongs_info_asset_id', 'asset_id'),)
 
     id = Column(String(length=128), primary_key= True, nullable=False, index=True, unique=False)
     asset_id = Column(String(length=128), nullable=True)
@@ -143,6 +165,7 @@ class AssetBelongsInfo(Base):
 # 资产设备的租户信息对象
 class AssetCustomersInfo(Base):
     __tablename__ = "ops_assets_customers_info"
+    __table_args__ = (Index('ix_ops_assets_customers_info_asset_id', 'asset_id'),)
 
     id = Column(String(length=128), primary_key= True, nullable=False, index=True, unique=False)
     asset_id = Column(String(length=128), nullable=True)
@@ -2,8 +2,12 @@
 
 from __future__ import annotations
 
+import base64
+import json
+from datetime import datetime
+
 from sqlalchemy.orm import aliased
-from sqlalchemy import func
+from sqlalchemy import func, select, distinct, or_, and_
 
 from dingo_command.db.engines.mysql import get_session
 from dingo_command.db.models.asset.models import AssetBasicInfo, AssetPartsInfo, AssetManufacturesInfo, AssetPositionsInfo, \
@@ -21,6 +25,25 @@ asset_dir_dic= {"asset_type":AssetBasicInfo.asset_type, "frame_position":AssetPo
                 "sn_number":AssetBasicInfo.asset_number, "department_name":AssetBelongsInfo.department_name, "user_name":AssetBelongsInfo.user_name, "manufacturer_name":AssetManufacturesInfo.name,
                 "resource_name":AssetResourceRelationInfo.resource_name, "resource_status":AssetResourceRelationInfo.resource_status, "resource_user_name": AssetResourceRelationInfo.resource_user_name,
                 "resource_project_name":AssetResourceRelationInfo.resource_project_name, "asset_relation_resource_flag": AssetBasicInfo.asset_relation_resource_flag}
+# 资产列表extra中key的查询参数 -> 生成列
+asset_extra_filter_dic = {"host_name": AssetBasicInfo.extra_host_name, "ip": AssetBasicInfo.extra_ip, "idrac": AssetBasicInfo.extra_idrac,
+                          "use_to": AssetBasicInfo.extra_use_to, "operate_system": AssetBasicInfo.extra_operate_system}
+# 资产列表配件查询参数 -> 配件类型，None表示不限类型
+asset_part_filter_dic = {"asset_part": None, "asset_part_cpu": "cpu", "asset_part_cpu_cores": "cpu_cores", "asset_part_data_disk": "data_disk",
+                         "asset_part_disk": "disk", "asset_part_gpu": "gpu", "asset_part_ib_card": "ib_card", "asset_part_memory": "memory",
+                         "asset_part_module": "module", "asset_part_nic": "nic"}
+
+
+def encode_asset_list_cursor(create_date, asset_id):
+    # 资产列表游标：当页最后一条资产的 (create_date, id)
+    value = json.dumps([create_date.isoformat() if create_date else None, asset_id])
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_asset_list_cursor(cursor):
+    create_date, asset_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    return (datetime.fromisoformat(create_date) if create_date else None), asset_id
+
 # 配件的所有列
 part_columns = [getattr(AssetPartsInfo, column.name).label(column.name) for column in AssetPartsInfo.__table__.columns]
 # 流的所有列
@@ -34,162 +57,181 @@ asset_part_dir_dic= {"asset_name":AssetBasicInfo.name,"name":AssetPartsInfo.name
 
 class AssetSQL:
 
+    @classmethod
+    def _asset_list_query(cls, session):
+        # 资产列表的查询语句，联表查询资产的厂商、位置、合同、归属、租户、资源信息
+        query = session.query(AssetBasicInfo.id.label("id"),
+                              AssetBasicInfo.name.label("name"),
+                              AssetBasicInfo.asset_type_id.label("asset_type_id"),
+                              AssetBasicInfo.asset_category.label("asset_category"),
+                              AssetBasicInfo.asset_type.label("asset_type"),
+                              AssetBasicInfo.equipment_number.label("equipment_number"),
+                              AssetBasicInfo.sn_number.label("sn_number"),
+                              AssetBasicInfo.asset_number.label("asset_number"),
+                              AssetBasicInfo.asset_status.label("asset_status"),
+                              AssetBasicInfo.asset_status_description.label("asset_status_description"),
+                              AssetBasicInfo.description.label("description"),
+                              AssetBasicInfo.extra.label("extra"),
+                              AssetBasicInfo.extend_column_extra.label("extend_column_extra"),
+                              AssetType.asset_type_name_zh.label("asset_type_name_zh"),
+                              AssetManufacturesInfo.id.label("manufacture_id"),
+                              AssetManufacturesInfo.name.label("manufacture_name"),
+                              AssetManufacturesInfo.description.label("manufacture_description"),
+                              AssetManufacturesInfo.extra.label("manufacture_extra"),
+                              AssetPositionsInfo.id.label("position_id"),
+                              AssetPositionsInfo.frame_position.label("position_frame_position"),
+                              AssetPositionsInfo.cabinet_position.label("position_cabinet_position"),
+                              AssetPositionsInfo.u_position.label("position_u_position"),
+                              AssetPositionsInfo.description.label("position_description"),
+                              AssetContractsInfo.id.label("contract_id"),
+                              AssetContractsInfo.contract_number.label("contract_number"),
+                              AssetContractsInfo.purchase_date.label("contract_purchase_date"),
+                              AssetContractsInfo.batch_number.label("contract_batch_number"),
+                              AssetContractsInfo.description.label("contract_description"),
+                              AssetBelongsInfo.id.label("belong_id"),
+                              AssetBelongsInfo.department_id.label("belong_department_id"),
+                              AssetBelongsInfo.department_name.label("belong_department_name"),
+                              AssetBelongsInfo.user_id.label("belong_user_id"),
+                              AssetBelongsInfo.user_name.label("belong_user_name"),
+                              AssetBelongsInfo.tel_number.label("belong_tel_number"),
+                              AssetBelongsInfo.description.label("belong_contract_description"),
+                              AssetCustomersInfo.id.label("customer_id"),
+                              AssetCustomersInfo.customer_id.label("customer_customer_id"),
+                              AssetCustomersInfo.customer_name.label("customer_customer_name"),
+                              AssetCustomersInfo.rental_duration.label("customer_rental_duration"),
+                              AssetCustomersInfo.start_date.label("customer_start_date"),
+                              AssetCustomersInfo.end_date.label("customer_end_date"),
+                              AssetCustomersInfo.vlan_id.label("customer_vlan_id"),
+                              AssetCustomersInfo.float_ip.label("customer_float_ip"),
+                              AssetCustomersInfo.band_width.label("customer_band_width"),
+                              AssetCustomersInfo.description.label("customer_description"),
+                              AssetResourceRelationInfo.resource_id.label("resource_id"),
+                              AssetResourceRelationInfo.resource_name.label("resource_name"),
+                              AssetResourceRelationInfo.resource_status.label("resource_status"),
+                              AssetResourceRelationInfo.resource_user_id.label("resource_user_id"),
+                              AssetResourceRelationInfo.resource_user_name.label("resource_user_name"),
+                              AssetResourceRelationInfo.resource_project_id.label("resource_project_id"),
+                              AssetResourceRelationInfo.resource_project_name.label("resource_project_name"),
+                              AssetBasicInfo.asset_relation_resource_flag.label("asset_relation_resource_flag"),
+                              AssetResourceRelationInfo.node_name.label("node_name"),
+                              )
+        # 外连接
+        query = query.outerjoin(AssetManufactureRelationInfo, AssetManufactureRelationInfo.asset_id == AssetBasicInfo.id). \
+            outerjoin(AssetManufacturesInfo, AssetManufacturesInfo.id == AssetManufactureRelationInfo.manufacture_id). \
+            outerjoin(AssetType, AssetType.id == AssetBasicInfo.asset_type_id). \
+            outerjoin(AssetPositionsInfo, AssetPositionsInfo.asset_id == AssetBasicInfo.id). \
+            outerjoin(AssetContractsInfo, AssetContractsInfo.asset_id == AssetBasicInfo.id). \
+            outerjoin(AssetBelongsInfo, AssetBelongsInfo.asset_id == AssetBasicInfo.id). \
+            outerjoin(AssetCustomersInfo, AssetCustomersInfo.asset_id == AssetBasicInfo.id). \
+            outerjoin(AssetResourceRelationInfo, AssetResourceRelationInfo.asset_id == AssetBasicInfo.id).group_by(AssetBasicInfo.id)
+        return query
+
+    @classmethod
+    def _asset_list_filters(cls, query_params):
+        """
+        组装资产列表的查询条件
+        返回 (查询条件列表, 条件依赖的关联表列表)，关联表用于只联需要的表统计总数与查询当页id
+        """
+        conditions = []
+        join_tables = []
+        def add(condition, join_table=None):
+            conditions.append(condition)
+            if join_table is not None and join_table not in join_tables:
+                join_tables.append(join_table)
+        # 数据库查询参数
+        if "asset_name" in query_params and query_params["asset_name"]:
+            add(AssetBasicInfo.name.like('%' + str(query_params["asset_name"]) + '%'))
+        if "asset_id" in query_params and query_params["asset_id"]:
+            add(AssetBasicInfo.id == query_params["asset_id"])
+        if "asset_ids" in query_params and query_params["asset_ids"]:
+            add(AssetBasicInfo.id.in_(query_params["asset_ids"].split(',')))
+        if "asset_category" in query_params and query_params["asset_category"]:
+            add(AssetBasicInfo.asset_category == query_params["asset_category"])
+        if "asset_type" in query_params and query_params["asset_type"]:
+            add(AssetBasicInfo.asset_type.like('%' + query_params["asset_type"] + '%'))
+        if "asset_status" in query_params and query_params["asset_status"]:
+            # 状态拆分
+            asset_status_arr = query_params["asset_status"].split(",")
+            add(AssetBasicInfo.asset_status.in_(asset_status_arr))
+        if "frame_position" in query_params and query_params["frame_position"]:
+            add(AssetPositionsInfo.frame_position.like('%' + query_params["frame_position"] + '%'), AssetPositionsInfo)
+        if "cabinet_position" in query_params and query_params["cabinet_position"]:
+            add(AssetPositionsInfo.cabinet_position.like('%' + query_params["cabinet_position"] + '%'), AssetPositionsInfo)
+        if "u_position" in query_params and query_params["u_position"]:
+            add(AssetPositionsInfo.u_position.like('%' + query_params["u_position"] + '%'), AssetPositionsInfo)
+        if "equipment_number" in query_params and query_params["equipment_number"]:
+            add(AssetBasicInfo.equipment_number.like('%' + query_params["equipment_number"] + '%'))
+        if "asset_number" in query_params and query_params["asset_number"]:
+            add(AssetBasicInfo.asset_number.like('%' + str(query_params["asset_number"]) + '%'))
+        if "sn_number" in query_params and query_params["sn_number"]:
+            add(AssetBasicInfo.sn_number.like('%' + query_params["sn_number"] + '%'))
+        if "department_name" in query_params and query_params["department_name"]:
+            add(AssetBelongsInfo.department_name.like('%' + query_params["department_name"] + '%'), AssetBelongsInfo)
+        if "user_name" in query_params and query_params["user_name"]:
+            add(AssetBelongsInfo.user_name.like('%' + query_params["user_name"] + '%'), AssetBelongsInfo)
+        # 主机名、IP、IDRAC、用途、操作系统存储在extra的json中，使用带索引的生成列查询，不再逐行解析json
+        for param_name, column in asset_extra_filter_dic.items():
+            if param_name in query_params and query_params[param_name]:
+                add(column.like('%' + query_params[param_name] + '%'))
+        if "manufacture_id" in query_params and query_params["manufacture_id"]:
+            add(AssetManufactureRelationInfo.manufacture_id == query_params["manufacture_id"], AssetManufactureRelationInfo)
+        if "manufacture_name" in query_params and query_params["manufacture_name"]:
+            add(AssetManufacturesInfo.name.like('%' + query_params["manufacture_name"] + '%'), AssetManufacturesInfo)
+        # 配件查询，使用关联子查询（配件表asset_id有索引）
+        for param_name, part_type in asset_part_filter_dic.items():
+            if param_name in query_params and query_params[param_name]:
+                part_query = select(AssetPartsInfo.id).where(AssetPartsInfo.asset_id == AssetBasicInfo.id). \
+                    where(AssetPartsInfo.part_config.like('%' + query_params[param_name] + '%'))
+                if part_type:
+                    part_query = part_query.where(AssetPartsInfo.part_type == part_type)
+                add(part_query.exists())
+        # 描述模糊查询
+        if "asset_description" in query_params and query_params["asset_description"]:
+            add(AssetBasicInfo.description.like('%' + query_params["asset_description"] + '%'))
+        if "asset_relation_resource_flag" in query_params:
+            add(AssetBasicInfo.asset_relation_resource_flag == query_params["asset_relation_resource_flag"])
+        return conditions, join_tables
+
+    @classmethod
+    def _join_asset_filter_tables(cls, query, join_tables):
+        # 只联查询条件需要的表
+        for join_table in join_tables:
+            if join_table is AssetManufacturesInfo:
+                if AssetManufactureRelationInfo not in join_tables:
+                    query = query.outerjoin(AssetManufactureRelationInfo, AssetManufactureRelationInfo.asset_id == AssetBasicInfo.id)
+                query = query.outerjoin(AssetManufacturesInfo, AssetManufacturesInfo.id == AssetManufactureRelationInfo.manufacture_id)
+            else:
+                query = query.outerjoin(join_table, join_table.asset_id == AssetBasicInfo.id)
+        return query
+
+    @classmethod
+    def _count_asset(cls, session, conditions, join_tables):
+        # 总数：只联查询条件需要的表，无需联表时直接统计资产表
+        if not join_tables:
+            return session.query(func.count(AssetBasicInfo.id)).filter(*conditions).scalar()
+        query = session.query(func.count(distinct(AssetBasicInfo.id)))
+        query = cls._join_asset_filter_tables(query, join_tables)
+        return query.filter(*conditions).scalar()
+
+    @classmethod
+    def count_asset(cls, query_params):
+        session = get_session()
+        with session.begin():
+            conditions, join_tables = cls._asset_list_filters(query_params)
+            return cls._count_asset(session, conditions, join_tables)
+
     @classmethod
     def list_asset(cls, query_params, page=1, page_size=10, sort_keys=None, sort_dirs="ascend"):
         # 获取session
         session = get_session()
         with session.begin():
             # 查询语句
-            query = session.query(AssetBasicInfo.id.label("id"),
-                                  AssetBasicInfo.name.label("name"),
-                                  AssetBasicInfo.asset_type_id.label("asset_type_id"),
-                                  AssetBasicInfo.asset_category.label("asset_category"),
-                                  AssetBasicInfo.asset_type.label("asset_type"),
-                                  AssetBasicInfo.equipment_number.label("equipment_number"),
-                                  AssetBasicInfo.sn_number.label("sn_number"),
-                                  AssetBasicInfo.asset_number.label("asset_number"),
-                                  AssetBasicInfo.asset_status.label("asset_status"),
-                                  AssetBasicInfo.asset_status_description.label("asset_status_description"),
-                                  AssetBasicInfo.description.label("description"),
-                                  AssetBasicInfo.extra.label("extra"),
-                                  AssetBasicInfo.extend_column_extra.label("extend_column_extra"),
-                                  AssetType.asset_type_name_zh.label("asset_type_name_zh"),
-                                  AssetManufacturesInfo.id.label("manufacture_id"),
-                                  AssetManufacturesInfo.name.label("manufacture_name"),
-                                  AssetManufacturesInfo.description.label("manufacture_description"),
-                                  AssetManufacturesInfo.extra.label("manufacture_extra"),
-                                  AssetPositionsInfo.id.label("position_id"),
-                                  AssetPositionsInfo.frame_position.label("position_frame_position"),
-                                  AssetPositionsInfo.cabinet_position.label("position_cabinet_position"),
-                                  AssetPositionsInfo.u_position.label("position_u_position"),
-                                  AssetPositionsInfo.description.label("position_description"),
-                                  AssetContractsInfo.id.label("contract_id"),
-                                  AssetContractsInfo.contract_number.label("contract_number"),
-                                  AssetContractsInfo.purchase_date.label("contract_purchase_date"),
-                                  AssetContractsInfo.batch_number.label("contract_batch_number"),
-                                  AssetContractsInfo.description.label("contract_description"),
-                                  AssetBelongsInfo.id.label("belong_id"),
-                                  AssetBelongsInfo.department_id.label("belong_department_id"),
-                                  AssetBelongsInfo.department_name.label("belong_department_name"),
-                                  AssetBelongsInfo.user_id.label("belong_user_id"),
-                                  AssetBelongsInfo.user_name.label("belong_user_name"),
-                                  AssetBelongsInfo.tel_number.label("belong_tel_number"),
-                                  AssetBelongsInfo.description.label("belong_contract_description"),
-                                  AssetCustomersInfo.id.label("customer_id"),
-                                  AssetCustomersInfo.customer_id.label("customer_customer_id"),
-                                  AssetCustomersInfo.customer_name.label("customer_customer_name"),
-                                  AssetCustomersInfo.rental_duration.label("customer_rental_duration"),
-                                  AssetCustomersInfo.start_date.label("customer_start_date"),
-                                  AssetCustomersInfo.end_date.label("customer_end_date"),
-                                  AssetCustomersInfo.vlan_id.label("customer_vlan_id"),
-                                  AssetCustomersInfo.float_ip.label("customer_float_ip"),
-                                  AssetCustomersInfo.band_width.label("customer_band_width"),
-                                  AssetCustomersInfo.description.label("customer_description"),
-                                  AssetResourceRelationInfo.resource_id.label("resource_id"),
-                                  AssetResourceRelationInfo.resource_name.label("resource_name"),
-                                  AssetResourceRelationInfo.resource_status.label("resource_status"),
-                                  AssetResourceRelationInfo.resource_user_id.label("resource_user_id"),
-                                  AssetResourceRelationInfo.resource_user_name.label("resource_user_name"),
-                                  AssetResourceRelationInfo.resource_project_id.label("resource_project_id"),
-                                  AssetResourceRelationInfo.resource_project_name.label("resource_project_name"),
-                                  AssetBasicInfo.asset_relation_resource_flag.label("asset_relation_resource_flag"),
-                                  AssetResourceRelationInfo.node_name.label("node_name"),
-                                  )
-            # 外连接
-            query = query.outerjoin(AssetManufactureRelationInfo, AssetManufactureRelationInfo.asset_id == AssetBasicInfo.id). \
-                outerjoin(AssetManufacturesInfo, AssetManufacturesInfo.id == AssetManufactureRelationInfo.manufacture_id). \
-                outerjoin(AssetType, AssetType.id == AssetBasicInfo.asset_type_id). \
-                outerjoin(AssetPositionsInfo, AssetPositionsInfo.asset_id == AssetBasicInfo.id). \
-                outerjoin(AssetContractsInfo, AssetContractsInfo.asset_id == AssetBasicInfo.id). \
-                outerjoin(AssetBelongsInfo, AssetBelongsInfo.asset_id == AssetBasicInfo.id). \
-                outerjoin(AssetCustomersInfo, AssetCustomersInfo.asset_id == AssetBasicInfo.id). \
-                outerjoin(AssetResourceRelationInfo, AssetResourceRelationInfo.asset_id == AssetBasicInfo.id).group_by(AssetBasicInfo.id)
-            # 数据库查询参数
-            if "asset_name" in query_params and query_params["asset_name"]:
-                query = query.filter(AssetBasicInfo.name.like('%' + str(query_params["asset_name"]) + '%'))
-            if "asset_id" in query_params and query_params["asset_id"]:
-                query = query.filter(AssetBasicInfo.id == query_params["asset_id"])
-            if "asset_ids" in query_params and query_params["asset_ids"]:
-                query = query.filter(AssetBasicInfo.id.in_(query_params["asset_ids"].split(',')))
-            if "asset_category" in query_params and query_params["asset_category"]:
-                query = query.filter(AssetBasicInfo.asset_category == query_params["asset_category"])
-            if "asset_type" in query_params and query_params["asset_type"]:
-                query = query.filter(AssetBasicInfo.asset_type.like('%' + query_params["asset_type"] + '%'))
-            if "asset_status" in query_params and query_params["asset_status"]:
-                # 状态拆分
-                asset_status_arr = query_params["asset_status"].split(",")
-                query = query.filter(AssetBasicInfo.asset_status.in_(asset_status_arr))
-            if "frame_position" in query_params and query_params["frame_position"]:
-                query = query.filter(AssetPositionsInfo.frame_position.like('%' + query_params["frame_position"] + '%'))
-            if "cabinet_position" in query_params and query_params["cabinet_position"]:
-                query = query.filter(AssetPositionsInfo.cabinet_position.like('%' + query_params["cabinet_position"] + '%'))
-            if "u_position" in query_params and query_params["u_position"]:
-                query = query.filter(AssetPositionsInfo.u_position.like('%' + query_params["u_position"] + '%'))
-            if "equipment_number" in query_params and query_params["equipment_number"]:
-                query = query.filter(AssetBasicInfo.equipment_number.like('%' + query_params["equipment_number"] + '%'))
-            if "asset_number" in query_params and query_params["asset_number"]:
-                query = query.filter(AssetBasicInfo.asset_number.like('%' + str(query_params["asset_number"]) + '%'))
-            if "sn_number" in query_params and query_params["sn_number"]:
-                query = query.filter(AssetBasicInfo.sn_number.like('%' + query_params["sn_number"] + '%'))
-            if "department_name" in query_params and query_params["department_name"]:
-                query = query.filter(AssetBelongsInfo.department_name.like('%' + query_params["department_name"] + '%'))
-            if "user_name" in query_params and query_params["user_name"]:
-                query = query.filter(AssetBelongsInfo.user_name.like('%' + query_params["user_name"] + '%'))
-            # 主机名模糊查询，存储的json字段，需要解然后模糊查询
-            if "host_name" in query_params and query_params["host_name"]:
-                query = query.filter(func.json_unquote(func.json_extract(AssetBasicInfo.extra, "$.host_name")).like('%' + query_params["host_name"] + '%'))
-            # IP地址模糊查询，存储的json字段，需要解然后模糊查询
-            if "ip" in query_params and query_params["ip"]:
-                query = query.filter(func.json_unquote(func.json_extract(AssetBasicInfo.extra, "$.ip")).like('%' + query_params["ip"] + '%'))
-            # idrac模糊查询，存储的json字段，需要解然后模糊查询
-            if "idrac" in query_params and query_params["idrac"]:
-                query = query.filter(func.json_unquote(func.json_extract(AssetBasicInfo.extra, "$.idrac")).like('%' + query_params["idrac"] + '%'))
-            # 用途模糊查询，存储的json字段，需要解然后模糊查询
-            if "use_to" in query_params and query_params["use_to"]:
-                query = query.filter(func.json_unquote(func.json_extract(AssetBasicInfo.extra, "$.use_to")).like('%' + query_params["use_to"] + '%'))
-            # 操作系统模糊查询，存储的json字段，需要解然后模糊查询
-            if "operate_system" in query_params and query_params["operate_system"]:
-                query = query.filter(func.json_unquote(func.json_extract(AssetBasicInfo.extra, "$.operate_system")).like('%' + query_params["operate_system"] + '%'))
-            if "manufacture_id" in query_params and query_params["manufacture_id"]:
-                query = query.filter(AssetManufacturesInfo.id == query_params["manufacture_id"])
-            if "manufacture_name" in query_params and query_params["manufacture_name"]:
-                query = query.filter(AssetManufacturesInfo.name.like('%' + query_params["manufacture_name"] + '%'))
-            if "asset_part" in query_params and query_params["asset_part"]:
-                query = query.filter(AssetBasicInfo.id.in_(session.query(AssetPartsInfo.asset_id).filter(AssetPartsInfo.part_config.like('%' + query_params["asset_part"] + '%')).distinct()))
-            if "asset_part_cpu" in query_params and query_params["asset_part_cpu"]:
-                query = query.filter(AssetBasicInfo.id.in_(session.query(AssetPartsInfo.asset_id).filter(AssetPartsInfo.part_type == 'cpu').filter(AssetPartsInfo.part_config.like('%' + query_params["asset_part_cpu"] + '%')).distinct()))
-            if "asset_part_cpu_cores" in query_params and query_params["asset_part_cpu_cores"]:
-                query = query.filter(AssetBasicInfo.id.in_(session.query(AssetPartsInfo.asset_id).filter(AssetPartsInfo.part_type == 'cpu_cores').filter(AssetPartsInfo.part_config.like('%' + query_params["asset_part_cpu_cores"] + '%')).distinct()))
-            if "asset_part_data_disk" in query_params and query_params["asset_part_data_disk"]:
-                query = query.filter(AssetBasicInfo.id.in_(session.query(AssetPartsInfo.asset_id).filter(AssetPartsInfo.part_type == 'data_disk').filter(AssetPartsInfo.part_config.like('%' + query_params["asset_part_data_disk"] + '%')).distinct()))
-            if "asset_part_disk" in query_params and query_params["asset_part_disk"]:
-                query = query.filter(AssetBasicInfo.id.in_(session.query(AssetPartsInfo.asset_id).filter(AssetPartsInfo.part_type == 'disk').filter(AssetPartsInfo.part_config.like('%' + query_params["asset_part_disk"] + '%')).distinct()))
-            if "asset_part_gpu" in query_params and query_params["asset_part_gpu"]:
-                query = query.filter(AssetBasicInfo.id.in_(session.query(AssetPartsInfo.asset_id).filter(AssetPartsInfo.part_type == 'gpu').filter(AssetPartsInfo.part_config.like('%' + query_params["asset_part_gpu"] + '%')).distinct()))
-            if "asset_part_ib_card" in query_params and query_params["asset_part_ib_card"]:
-                query = query.filter(AssetBasicInfo.id.in_(session.query(AssetPartsInfo.asset_id).filter(AssetPartsInfo.part_type == 'ib_card').filter(AssetPartsInfo.part_config.like('%' + query_params["asset_part_ib_card"] + '%')).distinct()))
-            if "asset_part_memory" in query_params and query_params["asset_part_memory"]:
-                query = query.filter(AssetBasicInfo.id.in_(session.query(AssetPartsInfo.asset_id).filter(AssetPartsInfo.part_type == 'memory').filter(AssetPartsInfo.part_config.like('%' + query_params["asset_part_memory"] + '%')).distinct()))
-            if "asset_part_module" in query_params and query_params["asset_part_module"]:
-                query = query.filter(AssetBasicInfo.id.in_(session.query(AssetPartsInfo.asset_id).filter(AssetPartsInfo.part_type == 'module').filter(AssetPartsInfo.part_config.like('%' + query_params["asset_part_module"] + '%')).distinct()))
-            if "asset_part_nic" in query_params and query_params["asset_part_nic"]:
-                query = query.filter(AssetBasicInfo.id.in_(session.query(AssetPartsInfo.asset_id).filter(AssetPartsInfo.part_type == 'nic').filter(AssetPartsInfo.part_config.like('%' + query_params["asset_part_nic"] + '%')).distinct()))
-            # 描述模糊查询，存储的json字段，需要解然后模糊查询
-            if "asset_description" in query_params and query_params["asset_description"]:
-                query = query.filter(AssetBasicInfo.description.like('%' + query_params["asset_description"] + '%'))
-            # # 资源相关
-            # if "resource_name" in query_params and query_params["resource_name"]:
-            #     query = query.filter(AssetResourceRelationInfo.resource_name.like('%' + query_params["resource_name"] + '%'))
-            # if "resource_status" in query_params and query_params["resource_status"]:
-            #     query = query.filter(AssetResourceRelationInfo.resource_status == query_params["resource_status"])
-            # if "resource_user_name" in query_params and query_params["resource_user_name"]:
-            #     query = query.filter(AssetResourceRelationInfo.resource_user_name.like('%' + query_params["resource_user_name"] + '%'))
-            # if "resource_project_name" in query_params and query_params["resource_project_name"]:
-            #     query = query.filter(AssetResourceRelationInfo.resource_project_name.like('%' + query_params["resource_project_name"] + '%'))
-            if "asset_relation_resource_flag" in query_params:
-                query = query.filter(AssetBasicInfo.asset_relation_resource_flag == query_params["asset_relation_resource_flag"])
+            query = cls._asset_list_query(session)
+            # 查询条件
+            conditions, join_tables = cls._asset_list_filters(query_params)
+            query = query.filter(*conditions)
             # 总数
-            count = query.count()
+            count = cls._count_asset(session, conditions, join_tables)
             # 排序
             if sort_keys is not None and sort_keys in asset_dir_dic:
                 if sort_dirs == "ascend" or sort_dirs is None :
@@ -197,7 +239,7 @@ class AssetSQL:
                 elif sort_dirs == "descend":
                     query = query.order_by(asset_dir_dic[sort_keys].desc())
             else:
-                query = query.order_by(AssetBasicInfo.create_date.desc())
+                query = query.order_by(AssetBasicInfo.create_date.desc(), AssetBasicInfo.id.desc())
             # 分页条件
             page_size = int(page_size)
             page_num = int(page)
@@ -211,6 +253,94 @@ class AssetSQL:
             # 返回
             return count, assert_list
 
+    @classmethod
+    def list_asset_by_cursor(cls, query_params, page_size=10, cursor=None):
+        """
+        游标分页查询资产列表，按 (create_date, id) 倒序，使用 (create_date, id) 索引，翻页耗时与页码无关
+        cursor 为上一页返回的游标，首页为空；返回 (总数, 数据, 下一页游标)，没有下一页时游标为None
+        """
+        session = get_session()
+        with session.begin():
+            conditions, join_tables = cls._asset_list_filters(query_params)
+            count = cls._count_asset(session, conditions, join_tables)
+            # 1、只查当页资产id：仅联查询条件需要的表
+            id_query = session.query(AssetBasicInfo.id, AssetBasicInfo.create_date)
+            id_query = cls._join_asset_filter_tables(id_query, join_tables)
+            if join_tables:
+                id_query = id_query.distinct()
+            id_query = id_query.filter(*conditions)
+            if cursor:
+                cursor_create_date, cursor_id = decode_asset_list_cursor(cursor)
+                # 倒序时create_date为NULL的数据排在最后
+                if cursor_create_date is None:
+                    id_query = id_query.filter(AssetBasicInfo.create_date.is_(None), AssetBasicInfo.id < cursor_id)
+                else:
+                    id_query = id_query.filter(or_(AssetBasicInfo.create_date < cursor_create_date,
+                                                   AssetBasicInfo.create_date.is_(None),
+                                                   and_(AssetBasicInfo.create_date == cursor_create_date, AssetBasicInfo.id < cursor_id)))
+            page_size = int(page_size)
+            # 多查一条判断是否有下一页
+            page_rows = id_query.order_by(AssetBasicInfo.create_date.desc(), AssetBasicInfo.id.desc()).limit(page_size + 1).all()
+            next_cursor = None
+            if len(page_rows) > page_size:
+                page_rows = page_rows[:page_size]
+                next_cursor = encode_asset_list_cursor(page_rows[-1].create_date, page_rows[-1].id)
+            if not page_rows:
+                return count, [], None
+            # 2、按id查询当页资产的完整信息
+            query = cls._asset_list_query(session).filter(AssetBasicInfo.id.in_([row.id for row in page_rows]))
+            asset_dict = {row.id: row for row in query.all()}
+            return count, [asset_dict[row.id] for row in page_rows if row.id in asset_dict], next_cursor
+
+
+    # 资产导出：单条联表查询，配件按资产聚合为JSON数组，使用服务端游标按批次流式读取，内存占用与资产数量无关
+    @classmethod
+    def stream_asset_export_rows(cls, asset_category, asset_ids=None, batch_size=500):
+        session = get_session()
+        with session.begin():
+            # 配件聚合子查询
+            parts_query = session.query(func.json_arrayagg(func.json_object("part_type", AssetPartsInfo.part_type, "part_config", AssetPartsInfo.part_config))). \
+                filter(AssetPartsInfo.asset_id == AssetBasicInfo.id).correlate(AssetBasicInfo).scalar_subquery()
+            query = session.query(AssetBasicInfo.id.label("id"),
+                                  AssetBasicInfo.name.label("asset_name"),
+                                  AssetBasicInfo.asset_type.label("asset_type"),
+                                  AssetBasicInfo.equipment_number.label("equipment_number"),
+                                  AssetBasicInfo.sn_number.label("sn_number"),
+                                  AssetBasicInfo.asset_number.label("asset_number"),
+                                  AssetBasicInfo.description.label("asset_description"),
+                                  AssetBasicInfo.extra.label("extra"),
+                                  AssetManufacturesInfo.name.label("manufacture_name"),
+                                  AssetPositionsInfo.frame_position.label("frame_position"),
+                                  AssetPositionsInfo.cabinet_position.label("cabinet_position"),
+                                  AssetPositionsInfo.u_position.label("u_position"),
+                                  AssetContractsInfo.contract_number.label("contract_number"),
+                                  AssetBelongsInfo.department_name.label("department_name"),
+                                  AssetBelongsInfo.user_name.label("user_name"),
+                                  parts_query.label("asset_parts"),
+                                  )
+            # 外连接
+            query = query.outerjoin(AssetManufactureRelationInfo, AssetManufactureRelationInfo.asset_id == AssetBasicInfo.id). \
+                outerjoin(AssetManufacturesInfo, AssetManufacturesInfo.id == AssetManufactureRelationInfo.manufacture_id). \
+                outerjoin(AssetPositionsInfo, AssetPositionsInfo.asset_id == AssetBasicInfo.id). \
+                outerjoin(AssetContractsInfo, AssetContractsInfo.asset_id == AssetBasicInfo.id). \
+                outerjoin(AssetBelongsInfo, AssetBelongsInfo.asset_id == AssetBasicInfo.id).group_by(AssetBasicInfo.id)
+            query = query.filter(AssetBasicInfo.asset_category == asset_category)
+            if asset_ids:
+                query = query.filter(AssetBasicInfo.id.in_(asset_ids))
+            query = query.order_by(AssetBasicInfo.create_date.desc())
+            for row in query.execution_options(stream_results=True).yield_per(batch_size):
+                yield row
+
+    # 查询资产的所有配件类型，用于导出前确定配件sheet页的表头
+    @classmethod
+    def list_asset_part_types(cls, asset_category, asset_ids=None):
+        session = get_session()
+        with session.begin():
+            query = session.query(AssetPartsInfo.part_type).join(AssetBasicInfo, AssetBasicInfo.id == AssetPartsInfo.asset_id). \
+                filter(AssetBasicInfo.asset_category == asset_category)
+            if asset_ids:
+                query = query.filter(AssetBasicInfo.id.in_(asset_ids))
+            return [row.part_type for row in query.distinct().all()]
 
     @classmethod
     def list_asset_basic_info(cls, asset_name=None, page=1, page_size=10, field=None, dir="ascend"):
@@ -326,6 +456,78 @@ class AssetSQL:
                 session.add_all(flow_info)
 
 
+    # 按资产编号批量查询资产基础信息，IN查询按批次拆分
+    @classmethod
+    def list_asset_basic_info_by_asset_numbers(cls, asset_numbers, batch_size=1000):
+        if not asset_numbers:
+            return []
+        asset_numbers = list(dict.fromkeys(asset_numbers))
+        asset_list = []
+        session = get_session()
+        with session.begin():
+            for start in range(0, len(asset_numbers), batch_size):
+                query = session.query(AssetBasicInfo).filter(AssetBasicInfo.asset_number.in_(asset_numbers[start:start + batch_size]))
+                asset_list.extend(query.all())
+            return asset_list
+
+    # 按资产名称批量查询资产基础信息，IN查询按批次拆分
+    @classmethod
+    def list_asset_basic_info_by_names(cls, asset_names, batch_size=1000):
+        if not asset_names:
+            return []
+        asset_names = list(dict.fromkeys(asset_names))
+        asset_list = []
+        session = get_session()
+        with session.begin():
+            for start in range(0, len(asset_names), batch_size):
+                query = session.query(AssetBasicInfo).filter(AssetBasicInfo.name.in_(asset_names[start:start + batch_size]))
+                asset_list.extend(query.all())
+            return asset_list
+
+    # 按厂商名称批量查询厂商，IN查询按批次拆分
+    @classmethod
+    def list_manufacture_by_names(cls, manufacture_names, batch_size=1000):
+        if not manufacture_names:
+            return []
+        manufacture_names = list(dict.fromkeys(manufacture_names))
+        manufacture_list = []
+        session = get_session()
+        with session.begin():
+            for start in range(0, len(manufacture_names), batch_size):
+                query = session.query(AssetManufacturesInfo).filter(AssetManufacturesInfo.name.in_(manufacture_names[start:start + batch_size]))
+                manufacture_list.extend(query.all())
+            return manufacture_list
+
+    @classmethod
+    def create_manufactures(cls, manufacture_infos):
+        if not manufacture_infos:
+            return
+        session = get_session()
+        with session.begin():
+            session.bulk_save_objects(manufacture_infos)
+
+    # 批量导入资产：在一个事务内删除被覆盖的资产（与delete_asset删除的表一致），再批量写入各表数据
+    @classmethod
+    def bulk_import_assets(cls, delete_asset_ids, basic_infos, manufacture_relation_infos, position_infos, contract_infos, belong_infos, customer_infos, part_infos, operate_logs=None):
+        session = get_session()
+        with session.begin():
+            if delete_asset_ids:
+                session.query(AssetBasicInfo).filter(AssetBasicInfo.id.in_(delete_asset_ids)).delete(synchronize_session=False)
+                for model in (AssetPartsInfo, AssetManufactureRelationInfo, AssetPositionsInfo, AssetContractsInfo, AssetBelongsInfo, AssetCustomersInfo):
+                    session.query(model).filter(model.asset_id.in_(delete_asset_ids)).delete(synchronize_session=False)
+            for db_objects in (basic_infos, manufacture_relation_infos, position_infos, contract_infos, belong_infos, customer_infos, part_infos, operate_logs):
+                if db_objects:
+                    session.bulk_save_objects(db_objects)
+
+    @classmethod
+    def bulk_create_asset_parts(cls, asset_part_infos):
+        if not asset_part_infos:
+            return
+        session = get_session()
+        with session.begin():
+            session.bulk_save_objects(asset_part_infos)
+
+
     @classmethod
     def update_asset(cls, basic_info, manufacture_info, manufacture_relation_info, position_info, contract_info, belong_info, customer_info, part_info, flow_info):
         session = get_session()
@@ -587,6 +789,24 @@ class AssetSQL:
             # 返回
             return assert_part_list
 
+    # 批量查询多个资产的配件列表，IN查询按批次拆分，避免列表页逐行查询配件
+    @classmethod
+    def list_asset_part_by_asset_ids(cls, asset_ids, batch_size=1000):
+        if not asset_ids:
+            return []
+        # 去重并保持顺序
+        asset_ids = list(dict.fromkeys(asset_ids))
+        assert_part_list = []
+        session = get_session()
+        with session.begin():
+            for start in range(0, len(asset_ids), batch_size):
+                query = session.query(AssetPartsInfo).filter(AssetPartsInfo.asset_id.in_(asset_ids[start:start + batch_size]))
+                # 默认排序
+                query = query.order_by(AssetPartsInfo.part_type.asc())
+                assert_part_list.extend(query.all())
+            # 返回
+            return assert_part_list
+
 
     @classmethod
     def list_asset_part_page(cls, query_params, page=1, page_size=10, field=None, dir="ascend"):
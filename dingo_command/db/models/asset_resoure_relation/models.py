@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -10,6 +10,7 @@ Base = declarative_base()
 # 资产资源关联信息对象
 class AssetResourceRelationInfo(Base):
     __tablename__ = "ops_assets_resources_relations_info"
+    __table_args__ = (Index('ix_ops_assets_resources_relations_info_asset_id', 'asset_id'),)
 
     id = Column(String(length=128), primary_key= True, nullable=False, index=True, unique=False)
     asset_id = Column(String(length=128), nullable=True)
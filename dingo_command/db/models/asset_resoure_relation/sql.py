@@ -175,6 +175,23 @@ class AssetResourceRelationSQL:
         with session.begin():
             session.merge(asset_resource_relation)
 
+    @classmethod
+    def sync_asset_resource_relation(cls, create_list, update_list, delete_resource_id_list):
+        # 在一个事务中按资源id删除、更新、新增关联关系
+        session = get_session()
+        try:
+            with session.begin():
+                if delete_resource_id_list:
+                    session.query(AssetResourceRelationInfo).filter(
+                        AssetResourceRelationInfo.resource_id.in_(delete_resource_id_list)).delete(synchronize_session=False)
+                if update_list:
+                    session.bulk_save_objects(update_list, update_changed_only=True)
+                if create_list:
+                    session.bulk_save_objects(create_list)
+        except Exception as e:
+            session.rollback()
+            raise
+
     @classmethod
     def get_asset_resource_relation_by_resource_id(cls, resource_id):
         session = get_session()
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -22,6 +22,7 @@ class BigscreenMetricsConfig(Base):
 
 class BigscreenMetrics(Base):
     __tablename__ = "ops_bigscreen_metrics"
+    __table_args__ = (UniqueConstraint('name', 'region', name='uk_ops_bigscreen_metrics_name_region'),)
 
     id = Column(String(length=128), primary_key=True, nullable=False, index=True, unique=False)
 
@@ -2,6 +2,8 @@
 # 数据表对应的model对象
 from __future__ import annotations
 
+from sqlalchemy.dialects.mysql import insert
+
 from dingo_command.db.engines.mysql import get_session
 from dingo_command.db.models.bigscreen.models import BigscreenMetricsConfig, BigscreenMetrics
 
@@ -75,12 +77,32 @@ class BigscreenSQL:
                 BigscreenMetrics.region == bigscreen_metrics_region
             ).first()
 
+    @classmethod
+    def get_bigscreen_metrics_by_names_and_region(cls, bigscreen_metrics_names, bigscreen_metrics_region):
+        session = get_session()
+        with session.begin():
+            return session.query(BigscreenMetrics).filter(
+                BigscreenMetrics.name.in_(bigscreen_metrics_names),
+                BigscreenMetrics.region == bigscreen_metrics_region
+            ).all()
+
     @classmethod
     def update_bigscreen_metrics(cls, bigscreen_metrics_info):
         session = get_session()
         with session.begin():
             session.merge(bigscreen_metrics_info)
 
+    @classmethod
+    def upsert_bigscreen_metrics_list(cls, bigscreen_metrics_list):
+        # 按(name, region)唯一键在一个事务中批量新增或更新指标数据
+        if not bigscreen_metrics_list:
+            return
+        session = get_session()
+        with session.begin():
+            stmt = insert(BigscreenMetrics).values(bigscreen_metrics_list)
+            stmt = stmt.on_duplicate_key_update(data=stmt.inserted.data, last_modified=stmt.inserted.last_modified)
+            session.execute(stmt)
+
     @classmethod
     def update_bigscreen_metrics_data_by_name(cls, name, data):
         session = get_session()
@@ -211,6 +211,23 @@ class ChartSQL:
             session.rollback()
             raise
 
+    @classmethod
+    def sync_chart_list(cls, create_list, update_list, delete_list):
+        # 增量同步repo的chart，在一个事务中新增、更新、删除
+        session = get_session()
+        try:
+            with session.begin():
+                if create_list:
+                    session.bulk_save_objects(create_list)
+                if update_list:
+                    session.bulk_save_objects(update_list, update_changed_only=True)
+                if delete_list:
+                    session.execute(delete(ChartInfo).where(ChartInfo.id.in_([chart.id for chart in delete_list])))
+        except Exception as e:
+            Log.error("sync_chart_list failed, error: %s" % str(e))
+            session.rollback()
+            raise
+
     @classmethod
     def delete_chart_list(cls, chart_list):
         session = get_session()
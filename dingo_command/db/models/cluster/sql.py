@@ -117,6 +117,17 @@ class  TaskSQL:
         session = get_session()
         with session.begin():
             session.merge(task)
+
+    @classmethod
+    def save_list(cls, task_list):
+        # 一个事务中批量写入任务：没有id的新增，已有id的更新
+        session = get_session()
+        with session.begin():
+            for task in task_list:
+                if task.id is None:
+                    session.add(task)
+                else:
+                    session.merge(task)
             
     
             
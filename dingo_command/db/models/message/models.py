@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from sqlalchemy import Column, String, Text, DateTime
+from sqlalchemy import Column, String, Text, DateTime, Index
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -10,6 +10,9 @@ Base = declarative_base()
 # 外部消息
 class ExternalMessage(Base):
     __tablename__ = "ops_external_message"
+    __table_args__ = (
+        Index('ix_ops_external_message_type_status_create_date_id', 'message_type', 'message_status', 'create_date', 'id'),
+    )
 
     id = Column(String(length=128), primary_key= True, nullable=False, index=True, unique=False)
     message_type = Column(String(length=128), nullable=True)
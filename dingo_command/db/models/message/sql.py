@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from sqlalchemy import func
+from sqlalchemy import func, or_, and_
 
 from dingo_command.db.engines.mysql import get_session
 from dingo_command.db.models.message.models import ExternalMessage
@@ -18,6 +18,15 @@ class MessageSQL:
         with session.begin():
             session.add(message_info)
 
+    @classmethod
+    def create_external_messages(cls, message_infos):
+        # 一个事务批量写入
+        if not message_infos:
+            return
+        session = get_session()
+        with session.begin():
+            session.bulk_save_objects(message_infos)
+
     @classmethod
     def update_external_message(cls, message_info):
         session = get_session()
@@ -87,6 +96,24 @@ class MessageSQL:
         with session.begin():
             return session.query(ExternalMessage).filter(ExternalMessage.message_type == message_type).filter(ExternalMessage.message_status == message_status).count()
 
+    @classmethod
+    def exists_external_message_by_status(cls, message_type, message_status):
+        session = get_session()
+        with session.begin():
+            return session.query(ExternalMessage.id).filter(ExternalMessage.message_type == message_type).filter(ExternalMessage.message_status == message_status).first() is not None
+
+    # 按 (create_date, id) 游标顺序读取某个类型待发送的消息，cursor为上一批最后一条的 (create_date, id)
+    @classmethod
+    def list_external_message_by_cursor(cls, message_type, message_status, cursor=None, limit=1000):
+        session = get_session()
+        with session.begin():
+            query = session.query(ExternalMessage).filter(ExternalMessage.message_type == message_type).filter(ExternalMessage.message_status == message_status)
+            if cursor:
+                cursor_create_date, cursor_id = cursor
+                query = query.filter(or_(ExternalMessage.create_date > cursor_create_date,
+                                         and_(ExternalMessage.create_date == cursor_create_date, ExternalMessage.id > cursor_id)))
+            return query.order_by(ExternalMessage.create_date.asc(), ExternalMessage.id.asc()).limit(limit).all()
+
     @classmethod
     def update_external_message_4error(cls, message_ids, description):
         session = get_session()
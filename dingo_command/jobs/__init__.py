@@ -16,10 +16,14 @@ bigscreen_opts = [
     cfg.IntOpt('metrics_expiration_time', default=60, help='metrics expiration time'),
     cfg.StrOpt('memcached_address', default='10.220.56.19:11211', help='memcached address'),
     cfg.StrOpt('memcached_key_prefix', default='bigscreen_metrics_', help='memcached bigscreen key prefix'),
+    cfg.IntOpt('memcached_max_pool_size', default=16, help='max connections of the shared memcached client pool'),
     cfg.StrOpt('nightingale_base_url', default='http://nightingale.zetyun.cn', help='nightingale base url'),
     cfg.StrOpt('nightingale_username', default='root', help='nightingale username'),
     cfg.StrOpt('nightingale_password', default='Zetyun2024', help='nightingale password'),
-    cfg.StrOpt('sequence_list', default=["stack_project_vm", "stack_project_vm_activate"], help='sequence list')
+    cfg.IntOpt('nightingale_token_ttl', default=1800, help='seconds to reuse the nightingale login token'),
+    cfg.StrOpt('sequence_list', default=["stack_project_vm", "stack_project_vm_activate"], help='sequence list'),
+    cfg.IntOpt('prometheus_query_timeout', default=10, help='prometheus query timeout seconds'),
+    cfg.IntOpt('prometheus_query_concurrency', default=8, help='max concurrent prometheus queries when fetching metrics')
 ]
 
 CONF.register_group(bigscreen_group)
@@ -3,6 +3,7 @@ import json
 from apscheduler.schedulers.background import BackgroundScheduler
 
 from dingo_command.common.k8s_common_operate import K8sCommonOperate
+from dingo_command.common.k8s_informer import ai_instance_informer_manager
 from dingo_command.db.models.ai_instance.sql import AiInstanceSQL
 from dingo_command.utils.constant import NAMESPACE_PREFIX
 from dingo_command.utils.k8s_client import get_k8s_core_client, get_k8s_app_client
@@ -68,6 +69,9 @@ def fetch_ai_instance_info():
                 LOG.error(f"获取k8s[{k8s_kubeconfig_db.k8s_id}_{k8s_kubeconfig_configs_db.k8s_name}] client失败: {e}")
                 continue
 
+            # 启动集群的informer，注册Pod事件处理，使实例状态变化秒级同步
+            register_pod_event_handler(k8s_kubeconfig_db.k8s_id)
+
             # 同步处理单个K8s集群
             sync_single_k8s_cluster(
                 k8s_id=k8s_kubeconfig_db.k8s_id,
@@ -101,6 +105,7 @@ def sync_single_k8s_cluster(k8s_id: str, core_client, apps_client):
         for namespace, instances in namespace_instance_map.items():
             try:
                 process_namespace_resources(
+                    k8s_id=k8s_id,
                     namespace=namespace,
                     instances=instances,
                     core_client=core_client,
@@ -113,11 +118,44 @@ def sync_single_k8s_cluster(k8s_id: str, core_client, apps_client):
         LOG.error(f"同步K8s集群[{k8s_id}]资源失败: {str(e)}", exc_info=True)
 
 
-def process_namespace_resources(namespace: str, instances: list, core_client, apps_client):
-    """处理单个namespace下的资源"""
-    LOG.info(f"开始处理namespace: {namespace}")
+def register_pod_event_handler(k8s_id: str):
+    """注册informer的Pod事件处理函数，同一集群只注册一次"""
+    pod_informer = ai_instance_informer_manager.get_pod_informer(k8s_id)
+    ai_instance_informer_manager.get_sts_informer(k8s_id)
+    pod_informer.add_event_handler(
+        "ai_instance_status",
+        lambda event_type, pod, old_pod: handle_pod_event(k8s_id, event_type, pod, old_pod)
+    )
+
+
+def handle_pod_event(k8s_id: str, event_type: str, pod, old_pod):
+    """Pod状态或所在节点变化时立即同步对应实例，删除等场景由周期同步处理"""
+    if event_type == "DELETED":
+        return
+    if old_pod and old_pod.status.phase == pod.status.phase and old_pod.spec.node_name == pod.spec.node_name:
+        return
+
+    sts_informer = ai_instance_informer_manager.get_synced_sts_informer(k8s_id)
+    if not sts_informer:
+        return
+    # StatefulSet Pod命名规则: {sts名称}-0
+    real_name = pod.metadata.name.rsplit("-", 1)[0]
+    sts = sts_informer.get(pod.metadata.namespace, real_name)
+    if not sts:
+        return
+    instance_db = AiInstanceSQL.get_ai_instance_info_by_k8s_id_and_real_name(k8s_id, real_name)
+    if not instance_db:
+        return
+    sync_single_instance_info(real_name, instance_db, sts, pod)
+
+
+def list_namespace_sts_and_pods(k8s_id: str, namespace: str, core_client, apps_client):
+    """获取namespace下的容器实例StatefulSet和Pod，优先读取informer本地缓存，未同步完成时查询apiserver"""
+    sts_informer = ai_instance_informer_manager.get_synced_sts_informer(k8s_id)
+    pod_informer = ai_instance_informer_manager.get_synced_pod_informer(k8s_id)
+    if sts_informer and pod_informer:
+        return sts_informer.list(namespace), pod_informer.list(namespace)
 
-    # 1. 获取K8s中的资源
     sts_list = k8s_common_operate.list_sts_by_label(
         apps_client,
         namespace=namespace,
@@ -128,6 +166,15 @@ def process_namespace_resources(namespace: str, instances: list, core_client, ap
         namespace=namespace,
         label_selector="resource-type=ai-instance"
     )
+    return sts_list, pod_list
+
+
+def process_namespace_resources(namespace: str, instances: list, core_client, apps_client, k8s_id: str = None):
+    """处理单个namespace下的资源"""
+    LOG.info(f"开始处理namespace: {namespace}")
+
+    # 1. 获取K8s中的资源
+    sts_list, pod_list = list_namespace_sts_and_pods(k8s_id, namespace, core_client, apps_client)
 
     # 2. 构建资源映射
     sts_map = {sts.metadata.name: sts for sts in sts_list}
@@ -210,32 +257,38 @@ def sync_instance_info(sts_map, pod_map, db_instance_map):
             LOG.warning(f"Not Found Pod[{real_name}-0], skip sync")
             continue
 
-        # 确定实例状态
-        k8s_status = determine_instance_real_status(sts, pod)
-        # 实例使用镜像
-        k8s_image = extract_image_info(sts)
-        # 环境变量、错误信息等
-        pod_details = extract_pod_details(pod)
+        sync_single_instance_info(real_name, instance_db, sts, pod)
+
+
+def sync_single_instance_info(real_name, instance_db, sts, pod):
+    """根据StatefulSet和Pod同步单个实例的状态、image、env等信息"""
+    # 确定实例状态
+    k8s_status = determine_instance_real_status(sts, pod)
+    # 实例使用镜像
+    k8s_image = extract_image_info(sts)
+    # 环境变量、错误信息等
+    pod_details = extract_pod_details(pod)
+
+    # 更新数据库记录
+    try:
+        # 准备更新数据
+        update_data = {
+            'instance_real_status': k8s_status,
+            'instance_status': AiInstanceService.map_k8s_to_db_status(k8s_status, instance_db.instance_status),
+            'instance_image': k8s_image,
+            'instance_node_name': pod.spec.node_name
+        }
+
+        if pod_details:
+            update_data['instance_envs'] = pod_details.get('instance_envs')
+            update_data['error_msg'] = pod_details.get('error_msg')
+
+        # 更新数据库
+        AiInstanceSQL.update_specific_fields_instance(instance_db, **update_data)
+        LOG.info(f"更新实例[{real_name}]信息: {update_data['instance_status']}")
+    except Exception as e:
+        LOG.error(f"更新实例状态失败[{real_name}]: {str(e)}")
 
-        # 更新数据库记录
-        try:
-            # 准备更新数据
-            update_data = {
-                'instance_real_status': k8s_status,
-                'instance_status': AiInstanceService.map_k8s_to_db_status(k8s_status, instance_db.instance_status),
-                'instance_image': k8s_image,
-                'instance_node_name': pod.spec.node_name
-            }
-
-            if pod_details:
-                update_data['instance_envs'] = pod_details.get('instance_envs')
-                update_data['error_msg'] = pod_details.get('error_msg')
-
-            # 更新数据库
-            AiInstanceSQL.update_specific_fields_instance(instance_db, **update_data)
-            LOG.info(f"更新实例[{real_name}]信息: {update_data['instance_status']}")
-        except Exception as e:
-            LOG.error(f"更新实例状态失败[{real_name}]: {str(e)}")
 
 def extract_pod_details(pod):
     """从Pod中提取详细信息"""
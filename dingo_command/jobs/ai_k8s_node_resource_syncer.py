@@ -1,14 +1,17 @@
 import json
+import time
 import uuid
 
 from apscheduler.schedulers.background import BackgroundScheduler
 
 from dingo_command.common.Enum.AIInstanceEnumUtils import AiInstanceStatus
 from dingo_command.common.k8s_common_operate import K8sCommonOperate
+from dingo_command.common.k8s_informer import ai_instance_informer_manager
 from dingo_command.db.models.ai_instance.sql import AiInstanceSQL
 from dingo_command.utils.k8s_client import get_k8s_core_client
 from dingo_command.db.models.ai_instance.models import AiK8sNodeResourceInfo
 from dingo_command.services.ai_instance import AiInstanceService
+from dingo_command.utils.constant import AI_K8S_NODE_RESOURCE_SYNC_AGGREGATE
 from datetime import datetime
 from oslo_log import log
 
@@ -38,6 +41,7 @@ def fetch_ai_k8s_node_resource():
                 continue
 
             print(f"handle K8s cluster: ID={k8s_kubeconfig_db.k8s_id}, Name={k8s_kubeconfig_db.k8s_name}, Type={k8s_kubeconfig_db.k8s_type}")
+            cluster_start_time = time.perf_counter()
             try:
                 # 获取client
                 core_client  = get_k8s_core_client(k8s_kubeconfig_db.k8s_id)
@@ -56,17 +60,28 @@ def fetch_ai_k8s_node_resource():
                 # 处理节点删除场景
                 handle_removed_nodes(k8s_kubeconfig_db.k8s_id, set(db_node_map.keys()) - set(k8s_node_map.keys()))
 
-                for k8s_node in k8s_nodes:
-                    # 同步单个node资源
-                    sync_node_and_pod_resources(
+                if AI_K8S_NODE_RESOURCE_SYNC_AGGREGATE:
+                    # 按集群聚合同步所有node资源
+                    sync_cluster_node_and_pod_resources(
                         k8s_kubeconfig_db.k8s_id,
-                        k8s_node,
+                        k8s_nodes,
+                        db_node_map,
                         core_client
                     )
+                else:
+                    for k8s_node in k8s_nodes:
+                        # 同步单个node资源
+                        sync_node_and_pod_resources(
+                            k8s_kubeconfig_db.k8s_id,
+                            k8s_node,
+                            core_client
+                        )
 
             except Exception as e:
                 LOG.error(f"get k8s[{k8s_kubeconfig_db.k8s_id}_{k8s_kubeconfig_db.k8s_name}] client fail: {e}")
                 continue
+            finally:
+                LOG.info(f"sync k8s [{k8s_kubeconfig_db.k8s_id}] node resource time-consuming：{time.perf_counter() - cluster_start_time:.3f}s")
 
     except Exception as e:
         LOG.error(f"sync k8s node resource fail: {e}")
@@ -117,6 +132,50 @@ def sync_node_and_pod_resources(k8s_id, k8s_node, core_client):
     LOG.info(f"k8s [{k8s_id}] node {k8s_node.metadata.name} resource sync end")
 
 
+def sync_cluster_node_and_pod_resources(k8s_id, k8s_nodes, db_node_map, core_client):
+    """
+    按集群聚合同步所有节点的资源总量和POD使用量
+    一次查询集群内所有容器实例POD，按spec.nodeName分组汇总，最后批量写库
+    :param k8s_id: K8s集群ID
+    :param k8s_nodes: k8s node列表
+    :param db_node_map: 数据库中已有的节点资源记录，key为节点名称
+    :param core_client: K8s客户端
+    """
+    # 获取集群内所有POD并按节点分组，优先读取informer本地缓存
+    pod_informer = ai_instance_informer_manager.get_synced_pod_informer(k8s_id)
+    if pod_informer:
+        pods = pod_informer.list()
+    else:
+        pods = k8s_common_operate.list_pods_by_label_and_node(core_v1=core_client)
+    node_pods_map = {}
+    for pod in pods:
+        if pod.spec and pod.spec.node_name:
+            node_pods_map.setdefault(pod.spec.node_name, []).append(pod)
+
+    node_resource_db_list = []
+    for k8s_node in k8s_nodes:
+        node_name = k8s_node.metadata.name
+        node_resource = build_node_resource_total(k8s_node)
+        if not node_resource:
+            LOG.error(f"k8s [{k8s_id}] node  {node_name} resource total sync fail")
+            continue
+
+        node_resource_db = db_node_map.get(node_name)
+        if not node_resource_db:
+            node_resource_db = AiK8sNodeResourceInfo(k8s_id=k8s_id, node_name=node_name)
+            node_resource_db.id = uuid.uuid4().hex
+        apply_node_total_resource(node_resource_db, node_resource)
+
+        node_pods = node_pods_map.get(node_name, [])
+        total_usage, gpu_model = compute_pod_resource_usage(node_pods)
+        apply_pod_resource_usage(node_resource_db, len(node_pods), total_usage, gpu_model)
+        node_resource_db_list.append(node_resource_db)
+
+    # 批量写库
+    AiInstanceSQL.save_k8s_node_resource_list(node_resource_db_list)
+    LOG.info(f"k8s [{k8s_id}] {len(node_resource_db_list)} node resource sync end, pod count: {len(pods)}")
+
+
 def sync_node_resource_total(k8s_id, k8s_node, core_client):
     """
     同步节点资源总量到数据库
@@ -126,39 +185,49 @@ def sync_node_resource_total(k8s_id, k8s_node, core_client):
     :return: 是否同步成功
     """
     try:
-        allocatable = k8s_node.status.allocatable
-        if not allocatable:
-            LOG.warning(f"Node {k8s_node.metadata.name} has no allocatable resources")
+        node_resource = build_node_resource_total(k8s_node)
+        if not node_resource:
             return False
 
-        # 构建资源字典
-        node_resource  = {
-            'node_name': k8s_node.metadata.name,
-            'standard_resources': {
-                'cpu': ai_instance_service.convert_cpu_to_core(allocatable.get('cpu', '0')),
-                'memory': ai_instance_service.convert_memory_to_gb(allocatable.get('memory', '0Ki')),
-                'ephemeral_storage': ai_instance_service.convert_storage_to_gb(allocatable.get('ephemeral-storage', '0'))
-            },
-            'extended_resources': {}
-        }
-
-        # 处理扩展资源（主要关注GPU）
-        for key in dir(allocatable):
-            if key.startswith('_') or key in ['cpu', 'memory', 'ephemeral-storage', 'pods', 'hugepages-1gi', 'hugepages-2mi']:
-                continue
-
-            value = allocatable.get(key)
-            if 'gpu' in key.lower():
-                node_resource['extended_resources'][key] = value
-
-            # 保存或更新到数据库
-            process_node_total_resource(k8s_id, node_resource, core_client)
-            return True
+        # 保存或更新到数据库
+        process_node_total_resource(k8s_id, node_resource, core_client)
+        return True
     except Exception as e:
         LOG.error(f"sync node {k8s_node.metadata.name} resource total failed: {str(e)}")
         return False
 
 
+def build_node_resource_total(k8s_node):
+    """
+    根据k8s node的allocatable构建节点资源总量字典
+    :param k8s_node: k8s node数据
+    :return: 节点资源字典，无可分配资源时返回None
+    """
+    allocatable = k8s_node.status.allocatable
+    if not allocatable:
+        LOG.warning(f"Node {k8s_node.metadata.name} has no allocatable resources")
+        return None
+
+    # 构建资源字典
+    node_resource  = {
+        'node_name': k8s_node.metadata.name,
+        'standard_resources': {
+            'cpu': ai_instance_service.convert_cpu_to_core(allocatable.get('cpu', '0')),
+            'memory': ai_instance_service.convert_memory_to_gb(allocatable.get('memory', '0Ki')),
+            'ephemeral_storage': ai_instance_service.convert_storage_to_gb(allocatable.get('ephemeral-storage', '0'))
+        },
+        'extended_resources': {}
+    }
+
+    # 处理扩展资源（主要关注GPU）
+    for key, value in allocatable.items():
+        if key.startswith('_') or key in ['cpu', 'memory', 'ephemeral-storage', 'pods', 'hugepages-1gi', 'hugepages-2mi']:
+            continue
+        if 'gpu' in key.lower():
+            node_resource['extended_resources'][key] = value
+    return node_resource
+
+
 def sync_pod_resource_usage(k8s_id, node_name, core_client):
     """
     同步POD资源使用量到数据库
@@ -168,61 +237,20 @@ def sync_pod_resource_usage(k8s_id, node_name, core_client):
     :return: 是否同步成功
     """
     try:
-        # 获取节点上所有POD
-        pods = k8s_common_operate.list_pods_by_label_and_node(core_v1=core_client, node_name=node_name)
-
-        # 初始化资源使用总量
-        total_usage = {
-            'cpu': 0,
-            'memory': 0,
-            'ephemeral-storage': 0,
-            'gpu': 0,
-            'gpu_pod_count': 0
-        }
-        gpu_model = None
+        # 获取节点上所有POD，优先读取informer本地缓存
+        pod_informer = ai_instance_informer_manager.get_synced_pod_informer(k8s_id)
+        if pod_informer:
+            pods = pod_informer.by_index("node", node_name)
+        else:
+            pods = k8s_common_operate.list_pods_by_label_and_node(core_v1=core_client, node_name=node_name)
 
         # 汇总所有POD的资源使用量
-        for pod in pods:
-            for container in pod.spec.containers:
-                # CPU
-                if container.resources.limits and 'cpu' in container.resources.limits:
-                    total_usage['cpu'] += float(ai_instance_service.convert_cpu_to_core(
-                        container.resources.limits['cpu'])
-                    )
-
-                # 内存
-                if container.resources.limits and 'memory' in container.resources.limits:
-                    total_usage['memory'] += float(ai_instance_service.convert_memory_to_gb(
-                        container.resources.limits['memory'])
-                    )
-
-                # GPU
-                if container.resources.limits:
-                    for key, value in container.resources.limits.items():
-                        if 'gpu' in key.lower():
-                            total_usage['gpu'] += int(value)
-                            gpu_model = key
-                            total_usage['gpu_pod_count'] += total_usage['gpu_pod_count']
-
-
-
-            # 存储
-            for volume in pod.spec.volumes:
-                if volume.name == "system-disk" and hasattr(volume, "empty_dir"):
-                    empty_dir = volume.empty_dir
-                    if hasattr(empty_dir, "size_limit"):
-                        total_usage['ephemeral-storage'] += float(ai_instance_service.convert_storage_to_gb(empty_dir.size_limit))
+        total_usage, gpu_model = compute_pod_resource_usage(pods)
 
         # 更新数据库中的已使用量
         node_resource_db = AiInstanceSQL.get_k8s_node_resource_by_k8s_id_and_node_name(k8s_id, node_name)
         if node_resource_db:
-            node_resource_db.less_gpu_pod_count = len(pods) - total_usage['gpu_pod_count']
-            node_resource_db.cpu_used = str(total_usage['cpu'])
-            node_resource_db.memory_used = str(total_usage['memory'])
-            node_resource_db.storage_used = str(total_usage['ephemeral-storage'])
-            if gpu_model and gpu_model in node_resource_db.gpu_model:
-                node_resource_db.gpu_used = str(total_usage['gpu'])
-
+            apply_pod_resource_usage(node_resource_db, len(pods), total_usage, gpu_model)
             AiInstanceSQL.update_k8s_node_resource(node_resource_db)
             return True
 
@@ -233,11 +261,67 @@ def sync_pod_resource_usage(k8s_id, node_name, core_client):
         LOG.error(f"sync POD used resource failed: {str(e)}")
         return False
 
-def process_node_total_resource(k8s_id, node_resource, core_client):
-    """处理单个节点的资源信息"""
-    node_name = node_resource['node_name']
-    existing = AiInstanceSQL.get_k8s_node_resource_by_k8s_id_and_node_name(k8s_id, node_name)
+def compute_pod_resource_usage(pods):
+    """
+    汇总POD列表的资源使用量
+    :param pods: POD列表
+    :return: (资源使用总量字典, GPU型号)
+    """
+    # 初始化资源使用总量
+    total_usage = {
+        'cpu': 0,
+        'memory': 0,
+        'ephemeral-storage': 0,
+        'gpu': 0,
+        'gpu_pod_count': 0
+    }
+    gpu_model = None
 
+    # 汇总所有POD的资源使用量
+    for pod in pods:
+        for container in pod.spec.containers:
+            # CPU
+            if container.resources.limits and 'cpu' in container.resources.limits:
+                total_usage['cpu'] += float(ai_instance_service.convert_cpu_to_core(
+                    container.resources.limits['cpu'])
+                )
+
+            # 内存
+            if container.resources.limits and 'memory' in container.resources.limits:
+                total_usage['memory'] += float(ai_instance_service.convert_memory_to_gb(
+                    container.resources.limits['memory'])
+                )
+
+            # GPU
+            if container.resources.limits:
+                for key, value in container.resources.limits.items():
+                    if 'gpu' in key.lower():
+                        total_usage['gpu'] += int(value)
+                        gpu_model = key
+                        total_usage['gpu_pod_count'] += total_usage['gpu_pod_count']
+
+        # 存储
+        for volume in pod.spec.volumes or []:
+            if volume.name == "system-disk" and hasattr(volume, "empty_dir"):
+                empty_dir = volume.empty_dir
+                if hasattr(empty_dir, "size_limit"):
+                    total_usage['ephemeral-storage'] += float(ai_instance_service.convert_storage_to_gb(empty_dir.size_limit))
+
+    return total_usage, gpu_model
+
+
+def apply_pod_resource_usage(node_resource_db, pod_count, total_usage, gpu_model):
+    """将POD资源使用量写入节点资源记录（不落库）"""
+    node_resource_db.less_gpu_pod_count = pod_count - total_usage['gpu_pod_count']
+    node_resource_db.cpu_used = str(total_usage['cpu'])
+    node_resource_db.memory_used = str(total_usage['memory'])
+    node_resource_db.storage_used = str(total_usage['ephemeral-storage'])
+    if gpu_model and node_resource_db.gpu_model and gpu_model in node_resource_db.gpu_model:
+        node_resource_db.gpu_used = str(total_usage['gpu'])
+
+
+def apply_node_total_resource(node_resource_db, node_resource):
+    """将节点资源总量写入节点资源记录（不落库）"""
     # 处理GPU资源
     gpu_model = None
     gpu_total = None
@@ -247,25 +331,26 @@ def process_node_total_resource(k8s_id, node_resource, core_client):
         gpu_total= gpu_count
         break  # 只处理第一个GPU资源（通常一个节点只有一种GPU）
 
+    node_resource_db.cpu_total = node_resource['standard_resources']['cpu']
+    node_resource_db.memory_total = node_resource['standard_resources']['memory']
+    node_resource_db.storage_total = node_resource['standard_resources']['ephemeral_storage']
+    node_resource_db.gpu_model = gpu_model
+    node_resource_db.gpu_total = gpu_total
+
+
+def process_node_total_resource(k8s_id, node_resource, core_client):
+    """处理单个节点的资源信息"""
+    node_name = node_resource['node_name']
+    existing = AiInstanceSQL.get_k8s_node_resource_by_k8s_id_and_node_name(k8s_id, node_name)
+
     # 创建或更新记录
     if existing:
-        existing.cpu_total = node_resource['standard_resources']['cpu']
-        existing.memory_total = node_resource['standard_resources']['memory']
-        existing.storage_total = node_resource['standard_resources']['ephemeral_storage']
-        existing.gpu_model = gpu_model
-        existing.gpu_total = gpu_total
+        apply_node_total_resource(existing, node_resource)
         LOG.info(f"Updating resource for node {node_name}")
         AiInstanceSQL.update_k8s_node_resource(existing)
     else:
-        ai_k8s_node_resource_db = AiK8sNodeResourceInfo(
-            k8s_id=k8s_id,
-            node_name=node_name,
-            cpu_total=node_resource['standard_resources']['cpu'],
-            memory_total=node_resource['standard_resources']['memory'],
-            storage_total=node_resource['standard_resources']['ephemeral_storage'],
-            gpu_model=gpu_model,
-            gpu_total=gpu_total
-        )
+        ai_k8s_node_resource_db = AiK8sNodeResourceInfo(k8s_id=k8s_id, node_name=node_name)
+        apply_node_total_resource(ai_k8s_node_resource_db, node_resource)
         ai_k8s_node_resource_db.id = uuid.uuid4().hex
         LOG.info(f"Creating new resource for node {node_name}")
         AiInstanceSQL.save_k8s_node_resource(ai_k8s_node_resource_db)
@@ -1,5 +1,8 @@
+import re
+import time
 import uuid
 import json
+import threading
 
 from apscheduler.schedulers.background import BackgroundScheduler
 
@@ -12,11 +15,49 @@ from dingo_command.services.assets import AssetsService
 from dingo_command.services.bigscreens import BigScreensService
 from dingo_command.services.resources import ResourcesService
 from dingo_command.utils import datetime as datatime_util
+from dingo_command.utils.constant import ASSET_RELATION_KEYSTONE_CACHE_TTL
 from datetime import datetime, timedelta
 
 relation_scheduler = BackgroundScheduler()
 assert_service = AssetsService()
 resource_service = ResourcesService()
+# 关联关系中需要同步的字段
+relation_sync_fields = ["asset_id", "resource_name", "node_name", "resource_status", "resource_ip",
+                        "resource_user_id", "resource_user_name", "resource_project_id", "resource_project_name"]
+# 资产ip字段中多个ip的分隔符
+asset_ip_separator = re.compile(r"[\s,;，；]+")
+
+
+class KeystoneNameCache:
+    """按id缓存keystone用户、项目的名称，有效期内不再查询keystone；查询失败时返回上次查询到的名称"""
+
+    def __init__(self, ttl: int = ASSET_RELATION_KEYSTONE_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._names = {}
+
+    def get_name(self, kind, resource_id, fetch, stored_name=None):
+        """
+        :param stored_name: 数据库中已保存的名称，查询失败且没有缓存时使用
+        """
+        with self._lock:
+            entry = self._names.get((kind, resource_id))
+        if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+            return entry[1]
+        try:
+            data = fetch(resource_id)
+        except Exception as e:
+            # 查询失败不缓存，下次同步重新查询；沿用过期的缓存或数据库中的名称，不覆盖为空
+            print(f"查询{kind}[{resource_id}]失败: {e}")
+            return entry[1] if entry is not None else stored_name
+        name = data.get('name') if data else None
+        with self._lock:
+            self._names[(kind, resource_id)] = (time.monotonic(), name)
+        return name
+
+
+# 进程内共享的keystone名称缓存
+keystone_name_cache = KeystoneNameCache()
 
 def start():
     relation_scheduler.add_job(fetch_relation_info, 'interval', seconds=300, next_run_time=datetime.now())
@@ -28,14 +69,12 @@ def fetch_relation_info():
     print(f"同步资源与资产的关联关系开始时间: {datatime_util.get_now_time_in_timestamp_format()}")
     try:
         # 1、读取裸金属列表
-        node_list = IronicClient().ironic_list_nodes()
+        ironic_client = IronicClient()
+        node_list = ironic_client.ironic_list_nodes()
         # print(f"裸金属列表数据: {node_list}")
         # 2、读取所有的资产数据
         asset_list = get_all_asset_list()
         print(f"资产数据数目：{len(asset_list)}, 裸机节点数目：{len(node_list)}")
-        # 3、查询所有虚拟机
-        # server_list = NovaClient().nova_list_servers()
-        # print(f"虚拟机列表数据: {server_list}")
         # 数据判空
         if not node_list:
             print("裸金属列表数据为空，清除资源相关数据")
@@ -44,72 +83,34 @@ def fetch_relation_info():
             # 删除资源metrics表中数据
             AssetResourceRelationSQL.delete_all_resource_metrics()
             return
+        # 3、资产ip索引与所有虚拟机详情，各查询一次
+        asset_ip_index = build_asset_ip_index(asset_list)
+        server_dict = get_server_dict(node_list)
+        # 数据库中已有的关联关系
+        db_relation_list = AssetResourceRelationSQL.get_all_asset_resource_relation()
+        db_relation_by_resource_id = {db_relation.resource_id: db_relation for db_relation in db_relation_list or []}
         # 4、数据遍历，对比裸金属与资产数据
-        asset_resource_relation_list = []
-        resource_id_list = []
+        relation_dict = {}
         for temp_node in node_list:
-            # print(f"裸金属数据:{temp_node}")
             # uuid是裸金属的id  instance_uuid是对应的虚拟机的id
-            if temp_node.get('uuid') in resource_id_list:
+            if temp_node.get('uuid') in relation_dict:
                 print(f"resource_id_list中已存在裸金属的id：{temp_node.get('uuid')}")
                 continue
-            else:
-                resource_id_list.append(temp_node.get('uuid'))
-            #print(f"裸金属列表数据:{temp_node.get('uuid')}")
-            server_detail = None
-            if temp_node.get('instance_uuid'):
-                try:
-                    server_detail = NovaClient().nova_get_server_detail(temp_node.get('instance_uuid'))
-                    #print(f"虚拟机详情数据: {server_detail}")
-                except Exception as e:
-                    print(f"虚拟机[{temp_node.get('instance_uuid')}]详情数据失败: {e}")
+            server_detail = server_dict.get(temp_node.get('instance_uuid')) if temp_node.get('instance_uuid') else None
             # 裸金属的ipmi的ip地址
             ipmi_address = temp_node.get('driver_info').get('ipmi_address') if temp_node.get('driver_info') else None
-            # 与裸机对应的资产的id
-            asset_id = None
-            if asset_list is not None:
-                # 遍历资产查找与裸机ipmi的IP能对应的数据
-                for temp_asset in asset_list:
-                    # 资产的ip地址
-                    asset_ips = get_asset_ip(temp_asset)
-                    if asset_ips and ipmi_address and ipmi_address in asset_ips:
-                        # ipmi的ip地址与资产的ip地址相同
-                        asset_id = temp_asset.get('asset_id')
-                        break
+            # 与裸机ipmi的IP对应的资产的id
+            asset_id = asset_ip_index.get(ipmi_address) if ipmi_address else None
             # 组装数据
             temp_relation = init_asset_resource_relation(temp_node, asset_id, server_detail)
             # 追加资源的用户和项目名称
-            attach_user_and_project(temp_relation)
-            # 加入到列表中
-            asset_resource_relation_list.append(temp_relation)
-        # 保存数据
-        if asset_resource_relation_list:
-            for temp_relation in asset_resource_relation_list:
-                # 查询数据库中的数据
-                db_relation = AssetResourceRelationSQL.get_asset_resource_relation_by_resource_id(temp_relation.resource_id)
-                # 如果数据库中没有数据，则插入数据
-                if not db_relation:
-                    # 数据插入
-                    AssetResourceRelationSQL.create_asset_resource_relation(temp_relation)
-                else:
-                    if len(db_relation) > 1:
-                        # 先根据resource_id删除所有重复数据
-                        AssetResourceRelationSQL.delete_asset_resource_relation_by_resource_id(temp_relation.resource_id)
-                        # 数据插入
-                        AssetResourceRelationSQL.create_asset_resource_relation(temp_relation)
-                    else:
-                        # 数据更新
-                        update_asset_resource_relation(db_relation[0], temp_relation)
-        # 删除掉已经不存在的资源数据
-        # 读取所有裸机关联关系数据
-        asset_resource_relation_list = AssetResourceRelationSQL.get_all_asset_resource_relation()
-        if asset_resource_relation_list:
-            # 读取所有裸机的id
-            for temp_db_relation in asset_resource_relation_list:
-                # 数据不在资源列表中
-                if temp_db_relation.resource_id not in resource_id_list:
-                    # 数据删除
-                    AssetResourceRelationSQL.delete_asset_resource_relation_by_resource_id(temp_db_relation.resource_id)
+            attach_user_and_project(ironic_client, temp_relation, db_relation_by_resource_id.get(temp_relation.resource_id))
+            relation_dict[temp_relation.resource_id] = temp_relation
+        # 5、与数据库中的数据对比，在一个事务中新增、更新、删除
+        create_list, update_list, delete_resource_id_list = diff_asset_resource_relation(
+            relation_dict, db_relation_list)
+        AssetResourceRelationSQL.sync_asset_resource_relation(create_list, update_list, delete_resource_id_list)
+        print(f"资源与资产关联关系新增：{len(create_list)}，更新：{len(update_list)}，删除资源：{len(delete_resource_id_list)}")
 
         # 处理资产表中未关联资源的数据的标识状态
         handle_asset_table_relation_resource_flag()
@@ -136,35 +137,71 @@ def init_asset_resource_relation(temp_node, asset_id, server_detail):
         create_date=datetime.fromtimestamp(datetime.now().timestamp()),
     )
 
-# 更新资产资源关系
+# 对比新的关联关系与数据库中的数据，返回新增、更新的数据与需要删除的资源id
+def diff_asset_resource_relation(relation_dict, db_relation_list):
+    db_relation_dict = {}
+    for db_relation in db_relation_list or []:
+        db_relation_dict.setdefault(db_relation.resource_id, []).append(db_relation)
+    create_list = []
+    update_list = []
+    # 已经不存在的资源
+    delete_resource_id_list = [resource_id for resource_id in db_relation_dict if resource_id not in relation_dict]
+    for resource_id, temp_relation in relation_dict.items():
+        db_relations = db_relation_dict.get(resource_id)
+        if not db_relations:
+            create_list.append(temp_relation)
+        elif len(db_relations) > 1:
+            # 重复数据先根据resource_id全部删除再插入
+            delete_resource_id_list.append(resource_id)
+            create_list.append(temp_relation)
+        elif update_asset_resource_relation(db_relations[0], temp_relation):
+            update_list.append(db_relations[0])
+    return create_list, update_list, delete_resource_id_list
+
+# 更新资产资源关系，只有数据变化时更新，返回是否变化
 def update_asset_resource_relation(db_relation, temp_relation):
-    # 数据更新
-    db_relation.asset_id = temp_relation.asset_id
-    db_relation.resource_name = temp_relation.resource_name
-    db_relation.node_name = temp_relation.node_name
-    db_relation.resource_status = temp_relation.resource_status
-    db_relation.resource_ip = temp_relation.resource_ip
-    db_relation.resource_user_id = temp_relation.resource_user_id
-    db_relation.resource_user_name = temp_relation.resource_user_name
-    db_relation.resource_project_id = temp_relation.resource_project_id
-    db_relation.resource_project_name = temp_relation.resource_project_name
-    db_relation.update_date = datetime.fromtimestamp(datetime.now().timestamp())
-    AssetResourceRelationSQL.update_asset_resource_relation(db_relation)
+    changed = False
+    for field in relation_sync_fields:
+        if getattr(db_relation, field) != getattr(temp_relation, field):
+            setattr(db_relation, field, getattr(temp_relation, field))
+            changed = True
+    if changed:
+        db_relation.update_date = datetime.fromtimestamp(datetime.now().timestamp())
+    return changed
+
+# 一次查询所有虚拟机，返回虚拟机id与详情的字典；查询失败时抛出异常，本次不同步，保留数据库中的数据
+def get_server_dict(node_list):
+    if not any(temp_node.get('instance_uuid') for temp_node in node_list):
+        return {}
+    server_list = NovaClient().nova_list_servers_detail()
+    return {server.get('id'): server for server in server_list}
 
 # 追加资源的用户和项目名称
-def attach_user_and_project(temp_relation):
-    # 追加资源的用户和项目名称
-    ironic_client = None
-    if temp_relation.resource_user_id is not None or temp_relation.resource_project_id is not None:
-        ironic_client = IronicClient()
+def attach_user_and_project(ironic_client, temp_relation, db_relation=None):
+    # 查询失败时沿用数据库中同一用户、项目已保存的名称
     if temp_relation.resource_user_id:
-        user = ironic_client.keystone_get_user_by_id(temp_relation.resource_user_id)
-        if user:
-            temp_relation.resource_user_name = user.get('name')
+        stored_name = db_relation.resource_user_name \
+            if db_relation and db_relation.resource_user_id == temp_relation.resource_user_id else None
+        temp_relation.resource_user_name = keystone_name_cache.get_name(
+            "user", temp_relation.resource_user_id, ironic_client.keystone_get_user_by_id, stored_name)
     if temp_relation.resource_project_id:
-        project = ironic_client.keystone_get_project_by_id(temp_relation.resource_project_id)
-        if project:
-            temp_relation.resource_project_name = project.get('name')
+        stored_name = db_relation.resource_project_name \
+            if db_relation and db_relation.resource_project_id == temp_relation.resource_project_id else None
+        temp_relation.resource_project_name = keystone_name_cache.get_name(
+            "project", temp_relation.resource_project_id, ironic_client.keystone_get_project_by_id, stored_name)
+
+# 构建资产ip到资产id的索引，资产的ip字段可以包含多个ip
+def build_asset_ip_index(asset_list):
+    asset_ip_index = {}
+    for temp_asset in asset_list or []:
+        asset_ips = get_asset_ip(temp_asset)
+        if not asset_ips:
+            continue
+        for asset_ip in asset_ip_separator.split(str(asset_ips)):
+            # 多个资产的ip相同时与第一个资产关联
+            if asset_ip:
+                asset_ip_index.setdefault(asset_ip, temp_asset.get('asset_id'))
+    return asset_ip_index
 
 # 查询所有的资产列表
 def get_all_asset_list():
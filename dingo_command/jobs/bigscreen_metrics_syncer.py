@@ -2,9 +2,8 @@
 import json
 
 from apscheduler.schedulers.blocking import BlockingScheduler
-from pymemcache.client.base import Client
 from apscheduler.schedulers.background import BackgroundScheduler
-from dingo_command.services.bigscreens import BigScreensService, region_name
+from dingo_command.services.bigscreens import BigScreensService, region_name, N9E_METRICS_NAMES, memcached_client
 from dingo_command.services.bigscreenshovel import BigScreenShovelService
 from dingo_command.jobs import CONF
 from datetime import datetime, timedelta
@@ -35,16 +34,25 @@ def auto_connect_queue():
     BigScreenSyncService.connect_mq_queue()
 
 def fetch_bigscreen_metrics():
+    start_time = time.perf_counter()
+    # 一次查询所有指标配置
     metrics = BigScreensService.list_bigscreen_metrics_configs()
-    memcached_client = Client((CONF.bigscreen.memcached_address))
     metrics_dict = {}
     metrics_dict_with_prefix = {}
     print(f'client: {memcached_client}')
-    for metric in metrics:
-        metric_name = metric.name
-        metric_value = BigScreensService.get_bigscreen_metrics(metric_name, None, sync=True)
-        metrics_dict[metric_name] = metric_value
-        metrics_dict_with_prefix[f'{CONF.bigscreen.memcached_key_prefix}{metric_name}'] = metric_value
+    # n9e 指标单独获取，其余指标并发查询 prometheus
+    n9e_metrics = [metric for metric in metrics if metric.name in N9E_METRICS_NAMES]
+    prometheus_metrics = [metric for metric in metrics if metric.name not in N9E_METRICS_NAMES]
+    if n9e_metrics:
+        n9e_metrics_dict = BigScreensService.fetch_n9e_alert_counts([metric.name for metric in n9e_metrics])
+        for metric in n9e_metrics:
+            metrics_dict[metric.name] = n9e_metrics_dict.get(metric.name)
+    metrics_dict.update(BigScreensService.fetch_prometheus_metrics(prometheus_metrics))
+    # 查询失败（超时等）的指标不写入缓存、数据库和mq消息，保留上一次的值，读取时回退到数据库
+    metrics_dict = {metric_name: metric_value for metric_name, metric_value in metrics_dict.items() if metric_value is not None}
+    for metric_name, metric_value in metrics_dict.items():
+        metrics_dict_with_prefix[f'{CONF.bigscreen.memcached_key_prefix}{metric_name}'] = BigScreensService.encode_cached_metrics(metric_value)
+    print(f"fetch {len(metrics_dict)} bigscreen metrics time-consuming: {time.perf_counter() - start_time:.3f}s")
     try:
         # metrics 写入缓存
         memcached_client.set_many(metrics_dict_with_prefix, expire=CONF.bigscreen.metrics_expiration_time)
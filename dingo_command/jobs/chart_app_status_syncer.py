@@ -223,12 +223,7 @@ async def check_sync_status():
         if not data.get("data"):
             raise ValueError("repo not found")
         repo_data = data.get("data")
-        # 先删除原来的repo的charts应用
-        data = chart_service.get_repo_from_name(repo_id)
-        if data.get("data"):
-            chart_service.delete_charts_repo_id(data.get("data"))
-
-        # 再添加新的repo的charts应用
+        # 增量同步repo的charts应用
         repo_data_info = CreateRepoObject(
             id=repo_id,
             name=repo_data.name,
@@ -1,5 +1,5 @@
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.schedulers.background import BackgroundScheduler
 from oslo_log import log
@@ -16,132 +16,141 @@ blocking_scheduler = BlockingScheduler()
 run_time_10s = datetime.now() + timedelta(seconds=10)  # 任务将在10秒后执行
 run_time_30s = datetime.now() + timedelta(seconds=30)  # 任务将在30秒后执行
 
+# 完整查询虚拟机列表的间隔（秒），其余的同步只查询变化的虚拟机
+FULL_SYNC_INTERVAL = 600
+# changes-since向前多取的时间（秒），避免时钟误差漏掉变化
+CHANGES_SINCE_MARGIN = 60
+
+# 虚拟机状态与本地状态的对应
+server_status_map = {
+    "ERROR": "error",
+    "ACTIVE": "running",
+    "BUILD": "creating",
+    "PAUSED": "paused",
+    "SUSPENDED": "suspended",
+    "SHUTOFF": "shutoff",
+    "SHELVED_OFFLOADED": "shelved_offloaded",
+}
+
 
 def start():
     # scheduler.add_job(fetch_bigscreen_metrics, 'interval', seconds=5, next_run_time=datetime.now())
-    # 添加检查集群状态的定时任务，每60秒执行一次
-    scheduler.add_job(check_instance_status, 'interval', seconds=60, next_run_time=datetime.now())
-    scheduler.add_job(check_node_status, 'interval', seconds=60, next_run_time=datetime.now())
+    # 添加检查虚拟机状态的定时任务，每60秒执行一次，instance与node共用一次nova查询
+    scheduler.add_job(check_server_status, 'interval', seconds=60, next_run_time=datetime.now())
     scheduler.start()
 
 
-def check_instance_status():
+class ServerStatusReconciler:
+    """
+    nova虚拟机状态的内存副本：定期完整查询所有虚拟机，其余时间按changes-since增量更新，
+    instance与node按server_id与副本对比，只更新状态变化的数据
+    """
+
+    def __init__(self):
+        # server_id -> 虚拟机详情
+        self.servers = {}
+        self.last_sync = None
+        self.last_full_sync = None
+
+    def refresh(self, nova_client):
+        # 以查询前的时间作为下次changes-since的起点
+        now = datetime.now(timezone.utc)
+        if self.last_full_sync is None or (now - self.last_full_sync).total_seconds() >= FULL_SYNC_INTERVAL:
+            servers = nova_client.nova_list_servers_detail()
+            self.servers = {server["id"]: server for server in servers}
+            self.last_full_sync = now
+            LOG.info(f"list all servers, count: {len(servers)}")
+        else:
+            changes_since = (self.last_sync - timedelta(seconds=CHANGES_SINCE_MARGIN)).strftime("%Y-%m-%dT%H:%M:%SZ")
+            servers = nova_client.nova_list_servers_detail(changes_since=changes_since)
+            for server in servers:
+                if server.get("status") == "DELETED":
+                    self.servers.pop(server["id"], None)
+                else:
+                    self.servers[server["id"]] = server
+            LOG.info(f"list changed servers since {changes_since}, count: {len(servers)}")
+        self.last_sync = now
+
+    def reconcile(self, nova_client, rows, row_type):
+        # 返回状态变化的数据与虚拟机已不存在的数据
+        changed_list = []
+        removed_list = []
+        for row in rows:
+            if not row.server_id:
+                continue
+            server = self.servers.get(row.server_id)
+            if server is None:
+                # 列表中没有的虚拟机单独查询确认
+                try:
+                    server = nova_client.nova_get_server_detail(row.server_id)
+                    self.servers[row.server_id] = server
+                except Exception as e:
+                    LOG.error(f"Error checking status for {row_type} {row.id}: {str(e)}")
+                    if "could not be found." in str(e):
+                        removed_list.append(row)
+                    continue
+            if apply_server_status(row, server, row_type):
+                changed_list.append(row)
+        return changed_list, removed_list
+
+
+def apply_server_status(row, server, row_type):
+    # 按虚拟机状态更新本地状态，返回是否变化，删除中的数据不更新
+    status = server_status_map.get(server.get("status"))
+    if status is None or row.status in (status, "deleting"):
+        return False
+    LOG.info(f"Updating {row_type} {row.id} status from {row.status} to {server.get('status')}")
+    row.status = status
+    row.status_msg = (server.get("fault") or {}).get("details") if status == "error" else ""
+    return True
+
+
+server_status_reconciler = ServerStatusReconciler()
+
+
+def check_server_status():
     """
-    定期检查k8s集群状态并更新数据库
+    定期检查虚拟机状态并更新instance与node数据库
     """
     try:
-        LOG.info(f"Starting check instance status at {time.strftime('%Y-%m-%d %H:%M:%S')}")
-
-        # 获取所有状态为 creating、running 或 error 的集群
-        query_params = {}
-        # query_params["status_in"] = ["creating", "running", "error"]
-        count, instances = InstanceSQL.list_instances(query_params, page_size=-1)
-
-        for instance in instances:
-            try:
-                # 检查节点状态
-                server_id = instance.server_id
-
-                # 检查实例状态
-                if server_id:
-                    nova_client = NovaClient()
-                    server = nova_client.nova_get_server_detail(server_id)
-
-                    # 如果状态发生变化，更新集群状态
-                    # if (server.get("status") == "ERROR" and instance.status != "error" or
-                    #         server.get("status") != "ACTIVE" and instance.status == "running" or
-                    #         server.get("status") == "ACTIVE" and instance.status != "running"):
-                    LOG.info(f"Updating instance {instance.id} status from {instance.status} to "
-                             f"{server.get('status')}")
-                    if server.get("status") == "ERROR" and instance.status not in ("error", "deleting"):
-                        instance.status = "error"
-                        instance.status_msg = server.get("fault").get("details")
-                    elif server.get("status") == "ACTIVE" and instance.status not in  ("deleting", "running"):
-                        instance.status = "running"
-                        instance.status_msg = ""
-                    elif server.get("status") == "BUILD" and instance.status not in ("creating", "deleting"):
-                        instance.status = "creating"
-                        instance.status_msg = ""
-                    elif server.get("status") == "PAUSED" and instance.status not in ("paused", "deleting"):
-                        instance.status = "paused"
-                        instance.status_msg = ""
-                    elif server.get("status") == "SUSPENDED" and instance.status not in ("suspended", "deleting"):
-                        instance.status = "suspended"
-                        instance.status_msg = ""
-                    elif server.get("status") == "SHUTOFF" and instance.status not in ("shutoff", "deleting"):
-                        instance.status = "shutoff"
-                        instance.status_msg = ""
-                    elif (server.get("status") == "SHELVED_OFFLOADED" and instance.status 
-                          not in ("shelved_offloaded", "deleting")):
-                        instance.status = "shelved_offloaded"
-                        instance.status_msg = ""
-                    else:
-                        continue
-                    InstanceSQL.update_instance(instance)
-            except Exception as e:
-                LOG.error(f"Error checking status for instance {instance.id}: {str(e)}")
-                if "could not be found." in str(e):
-                    InstanceSQL.delete_instance(instance)
+        LOG.info(f"Starting check server status at {time.strftime('%Y-%m-%d %H:%M:%S')}")
+        # 先读取数据库再查询nova，已有server_id的数据对应的虚拟机都在查询结果中
+        count, instances = InstanceSQL.list_instances({}, page_size=-1)
+        count, nodes = NodeSQL.list_nodes({}, page_size=-1)
+        # 整个同步共用一个token与session
+        nova_client = NovaClient()
+        server_status_reconciler.refresh(nova_client)
+        check_instance_status(nova_client, instances)
+        check_node_status(nova_client, nodes)
     except Exception as e:
-        LOG.error(f"Error in instance_status: {str(e)}")
+        LOG.error(f"Error in server_status: {str(e)}")
 
 
-def check_node_status():
+def check_instance_status(nova_client, instances):
     """
-    定期检查k8s集群状态并更新数据库
+    按虚拟机状态批量更新instance
     """
     try:
-        LOG.info(f"Starting check node status at {time.strftime('%Y-%m-%d %H:%M:%S')}")
-
-        # 获取所有状态为 creating、running 或 error 的集群
-        query_params = {}
-        # query_params["status_in"] = ["creating", "running", "error"]
-        count, nodes = NodeSQL.list_nodes(query_params, page_size=-1)
-
-        for node in nodes:
-            try:
-                # 检查节点状态
-                server_id = node.server_id
-
-                # 检查实例状态
-                if server_id:
-                    nova_client = NovaClient()
-                    server = nova_client.nova_get_server_detail(server_id)
-
-                    # 如果状态发生变化，更新集群状态
-                    # if (server.get("status") == "ERROR" and node.status != "error" or
-                    #         server.get("status") != "ACTIVE" and node.status == "running" or
-                    #         server.get("status") == "ACTIVE" and node.status != "running"):
-                    LOG.info(f"Updating node {node.id} status from {node.status} to {server.get('status')}")
-                    if server.get("status") == "ERROR" and node.status not in ("error", "deleting"):
-                        node.status = "error"
-                        node.status_msg = server.get("fault").get("details")
-                    elif server.get("status") == "ACTIVE" and node.status not in ("deleting", "running"):
-                        node.status = "running"
-                        node.status_msg = ""
-                    elif server.get("status") == "BUILD" and node.status not in ("creating", "deleting"):
-                        node.status = "creating"
-                        node.status_msg = ""
-                    elif server.get("status") == "PAUSED" and node.status not in ("paused", "deleting"):
-                        node.status = "paused"
-                        node.status_msg = ""
-                    elif server.get("status") == "SUSPENDED" and node.status not in ("suspended", "deleting"):
-                        node.status = "suspended"
-                        node.status_msg = ""
-                    elif server.get("status") == "SHUTOFF" and node.status not in ("shutoff", "deleting"):
-                        node.status = "shutoff"
-                        node.status_msg = ""
-                    elif (server.get("status") == "SHELVED_OFFLOADED" and node.status
-                          not in ("shelved_offloaded", "deleting")):
-                        node.status = "shelved_offloaded"
-                        node.status_msg = ""
-                    else:
-                        continue
-                    NodeSQL.update_node(node)
-            except Exception as e:
-                LOG.error(f"Error checking status for node {node.id}: {str(e)}")
-                if "could not be found." in str(e):
-                    NodeSQL.delete_node(node)
+        changed_list, removed_list = server_status_reconciler.reconcile(nova_client, instances, "instance")
+        if changed_list:
+            InstanceSQL.update_instance_list(changed_list)
+        if removed_list:
+            InstanceSQL.delete_instance_list(removed_list)
+        LOG.info(f"check instance status, updated: {len(changed_list)}, removed: {len(removed_list)}")
+    except Exception as e:
+        LOG.error(f"Error in instance_status: {str(e)}")
+
 
+def check_node_status(nova_client, nodes):
+    """
+    按虚拟机状态批量更新node
+    """
+    try:
+        changed_list, removed_list = server_status_reconciler.reconcile(nova_client, nodes, "node")
+        if changed_list:
+            NodeSQL.update_node_list(changed_list)
+        if removed_list:
+            NodeSQL.delete_node_list(removed_list)
+        LOG.info(f"check node status, updated: {len(changed_list)}, removed: {len(removed_list)}")
     except Exception as e:
         LOG.error(f"Error in node_status: {str(e)}")
@@ -6,6 +6,7 @@ from dingo_command.api import api_router
 from dingo_command.jobs import (bigscreen_metrics_syncer, asset_resource_relation_syncer,
                                 rabbitmq_config_init, instance_status_syncer, cluster_status_syncer, ai_instance_syncer,
                                 ai_k8s_node_resource_syncer, chart_app_status_syncer)
+from dingo_command.services.redis_channel import redis_channel_hub
 
 PROJECT_NAME = "dingo-command"
 
@@ -40,6 +41,7 @@ async def lifespan(app: FastAPI):
     chart_app_status_syncer.start()
     yield
     # Add any shutdown logic here if needed
+    await redis_channel_hub.close()
 
 app.router.lifespan_context = lifespan
 
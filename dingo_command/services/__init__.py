@@ -45,6 +45,16 @@ aliyun_dingodb_opts = [
     cfg.StrOpt('report_database', default=None, help='the aliyun dingodb report database'),
 ]
 
+# rabbitmq的消费与发布配置
+rabbitmq_group = cfg.OptGroup(name='rabbitmq', title='rabbitmq conf data')
+rabbitmq_opts = [
+    cfg.BoolOpt('consume_batch_enabled', default=True, help='consume external messages in batches with manual ack'),
+    cfg.IntOpt('consume_prefetch_count', default=500, help='the prefetch count of the batch consumer'),
+    cfg.IntOpt('consume_batch_size', default=200, help='the max number of messages written in one batch'),
+    cfg.IntOpt('consume_flush_interval_ms', default=200, help='the max milliseconds a partial batch waits before written'),
+    cfg.BoolOpt('publish_confirm', default=False, help='wait for broker confirms when publishing messages'),
+]
+
 # 注册默认配置
 CONF.register_group(default_group)
 CONF.register_opts(default_opts, default_group)
@@ -54,6 +64,9 @@ CONF.register_opts(redis_opts, redis_group)
 # 注册aliyun的dingodb配置
 CONF.register_group(aliyun_dingodb_group)
 CONF.register_opts(aliyun_dingodb_opts, aliyun_dingodb_group)
+# 注册rabbitmq配置
+CONF.register_group(rabbitmq_group)
+CONF.register_opts(rabbitmq_opts, rabbitmq_group)
 
 # redis数据
 
@@ -19,6 +19,7 @@ from oslo_log import log
 from dingo_command.api.model.aiinstance import StorageObj
 from dingo_command.common.Enum.AIInstanceEnumUtils import AiInstanceStatus, K8sStatus
 from dingo_command.common.k8s_common_operate import K8sCommonOperate
+from dingo_command.common.k8s_informer import ai_instance_informer_manager
 from dingo_command.db.models.ai_instance.models import AiInstanceInfo, AccountInfo
 from dingo_command.db.models.ai_instance.sql import AiInstanceSQL
 from dingo_command.utils.constant import NAMESPACE_PREFIX, AI_INSTANCE_SYSTEM_MOUNT_PATH_DEFAULT, \
@@ -724,8 +725,13 @@ class AiInstanceService:
 
             while (datetime.now() - start_time).total_seconds() < timeout:
                 try:
-                    # 查询 Pod 状态
-                    pod = k8s_common_operate.get_pod_info(core_k8s_client, pod_name, namespace)
+                    # 查询 Pod 状态，优先读取informer本地缓存
+                    pod = None
+                    pod_informer = ai_instance_informer_manager.get_synced_pod_informer(k8s_id)
+                    if pod_informer:
+                        pod = pod_informer.get(namespace, pod_name)
+                    if pod is None:
+                        pod = k8s_common_operate.get_pod_info(core_k8s_client, pod_name, namespace)
 
                     current_real_status = pod.status.phase
                     current_node_name = pod.spec.node_name
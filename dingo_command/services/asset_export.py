@@ -0,0 +1,149 @@
+# 资产excel流式导出的service层
+import json
+import os
+from copy import copy
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.reader.excel import load_workbook
+from oslo_log import log
+
+from dingo_command.db.models.asset.sql import AssetSQL
+from dingo_command.services.assets import thin_border
+from dingo_command.utils.constant import ASSET_SERVER_TEMPLATE_FILE_DIR, ASSET_NETWORK_TEMPLATE_FILE_DIR, \
+    ASSET_TEMPLATE_ASSET_SHEET, ASSET_TEMPLATE_PART_SHEET, asset_part_info_columns
+
+LOG = log.getLogger(__name__)
+
+# 服务端游标每批读取的资产数量
+EXPORT_FETCH_BATCH_SIZE = 500
+
+
+def _load_extra(extra):
+    try:
+        return json.loads(extra) if extra else {}
+    except Exception as e:
+        LOG.error(e)
+        return {}
+
+
+def convert_server_export_row(row):
+    """服务器资产导出行，key为模板表头"""
+    extra_json = _load_extra(row.extra)
+    return {'机房号': row.frame_position, '机柜': row.cabinet_position, 'U位': row.u_position,
+            '设备名称': row.asset_name, '设备类型': row.asset_type.replace("SERVER_", "") if row.asset_type else None,
+            '设备型号': row.equipment_number, '资产编号': row.asset_number, '序列号': row.sn_number,
+            '部门': row.department_name, '负责人': row.user_name, '主机名': extra_json.get("host_name"), 'IP': extra_json.get("ip"),
+            'IDRAC': extra_json.get("idrac"), '用途': extra_json.get("use_to"), '密码': None, '操作系统': extra_json.get("operate_system"),
+            '采购合同编号': row.contract_number, '厂商': row.manufacture_name, '备注': row.asset_description}
+
+
+def convert_network_export_row(row):
+    """网络设备资产导出行，key为模板表头"""
+    extra_json = _load_extra(row.extra)
+    return {'机房号': row.frame_position, '机柜': row.cabinet_position, 'U位': row.u_position,
+            '设备厂商': row.manufacture_name, '设备类型': row.asset_type.replace("NETWORK_", "") if row.asset_type else None,
+            '设备名称': row.asset_name, '设备型号': row.equipment_number, '资产编号': row.asset_number,
+            '主机名': extra_json.get("host_name"), '管理地址': extra_json.get("manage_address"), '带外网关': extra_json.get("external_gateway"),
+            'm-lag mac': extra_json.get("m_lagmac"), '网络设备角色': extra_json.get("network_equipment_role"), '序号': extra_json.get("serial_number"),
+            'loopback': extra_json.get("loopback"), 'vlanifv4': extra_json.get("vlanifv4"), '预留': None, 'BGP_AS': extra_json.get("bgp_as"), '用途': extra_json.get("use_to"),
+            '采购合同编号': row.contract_number}
+
+
+def convert_part_export_row(row):
+    """服务器配件导出行，没有配件时返回None；模板中没有的配件类型使用配件类型作为表头"""
+    parts = json.loads(row.asset_parts) if row.asset_parts else []
+    if not parts:
+        return None
+    part_data = {'资产编号': row.asset_number}
+    for part in parts:
+        part_data[asset_part_info_columns.get(part['part_type'], part['part_type'])] = part['part_config']
+    return part_data
+
+
+class AssetStreamingExporter:
+    """
+    资产excel流式导出
+
+    通过服务端游标读取单条联表查询（配件聚合为JSON）的结果，逐行写入 write-only 工作簿，
+    保留模板的表头、表头样式、列宽与冻结窗格；内存占用不随资产数量增长。
+    """
+
+    def __init__(self, fetch_batch_size=EXPORT_FETCH_BATCH_SIZE):
+        self.fetch_batch_size = fetch_batch_size
+
+    def export(self, asset_type, result_file_path, asset_ids=None):
+        """导出资产文件，asset_ids为逗号分隔的资产id，为空时导出该类型的全部资产；不支持的类型返回False"""
+        asset_id_list = asset_ids.split(",") if asset_ids else None
+        if asset_type == "SERVER":
+            self._export_server(result_file_path, asset_id_list)
+        elif asset_type == "NETWORK":
+            self._export_network(result_file_path, asset_id_list)
+        else:
+            return False
+        return True
+
+    def _export_server(self, result_file_path, asset_ids):
+        template = load_workbook(os.getcwd() + ASSET_SERVER_TEMPLATE_FILE_DIR)
+        # 写入前先确定配件sheet页的自定义表头
+        custom_part_headers = sorted(part_type for part_type in AssetSQL.list_asset_part_types("SERVER", asset_ids)
+                                     if part_type and part_type not in asset_part_info_columns)
+        book = Workbook(write_only=True)
+        asset_sheet, asset_headers = self._create_sheet(book, template[ASSET_TEMPLATE_ASSET_SHEET])
+        part_sheet, part_headers = self._create_sheet(book, template[ASSET_TEMPLATE_PART_SHEET], custom_part_headers)
+        count = 0
+        for row in AssetSQL.stream_asset_export_rows("SERVER", asset_ids, self.fetch_batch_size):
+            self._append_row(asset_sheet, asset_headers, convert_server_export_row(row))
+            part_data = convert_part_export_row(row)
+            if part_data:
+                self._append_row(part_sheet, part_headers, part_data, "")
+            count += 1
+        book.save(result_file_path)
+        LOG.info(f"export server assets: {count}")
+
+    def _export_network(self, result_file_path, asset_ids):
+        template = load_workbook(os.getcwd() + ASSET_NETWORK_TEMPLATE_FILE_DIR)
+        book = Workbook(write_only=True)
+        sheet, headers = self._create_sheet(book, template.active)
+        count = 0
+        for row in AssetSQL.stream_asset_export_rows("NETWORK", asset_ids, self.fetch_batch_size):
+            self._append_row(sheet, headers, convert_network_export_row(row), "")
+            count += 1
+        book.save(result_file_path)
+        LOG.info(f"export network assets: {count}")
+
+    def _create_sheet(self, book, template_sheet, extra_headers=()):
+        """按模板创建 write-only sheet 页并写入表头，返回 (sheet, 表头列表)"""
+        sheet = book.create_sheet(template_sheet.title)
+        for key, dimension in template_sheet.column_dimensions.items():
+            if dimension.width:
+                sheet_dimension = sheet.column_dimensions[key]
+                sheet_dimension.width = dimension.width
+                sheet_dimension.min, sheet_dimension.max = dimension.min, dimension.max
+        if template_sheet.freeze_panes:
+            sheet.freeze_panes = template_sheet.freeze_panes
+        headers, header_cells = [], []
+        for template_cell in template_sheet[1]:
+            if template_cell.value is None:
+                continue
+            cell = WriteOnlyCell(sheet, value=template_cell.value)
+            if template_cell.has_style:
+                cell.font = copy(template_cell.font)
+                cell.fill = copy(template_cell.fill)
+                cell.border = copy(template_cell.border)
+                cell.alignment = copy(template_cell.alignment)
+            headers.append(template_cell.value)
+            header_cells.append(cell)
+        for header in extra_headers:
+            headers.append(header)
+            header_cells.append(WriteOnlyCell(sheet, value=header))
+        sheet.append(header_cells)
+        return sheet, headers
+
+    def _append_row(self, sheet, headers, data, default=None):
+        cells = []
+        for header in headers:
+            cell = WriteOnlyCell(sheet, value=data.get(header, default))
+            cell.border = thin_border
+            cells.append(cell)
+        sheet.append(cells)
@@ -0,0 +1,226 @@
+# 资产excel批量导入的service层
+import uuid
+
+import pandas as pd
+from oslo_log import log
+
+from dingo_command.api.model.system import OperateLogApiModel
+from dingo_command.db.models.asset.models import AssetManufacturesInfo
+from dingo_command.db.models.asset.sql import AssetSQL
+from dingo_command.services.assets import AssetsService
+from dingo_command.services.custom_exception import Fail
+from dingo_command.services.system import SystemService
+from dingo_command.utils.constant import ASSET_TEMPLATE_ASSET_SHEET, ASSET_TEMPLATE_PART_SHEET, \
+    ASSET_TEMPLATE_NETWORK_SHEET, ASSET_IMPORT_CHUNK_SIZE
+
+LOG = log.getLogger(__name__)
+
+assets_service = AssetsService()
+system_service = SystemService()
+
+# excel数据行号与DataFrame下标的差值（表头占一行，excel行号从1开始）
+EXCEL_ROW_OFFSET = 2
+
+
+class AssetImportResult:
+    """资产批量导入结果：总行数、成功行数以及每个sheet页的错误行"""
+
+    def __init__(self):
+        self.total = 0
+        self.success = 0
+        self.errors = {}
+
+    def add_error(self, sheet_name, row_number, error):
+        LOG.error(f"import asset failed, sheet:{sheet_name}, error row number:{row_number}, error:{error}")
+        self.errors.setdefault(sheet_name, []).append({"row": row_number, "error": str(error)})
+
+    def error_rows(self, sheet_name):
+        return sorted(item["row"] for item in self.errors.get(sheet_name, []))
+
+    def to_dict(self):
+        return {"total": self.total, "success": self.success, "failed": self.total - self.success, "errors": self.errors}
+
+
+class AssetBulkImporter:
+    """
+    资产excel批量导入
+
+    一次解析所有sheet页，资产类型、厂商、资产编号通过批量预查询解析，
+    资产的基础、厂商关联、位置、合同、归属、租户、配件数据按批次在一个事务内批量写入；
+    某个批次写入失败时逐行重试，定位出错的行，其余行照常导入。
+    """
+
+    def __init__(self, chunk_size=ASSET_IMPORT_CHUNK_SIZE, progress_callback=None):
+        """
+        :param chunk_size: 每个事务写入的资产数量
+        :param progress_callback: 进度回调 progress_callback(sheet_name, done, total)
+        """
+        self.chunk_size = chunk_size
+        self.progress_callback = progress_callback
+
+    def import_server_workbook(self, buffer):
+        # 一次解析资产与配件两个sheet页
+        sheets = pd.read_excel(buffer, sheet_name=[ASSET_TEMPLATE_ASSET_SHEET, ASSET_TEMPLATE_PART_SHEET], dtype={'资产编号': str})
+        result = AssetImportResult()
+        self._import_asset_rows(ASSET_TEMPLATE_ASSET_SHEET, sheets[ASSET_TEMPLATE_ASSET_SHEET],
+                                assets_service.convert_import_asset_row, result)
+        self._import_part_rows(ASSET_TEMPLATE_PART_SHEET, sheets[ASSET_TEMPLATE_PART_SHEET], result)
+        return result
+
+    def import_network_workbook(self, buffer):
+        df = pd.read_excel(buffer, sheet_name=ASSET_TEMPLATE_NETWORK_SHEET)
+        result = AssetImportResult()
+        self._import_asset_rows(ASSET_TEMPLATE_NETWORK_SHEET, df, assets_service.convert_import_asset_network_row, result)
+        return result
+
+    def _report_progress(self, sheet_name, done, total):
+        LOG.info(f"import asset sheet:{sheet_name} progress: {done}/{total}")
+        if self.progress_callback:
+            self.progress_callback(sheet_name, done, total)
+
+    def _import_asset_rows(self, sheet_name, df, convert_row, result):
+        """导入资产sheet页"""
+        rows = df.to_dict("records")
+        result.total += len(rows)
+        # 资产类型全量预查询，类型数据量很小
+        asset_types = AssetSQL.list_asset_type(None, None, None, None)
+        asset_type_ids = {asset_type.asset_type_name: asset_type.id for asset_type in asset_types}
+        asset_type_names = {asset_type.id: asset_type.asset_type_name for asset_type in asset_types}
+
+        # 1、解析每一行为资产对象，同一资产编号出现多次时以最后一行为准（与逐行导入覆盖的结果一致）
+        assets = {}
+        for index, row in enumerate(rows):
+            row_number = index + EXCEL_ROW_OFFSET
+            try:
+                asset = convert_row(row, asset_type_ids)
+                if asset.asset_name is None or asset.asset_type_id is None:
+                    raise Fail("name empty", error_message="名称是空")
+                if asset.asset_type_id not in asset_type_names:
+                    raise Fail("asset type not exists", error_message="资产类型不存在")
+                asset.asset_number = str(asset.asset_number) if asset.asset_number else None
+                assets[asset.asset_number or f"__row_{row_number}"] = (row_number, asset)
+            except Fail as e:
+                result.add_error(sheet_name, row_number, e.error_message)
+            except Exception as e:
+                result.add_error(sheet_name, row_number, e)
+        superseded = len(rows) - len(result.errors.get(sheet_name, [])) - len(assets)
+
+        # 2、预查询已存在的资产编号（导入时覆盖）与重名资产
+        asset_numbers = [asset.asset_number for _, asset in assets.values() if asset.asset_number]
+        existing_number_ids = {asset_db.asset_number: asset_db.id for asset_db in AssetSQL.list_asset_basic_info_by_asset_numbers(asset_numbers)}
+        no_number_names = [asset.asset_name for _, asset in assets.values() if not asset.asset_number]
+        existing_names = {asset_db.name for asset_db in AssetSQL.list_asset_basic_info_by_names(no_number_names)}
+
+        # 3、预查询厂商，不存在的厂商先统一创建，每个名称只创建一次
+        manufacture_names = {asset.asset_manufacturer.name for _, asset in assets.values()
+                             if asset.asset_manufacturer and asset.asset_manufacturer.name}
+        manufacture_ids = {manufacture_db.name: manufacture_db.id for manufacture_db in AssetSQL.list_manufacture_by_names(list(manufacture_names))}
+        new_manufactures = [AssetManufacturesInfo(id=uuid.uuid4().hex, name=name, description=None)
+                            for name in manufacture_names if name not in manufacture_ids]
+        AssetSQL.create_manufactures(new_manufactures)
+        manufacture_ids.update({manufacture_db.name: manufacture_db.id for manufacture_db in new_manufactures})
+
+        # 4、组装待写入的数据库对象
+        pending = []
+        for row_number, asset in assets.values():
+            if not asset.asset_number and asset.asset_name in existing_names:
+                result.add_error(sheet_name, row_number, "资产名称或编号重复")
+                continue
+            pending.append((row_number, asset, self._build_asset_db_objects(asset, asset_type_names, manufacture_ids)))
+
+        # 5、按批次写入
+        result.success += superseded
+        for start in range(0, len(pending), self.chunk_size):
+            chunk = pending[start:start + self.chunk_size]
+            succeeded = self._write_asset_chunk(chunk, existing_number_ids)
+            if succeeded is None:
+                # 批次失败时逐行重试，定位错误行
+                succeeded = []
+                for item in chunk:
+                    try:
+                        if self._write_asset_chunk([item], existing_number_ids, raise_error=True) is not None:
+                            succeeded.append(item)
+                    except Exception as e:
+                        result.add_error(sheet_name, item[0], e)
+            result.success += len(succeeded)
+            self._report_progress(sheet_name, min(start + self.chunk_size, len(pending)), len(pending))
+
+    def _build_asset_db_objects(self, asset, asset_type_names, manufacture_ids):
+        """与 AssetsService.create_asset 相同的数据组装，厂商使用预查询结果"""
+        asset_type_name = asset_type_names[asset.asset_type_id]
+        asset_basic_info_db = assets_service.convert_asset_basic_info_db(asset)
+        asset_basic_info_db.asset_type = asset_type_name
+        asset_basic_info_db.asset_category = asset_type_name.split("_")[0]
+        # 资产的id重新生成覆盖
+        asset.asset_id = asset_basic_info_db.id
+        manufacture_relation_info_db = None
+        if asset.asset_manufacturer and asset.asset_manufacturer.name:
+            manufacture_relation_info_db = assets_service.convert_manufacturer_relation_info_db(asset, None, None)
+            manufacture_relation_info_db.manufacture_id = manufacture_ids.get(asset.asset_manufacturer.name)
+        operate_log_db = system_service.convert_system_log_info_db(
+            OperateLogApiModel(operate_type="create", resource_type="asset", resource_id=asset.asset_id, resource_name=asset.asset_name, operate_flag=True))
+        return {
+            "basic": asset_basic_info_db,
+            "manufacture_relation": manufacture_relation_info_db,
+            "position": assets_service.convert_asset_position_info_db(asset),
+            "contract": assets_service.convert_asset_contract_info_db(asset),
+            "belong": assets_service.convert_asset_belong_info_db(asset),
+            "customer": assets_service.convert_asset_customer_info_db(asset),
+            "parts": assets_service.convert_asset_part_info_db(asset) or [],
+            "operate_log": operate_log_db,
+        }
+
+    def _write_asset_chunk(self, chunk, existing_number_ids, raise_error=False):
+        """一个事务写入一个批次，成功返回写入的条目，失败返回None"""
+        def collect(key):
+            return [db_objects[key] for _, _, db_objects in chunk if db_objects[key] is not None]
+        delete_asset_ids = [existing_number_ids[asset.asset_number] for _, asset, _ in chunk
+                            if asset.asset_number in existing_number_ids]
+        try:
+            AssetSQL.bulk_import_assets(delete_asset_ids, collect("basic"), collect("manufacture_relation"), collect("position"),
+                                        collect("contract"), collect("belong"), collect("customer"),
+                                        [part for _, _, db_objects in chunk for part in db_objects["parts"]],
+                                        collect("operate_log"))
+            return chunk
+        except Exception as e:
+            if raise_error:
+                raise e
+            LOG.error(f"import asset chunk failed, retry row by row, error:{e}")
+            return None
+
+    def _import_part_rows(self, sheet_name, df, result):
+        """导入配件sheet页，资产sheet页写入完成后按资产编号批量预查询所属资产"""
+        rows = df.to_dict("records")
+        result.total += len(rows)
+        asset_numbers = [str(row["资产编号"]) for row in rows if pd.notna(row.get("资产编号", None))]
+        asset_infos = {asset_db.asset_number: (asset_db.id, asset_db.name) for asset_db in AssetSQL.list_asset_basic_info_by_asset_numbers(asset_numbers)}
+
+        pending = []
+        for index, row in enumerate(rows):
+            row_number = index + EXCEL_ROW_OFFSET
+            asset_number = str(row["资产编号"]) if pd.notna(row.get("资产编号", None)) else None
+            # 资产编号空或资产不存在，不导入（与逐行导入一致，不视为错误）
+            if not asset_number or asset_number not in asset_infos:
+                LOG.info(f"资产编号：{asset_number}的设备不存在，配件不需要导入")
+                result.success += 1
+                continue
+            try:
+                asset_id, asset_name = asset_infos[asset_number]
+                pending.append((row_number, assets_service.convert_import_asset_part_row(row, asset_id, asset_name)))
+            except Exception as e:
+                result.add_error(sheet_name, row_number, e)
+
+        for start in range(0, len(pending), self.chunk_size):
+            chunk = pending[start:start + self.chunk_size]
+            try:
+                AssetSQL.bulk_create_asset_parts([part for _, parts in chunk for part in parts])
+                result.success += len(chunk)
+            except Exception as e:
+                LOG.error(f"import asset part chunk failed, retry row by row, error:{e}")
+                for row_number, parts in chunk:
+                    try:
+                        AssetSQL.bulk_create_asset_parts(parts)
+                        result.success += 1
+                    except Exception as row_error:
+                        result.add_error(sheet_name, row_number, row_error)
+            self._report_progress(sheet_name, min(start + self.chunk_size, len(pending)), len(pending))
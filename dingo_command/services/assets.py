@@ -54,11 +54,17 @@ class AssetsService:
         # 返回
         return new_value
     # 查询资产列表
-    def list_assets(self, query_params, page, page_size, sort_keys, sort_dirs):
+    def list_assets(self, query_params, page, page_size, sort_keys, sort_dirs, keyset=False, cursor=None):
         # 业务逻辑
         try:
-            # 按照条件从数据库中查询数据
-            count, data = AssetSQL.list_asset(query_params, page, page_size, sort_keys, sort_dirs)
+            # 按照条件从数据库中查询数据，keyset为True时按游标分页（固定按创建时间倒序）
+            next_cursor = None
+            if keyset:
+                count, data, next_cursor = AssetSQL.list_asset_by_cursor(query_params, page_size, cursor)
+            else:
+                count, data = AssetSQL.list_asset(query_params, page, page_size, sort_keys, sort_dirs)
+            # 批量查询当前页所有资产的配件，按资产id分组
+            asset_parts_dict = self.list_assets_parts_by_asset_ids([r.id for r in data]) or {}
             # 数据处理
             ret = []
             # 遍历
@@ -134,7 +140,7 @@ class AssetsService:
                 temp_cutomer["description"] = r.customer_description
                 temp["asset_customer"] = temp_cutomer
                 # 配件信息
-                temp["asset_part"] = self.list_assets_parts(r.id)
+                temp["asset_part"] = asset_parts_dict.get(r.id, [])
                 # 配件信息转到列表外部
                 if temp["asset_part"]:
                     for temp_asset_part in temp["asset_part"]:
@@ -166,7 +172,10 @@ class AssetsService:
             # 返回数据
             res = {}
             # 页数相关信息
-            if page and page_size:
+            if keyset:
+                res['pageSize'] = page_size
+                res['nextCursor'] = next_cursor
+            elif page and page_size:
                 res['currentPage'] = page
                 res['pageSize'] = page_size
                 res['totalPages'] = ceil(count / int(page_size))
@@ -218,7 +227,7 @@ class AssetsService:
             query_params = {}
             query_params["asset_name"] = asset.asset_name
             query_params["asset_number"] = asset.asset_number
-            count, _ = AssetSQL.list_asset(query_params, 1,10,None,None)
+            count = AssetSQL.count_asset(query_params)
             if count > 0:
                 LOG.error("asset name or number exist")
                 raise Fail("asset exists", error_message="资产名称或编号重复")
@@ -593,60 +602,76 @@ class AssetsService:
         return asset_number
 
 
+    # 资产类型名称查询资产类型id，asset_type_ids为批量导入时预先查询的 资产类型名称->id 映射
+    def get_asset_type_id_by_name(self, asset_type_name, asset_type_ids=None):
+        if asset_type_ids is not None:
+            return asset_type_ids.get(asset_type_name)
+        asset_type_db = AssetSQL.get_asset_type_by_name(asset_type_name)
+        return asset_type_db.id if asset_type_db else None
+
+
+    # excel中服务器sheet页的一行数据转换为资产对象
+    def convert_import_asset_row(self, row, asset_type_ids=None):
+        # 初始化数据对象
+        asset = self.init_empty_asset_api_model()
+        asset.asset_type_id = "8fb707d8-b07e-11ef-90c8-44a842237864"
+        asset.asset_category = "SERVER"
+        # 从excel中加载基础信息数据
+        for basic_key, basic_column in asset_basic_info_columns.items():
+            # 判断excel的数据是非nan
+            if pd.notna(row[basic_column]):
+                asset.__setattr__(basic_key, row[basic_column])
+        # 重设资产设备分类类型
+        if asset.asset_type:
+            asset_type_id = self.get_asset_type_id_by_name("SERVER_" + asset.asset_type, asset_type_ids)
+            if asset_type_id:
+                asset.asset_type_id = asset_type_id
+        # 组装extra
+        extra = {}
+        for extra_key, extra_column in asset_basic_info_extra_columns.items():
+            # 判断excel的数据是非nan
+            if pd.notna(row[extra_column]):
+                extra[extra_key] = row[extra_column]
+        asset.extra = extra
+        # 从excel中加载厂商信息数据
+        for manufacture_key, manufacture_column in asset_manufacture_info_columns.items():
+            # 判断excel的数据是非nan
+            if pd.notna(row[manufacture_column]):
+                asset.asset_manufacturer.__setattr__(manufacture_key, row[manufacture_column])
+        # 从excel中加载位置信息数据
+        for position_key, position_column in asset_position_info_columns.items():
+            # 判断excel的数据是非nan
+            if pd.notna(row[position_column]):
+                asset.asset_position.__setattr__(position_key, row[position_column])
+        # 从excel中加载合同信息数据
+        for contract_key, contract_column in asset_contract_info_columns.items():
+            # 判断excel的数据是非nan
+            if pd.notna(row.get(contract_column, None)):
+                row_value = row[contract_column]
+                # 购买日期单独处理
+                if "purchase_date" == contract_key:
+                    row_value = int(row_value.timestamp() * 1000)
+                # 赋值
+                asset.asset_contract.__setattr__(contract_key, row_value)
+        # 从excel中加载归属信息数据
+        for belong_key, belong_column in asset_belong_info_columns.items():
+            # 判断excel的数据是非nan
+            if pd.notna(row[belong_column]):
+                asset.asset_belong.__setattr__(belong_key, row[belong_column])
+        # 从excel中加载租户信息数据
+        for customer_key, customer_column in asset_customer_info_columns.items():
+            # 判断excel的数据是非nan
+            if pd.notna(row.get(customer_column, None)):
+                asset.asset_customer.__setattr__(customer_key, row.get(customer_column, None))
+        # 返回
+        return asset
+
+
     def import_asset(self, row):
         # 存入一行
         try:
-            # 初始化数据对象
-            asset = self.init_empty_asset_api_model()
-            asset.asset_type_id = "8fb707d8-b07e-11ef-90c8-44a842237864"
-            asset.asset_category = "SERVER"
-            # 从excel中加载基础信息数据
-            for basic_key, basic_column in asset_basic_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row[basic_column]):
-                    asset.__setattr__(basic_key, row[basic_column])
-            # 重设资产设备分类类型
-            if asset.asset_type:
-                asset_type_db = AssetSQL.get_asset_type_by_name("SERVER_" + asset.asset_type)
-                if asset_type_db:
-                    asset.asset_type_id = asset_type_db.id
-            # 组装extra
-            extra = {}
-            for extra_key, extra_column in asset_basic_info_extra_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row[extra_column]):
-                    extra[extra_key] = row[extra_column]
-            asset.extra = extra
-            # 从excel中加载厂商信息数据
-            for manufacture_key, manufacture_column in asset_manufacture_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row[manufacture_column]):
-                    asset.asset_manufacturer.__setattr__(manufacture_key, row[manufacture_column])
-            # 从excel中加载位置信息数据
-            for position_key, position_column in asset_position_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row[position_column]):
-                    asset.asset_position.__setattr__(position_key, row[position_column])
-            # 从excel中加载合同信息数据
-            for contract_key, contract_column in asset_contract_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row.get(contract_column, None)):
-                    row_value = row[contract_column]
-                    # 购买日期单独处理
-                    if "purchase_date" == contract_key:
-                        row_value = int(row_value.timestamp() * 1000)
-                    # 赋值
-                    asset.asset_contract.__setattr__(contract_key, row_value)
-            # 从excel中加载归属信息数据
-            for belong_key, belong_column in asset_belong_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row[belong_column]):
-                    asset.asset_belong.__setattr__(belong_key, row[belong_column])
-            # 从excel中加载租户信息数据
-            for customer_key, customer_column in asset_customer_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row.get(customer_column, None)):
-                    asset.asset_customer.__setattr__(customer_key, row.get(customer_column, None))
+            # 从excel行数据组装资产对象
+            asset = self.convert_import_asset_row(row)
             # 检测当前资产编号是否已经存在，如果存在则删掉
             self.delete_asset_by_asset_number(asset.asset_number)
             # 调用创建
@@ -681,18 +706,8 @@ class AssetsService:
             else:
                 print(f"资产编号：{asset_number}的设备不存在，配件不需要导入")
                 return None
-            # 从excel中加载配件信息数据
-            for part_key, part_column in asset_part_info_columns.items():
-                # 每一列的数据都作为一个配件
-                # 初始化数据对象
-                asset_part = self.init_empty_asset_part_api_model()
-                # 判断excel的数据是非nan
-                if pd.notna(row[part_column]):
-                    asset_part.__setattr__("part_type", part_key)
-                    asset_part.__setattr__("asset_id", asset_id)
-                    asset_part.__setattr__("name", asset_name + "_" + part_key)
-                    asset_part.__setattr__("part_config", row[part_column])
-                # 入库
+            # 从excel中加载配件信息数据并入库
+            for asset_part in self.convert_import_asset_part_row(row, asset_id, asset_name):
                 AssetSQL.create_asset_part(asset_part)
         except Exception as e:
             import traceback
@@ -700,51 +715,77 @@ class AssetsService:
             raise e
 
 
+    # excel中配件sheet页的一行数据转换为配件对象列表，每一个非空列作为一个配件
+    def convert_import_asset_part_row(self, row, asset_id, asset_name):
+        asset_parts = []
+        for part_key, part_column in asset_part_info_columns.items():
+            # 判断excel的数据是非nan，空列不生成配件
+            if not pd.notna(row.get(part_column, None)):
+                continue
+            # 初始化数据对象
+            asset_part = self.init_empty_asset_part_api_model()
+            asset_part.__setattr__("part_type", part_key)
+            asset_part.__setattr__("asset_id", asset_id)
+            asset_part.__setattr__("name", asset_name + "_" + part_key)
+            asset_part.__setattr__("part_config", row[part_column])
+            asset_parts.append(asset_part)
+        # 返回
+        return asset_parts
+
+
+    # excel中网络设备sheet页的一行数据转换为资产对象
+    def convert_import_asset_network_row(self, row, asset_type_ids=None):
+        # 初始化数据对象
+        asset = self.init_empty_asset_api_model()
+        asset.asset_type_id = "8fbc77f1-b07e-11ef-90c8-44a842237864"
+        asset.asset_category = "NETWORK"
+        # 从网络设备的excel中加载基础信息数据
+        for basic_key, basic_column in asset_network_basic_info_columns.items():
+            # 判断excel的数据是非nan
+            if pd.notna(row[basic_column]):
+                asset.__setattr__(basic_key, str(row[basic_column]))
+        # 重设资产设备分类类型
+        if asset.asset_type:
+            asset_type_id = self.get_asset_type_id_by_name("NETWORK_" + asset.asset_type, asset_type_ids)
+            if asset_type_id:
+                asset.asset_type_id = asset_type_id
+        # 从网络设备的excel中加载基础信息的扩展信息数据
+        extra = {}
+        for basic_extra_key, basic_extra_column in asset_network_basic_info_extra_columns.items():
+            # 判断excel的数据是非nan
+            if pd.notna(row[basic_extra_column]):
+                extra[basic_extra_key] = row[basic_extra_column]
+        if extra:
+            asset.extra = extra
+        # 从网络设备的excel中加载厂商信息数据
+        for manufacture_key, manufacture_column in asset_network_manufacture_info_columns.items():
+            # 判断excel的数据是非nan
+            if pd.notna(row[manufacture_column]):
+                asset.asset_manufacturer.__setattr__(manufacture_key, row[manufacture_column])
+        # 从网络设备的excel中加载位置信息数据
+        for position_key, position_column in asset_network_position_info_columns.items():
+            # 判断excel的数据是非nan
+            if pd.notna(row[position_column]):
+                asset.asset_position.__setattr__(position_key, row[position_column])
+        # 从网络设备的excel中加载合同信息数据
+        for contract_key, contract_column in asset_contract_info_columns.items():
+            # 判断excel的数据是非nan
+            if pd.notna(row.get(contract_column, None)):
+                row_value = row[contract_column]
+                # 购买日期单独处理
+                if "purchase_date" == contract_key:
+                    row_value = int(row_value.timestamp() * 1000)
+                # 赋值
+                asset.asset_contract.__setattr__(contract_key, row_value)
+        # 返回
+        return asset
+
+
     def import_asset_network(self, row):
         # 存入一行
         try:
-            # 初始化数据对象
-            asset = self.init_empty_asset_api_model()
-            asset.asset_type_id = "8fbc77f1-b07e-11ef-90c8-44a842237864"
-            asset.asset_category = "NETWORK"
-            # 从网络设备的excel中加载基础信息数据
-            for basic_key, basic_column in asset_network_basic_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row[basic_column]):
-                    asset.__setattr__(basic_key, str(row[basic_column]))
-            # 重设资产设备分类类型
-            if asset.asset_type:
-                asset_type_db = AssetSQL.get_asset_type_by_name("NETWORK_" + asset.asset_type)
-                if asset_type_db:
-                    asset.asset_type_id = asset_type_db.id
-            # 从网络设备的excel中加载基础信息的扩展信息数据
-            extra = {}
-            for basic_extra_key, basic_extra_column in asset_network_basic_info_extra_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row[basic_extra_column]):
-                    extra[basic_extra_key] = row[basic_extra_column]
-            if extra:
-                asset.extra = extra
-            # 从网络设备的excel中加载厂商信息数据
-            for manufacture_key, manufacture_column in asset_network_manufacture_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row[manufacture_column]):
-                    asset.asset_manufacturer.__setattr__(manufacture_key, row[manufacture_column])
-            # 从网络设备的excel中加载位置信息数据
-            for position_key, position_column in asset_network_position_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row[position_column]):
-                    asset.asset_position.__setattr__(position_key, row[position_column])
-            # 从网络设备的excel中加载合同信息数据
-            for contract_key, contract_column in asset_contract_info_columns.items():
-                # 判断excel的数据是非nan
-                if pd.notna(row.get(contract_column, None)):
-                    row_value = row[contract_column]
-                    # 购买日期单独处理
-                    if "purchase_date" == contract_key:
-                        row_value = int(row_value.timestamp() * 1000)
-                    # 赋值
-                    asset.asset_contract.__setattr__(contract_key, row_value)
+            # 从excel行数据组装资产对象
+            asset = self.convert_import_asset_network_row(row)
             # 检测当前资产编号是否已经存在，如果存在则删掉
             self.delete_asset_by_asset_number(asset.asset_number)
             # 创建
@@ -1620,7 +1661,7 @@ class AssetsService:
         try:
             # 判断是否存在资产关联了厂商
             query_params = {'manufacture_id':manufacture_id}
-            count, _ = AssetSQL.list_asset(query_params)
+            count = AssetSQL.count_asset(query_params)
             if count > 0:
                 raise Fail("manufacturer in use", error_message="厂商使用中")
             # 删除对象
@@ -1878,20 +1919,8 @@ class AssetsService:
             ret = []
             # 遍历
             for r in data:
-                # 填充数据
-                temp = {}
-                temp["id"] = r.id
-                temp["name"] = r.name
-                temp["asset_id"] = r.asset_id
-                temp["part_type"] = r.part_type
-                temp["part_brand"] = r.part_brand
-                temp["part_config"] = r.part_config
-                temp["part_number"] = r.part_number
-                temp["personal_used_flag"] = r.personal_used_flag
-                temp["surplus"] = r.surplus
-                temp["description"] = r.description
-                # 加入列表
-                ret.append(temp)
+                # 填充数据并加入列表
+                ret.append(self.convert_asset_part_db_2_dict(r))
             # 返回数据
             return ret
         except Exception as e:
@@ -1899,6 +1928,38 @@ class AssetsService:
             traceback.print_exc()
             return None
 
+    # 批量查询多个资产的配件列表，返回以资产id分组的配件字典
+    def list_assets_parts_by_asset_ids(self, asset_ids):
+        # 业务逻辑
+        try:
+            # 一次IN查询获取所有资产的配件
+            data = AssetSQL.list_asset_part_by_asset_ids(asset_ids)
+            # 按资产id分组
+            ret = {}
+            for r in data:
+                ret.setdefault(r.asset_id, []).append(self.convert_asset_part_db_2_dict(r))
+            # 返回数据
+            return ret
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return None
+
+    # 配件数据库对象转换为字典
+    def convert_asset_part_db_2_dict(self, r):
+        temp = {}
+        temp["id"] = r.id
+        temp["name"] = r.name
+        temp["asset_id"] = r.asset_id
+        temp["part_type"] = r.part_type
+        temp["part_brand"] = r.part_brand
+        temp["part_config"] = r.part_config
+        temp["part_number"] = r.part_number
+        temp["personal_used_flag"] = r.personal_used_flag
+        temp["surplus"] = r.surplus
+        temp["description"] = r.description
+        return temp
+
     # 查询资产配件列表
     def list_assets_parts_pages(self, query_params, page, page_size, sort_keys, sort_dirs):
         # 业务逻辑
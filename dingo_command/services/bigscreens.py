@@ -1,13 +1,18 @@
 # 大屏的service层
+import base64
 import json
+import threading
+import time
 import urllib
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
-from pymemcache.client.base import Client
+from oslo_log import log
+from pymemcache.client.base import PooledClient
+from requests.adapters import HTTPAdapter
 from dingo_command.jobs import CONF
 
-from dingo_command.db.models.bigscreen.models import BigscreenMetrics
 from dingo_command.db.models.bigscreen.sql import BigscreenSQL
 from dingo_command.utils import datetime
 
@@ -17,6 +22,31 @@ nightingale_base_url = CONF.bigscreen.nightingale_base_url
 nightingale_username = CONF.bigscreen.nightingale_username
 nightingale_password = CONF.bigscreen.nightingale_password
 sequence_list = CONF.bigscreen.sequence_list  # 序列值指标
+prometheus_query_timeout = CONF.bigscreen.prometheus_query_timeout
+prometheus_query_concurrency = CONF.bigscreen.prometheus_query_concurrency
+
+# 通过 n9e 获取的指标
+N9E_METRICS_NAMES = ('alert_count', 'gpu_fallen_count')
+# n9e 指标对应的告警事件查询条件
+N9E_ALERT_QUERY_PARAMS = {'alert_count': {}, 'gpu_fallen_count': {"query": "掉卡"}}
+# n9e 请求超时时间（秒）
+N9E_REQUEST_TIMEOUT = 10
+
+LOG = log.getLogger(__name__)
+
+# 复用连接的prometheus查询session，连接池大小与并发数一致
+prometheus_session = requests.Session()
+prometheus_session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=prometheus_query_concurrency))
+prometheus_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=prometheus_query_concurrency))
+
+# n9e 请求复用的session及登录token缓存
+n9e_session = requests.Session()
+n9e_token_lock = threading.Lock()
+n9e_token_cache = {"access_token": None, "expire_at": 0}
+
+# 进程内共享的memcached连接池客户端
+memcached_client = PooledClient(CONF.bigscreen.memcached_address, timeout=1, connect_timeout=1,
+                                max_pool_size=CONF.bigscreen.memcached_max_pool_size)
 
 class BigScreensService:
     @classmethod
@@ -26,7 +56,7 @@ class BigScreensService:
     @classmethod
     def get_bigscreen_metrics(self, name, region, sync=False):
         # 通过 n9e 获取数据
-        if name in ['alert_count', 'gpu_fallen_count']:
+        if name in N9E_METRICS_NAMES:
             return self.fetch_n9e_metrics(name)
 
         # 通过 prometheus 同步数据
@@ -36,36 +66,100 @@ class BigScreensService:
                 query = bigscreen_metrics_config.query
             else:
                 return None
-            # 通过get请求读取实时监控数据 指标项的查询语句 + / 需要转义
-            request_url = prometheus_query_url + "query?query=" + urllib.parse.quote(query)
-            if name in sequence_list:
-                sequence = True
-            else:
-                sequence = False
-            response = requests.get(request_url)
-            return self.__handle_response(response,sequence)
+            return self.query_prometheus_metric(name, query)
 
         # 通过 memcached 和 mysql 获取数据
-        memcached_client = Client((CONF.bigscreen.memcached_address), timeout=1)
-        try:
-            memcached_metrics = memcached_client.get(f'{CONF.bigscreen.memcached_key_prefix}{name}')
-            print(f"memcached_metrics: {name} -> {memcached_metrics.decode()}")
-            if memcached_metrics:
-                print("fetch data from cache")
-                if name in sequence:
-                    return list(memcached_metrics.decode())
-                return memcached_metrics.decode()
-        except Exception as e:
-            print("fetch data from cache failed")
+        return self.get_bigscreen_metrics_batch([name], region).get(name)
+
+    @classmethod
+    def get_bigscreen_metrics_batch(self, names, region):
+        """
+        批量获取指标数据：一次 get_many 读取缓存，未命中的指标一次查询数据库
+        :param names: 指标名称列表
+        :param region: region名称，为空时表示当前region
+        :return: 指标名称 -> 指标数据
+        """
+        result = {}
+        names = list(dict.fromkeys(names))
+        # 通过 n9e 获取数据
+        n9e_names = [name for name in names if name in N9E_METRICS_NAMES]
+        if n9e_names:
+            n9e_metrics = self.fetch_n9e_alert_counts(n9e_names)
+            for name in n9e_names:
+                result[name] = n9e_metrics.get(name)
+        names = [name for name in names if name not in N9E_METRICS_NAMES]
+        if not names:
+            return result
 
-        if region == None:
+        if region is None:
             region = region_name
-        bigscreen_metrics = BigscreenSQL.get_bigscreen_metrics_by_name_and_region(name, region)
-        if bigscreen_metrics:
-            print("fetch data from db")
-            return json.loads(bigscreen_metrics.data)
+        # 缓存中只有当前region的数据
+        if region == region_name:
+            prefix = CONF.bigscreen.memcached_key_prefix
+            try:
+                memcached_metrics = memcached_client.get_many([f'{prefix}{name}' for name in names])
+                for key, value in memcached_metrics.items():
+                    name = key[len(prefix):]
+                    result[name] = self.decode_cached_metrics(name, value)
+                print(f"fetch {len(memcached_metrics)} metrics from cache")
+            except Exception as e:
+                print(f"fetch data from cache failed: {e}")
+
+        # 缓存未命中的指标一次从数据库读取
+        missing_names = [name for name in names if name not in result]
+        if missing_names:
+            for bigscreen_metrics in BigscreenSQL.get_bigscreen_metrics_by_names_and_region(missing_names, region):
+                result[bigscreen_metrics.name] = json.loads(bigscreen_metrics.data) if bigscreen_metrics.data else None
+            print(f"fetch {len(missing_names)} metrics from db")
+        return result
+
+    @classmethod
+    def encode_cached_metrics(self, value):
+        # 序列值指标以json格式写入缓存
+        if isinstance(value, (list, dict)):
+            return json.dumps(value)
+        return value
+
+    @classmethod
+    def decode_cached_metrics(self, name, value):
+        value = value.decode() if isinstance(value, bytes) else value
+        if name in sequence_list:
+            return json.loads(value)
+        return value
+
+    @classmethod
+    def query_prometheus_metric(self, name, query):
+        # 通过get请求读取实时监控数据 指标项的查询语句 + / 需要转义
+        request_url = prometheus_query_url + "query?query=" + urllib.parse.quote(query)
+        if name in sequence_list:
+            sequence = True
         else:
-            return None
+            sequence = False
+        response = prometheus_session.get(request_url, timeout=prometheus_query_timeout)
+        return self.__handle_response(response,sequence)
+
+    @classmethod
+    def fetch_prometheus_metrics(self, metrics_configs):
+        """
+        并发查询多个指标配置的prometheus数据，总耗时取决于最慢的查询
+        :param metrics_configs: 指标配置列表
+        :return: 指标名称 -> 指标数据，查询失败的指标值为None
+        """
+        def query(metrics_config):
+            start_time = time.perf_counter()
+            try:
+                return metrics_config.name, self.query_prometheus_metric(metrics_config.name, metrics_config.query)
+            except Exception as e:
+                LOG.error(f"fetch bigscreen metrics {metrics_config.name} failed: {e}")
+                return metrics_config.name, None
+            finally:
+                LOG.info(f"fetch bigscreen metrics {metrics_config.name} time-consuming: {time.perf_counter() - start_time:.3f}s")
+
+        metrics_configs = [metrics_config for metrics_config in metrics_configs if metrics_config.query]
+        if not metrics_configs:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(prometheus_query_concurrency, len(metrics_configs))) as executor:
+            return dict(executor.map(query, metrics_configs))
 
     # 解析接口返回的数据
     @classmethod
@@ -107,72 +201,110 @@ class BigScreensService:
 
     @classmethod
     def batch_upgrade_metrics_data(self, metrics_dict):
-        for name, data in metrics_dict.items():
-            metrics = BigscreenSQL.get_bigscreen_metrics_by_name_and_region(name, region_name)
-            if metrics:
-                metrics.data = data
-                metrics.last_modified = datetime.get_now_time()
-                if isinstance(data, list):
-                    metrics.data = json.dumps(data)
-                BigscreenSQL.update_bigscreen_metrics(metrics)
-            else:
-                metrics = BigscreenMetrics(
-                    id = uuid.uuid4().hex,
-                    name = name,
-                    data = data,
-                    region = region_name,
-                    last_modified = datetime.get_now_time()
-                )
-                if isinstance(data, list):
-                    metrics.data = json.dumps(data)
-                BigscreenSQL.create_bigscreen_metrics(metrics)
+        self.batch_upgrade_metrics_data_by_region(metrics_dict, region_name)
 
 
     @classmethod
     def batch_upgrade_metrics_data_by_region(self, metrics_dict, specify_region):
-        # 遍历
+        # 组装所有指标数据，一个事务批量写入
+        last_modified = datetime.get_now_time()
+        bigscreen_metrics_list = []
         for name, data in metrics_dict.items():
-            metrics = BigscreenSQL.get_bigscreen_metrics_by_name_and_region(name, specify_region)
-            if metrics:
-                metrics.data = data
-                metrics.last_modified = datetime.get_now_time()
-                BigscreenSQL.update_bigscreen_metrics(metrics)
-            else:
-                metrics = BigscreenMetrics(
-                    id = uuid.uuid4().hex,
-                    name = name,
-                    data = data,
-                    region = specify_region,
-                    last_modified = datetime.get_now_time()
-                )
-                BigscreenSQL.create_bigscreen_metrics(metrics)
+            # 查询失败的指标保留数据库中上一次的值
+            if data is None:
+                continue
+            if isinstance(data, (list, dict)):
+                data = json.dumps(data)
+            bigscreen_metrics_list.append({
+                "id": uuid.uuid4().hex,
+                "name": name,
+                "data": data,
+                "region": specify_region,
+                "last_modified": last_modified
+            })
+        BigscreenSQL.upsert_bigscreen_metrics_list(bigscreen_metrics_list)
 
     @classmethod
     def fetch_n9e_metrics(self, name):
-        access_token = self.login_n9e()
-        if access_token:
-            headers = {
-                "Authorization": f"Bearer {access_token}"
-            }
-            if name == 'alert_count':
-                url = nightingale_base_url + "/api/n9e/alert-cur-events/list"
-                response = requests.get(url, headers=headers)
+        return self.fetch_n9e_alert_counts([name]).get(name)
 
+    @classmethod
+    def fetch_n9e_alert_counts(self, names=N9E_METRICS_NAMES):
+        """
+        复用同一个token和session获取多个n9e告警数指标
+        :param names: n9e指标名称列表
+        :return: 指标名称 -> 告警数，获取失败的指标不在结果中
+        """
+        result = {}
+        access_token = self.get_n9e_token()
+        if not access_token:
+            return result
+        for name in names:
+            if name not in N9E_ALERT_QUERY_PARAMS:
+                continue
+            try:
+                response = self.__list_n9e_alert_events(access_token, N9E_ALERT_QUERY_PARAMS[name])
+                # token失效时重新登录后重试一次
+                if response.status_code == 401:
+                    access_token = self.get_n9e_token(stale_token=access_token)
+                    if not access_token:
+                        return result
+                    response = self.__list_n9e_alert_events(access_token, N9E_ALERT_QUERY_PARAMS[name])
                 if response.status_code == 200:
                     data = response.json()
-                    return data['dat']['total']
+                    result[name] = data['dat']['total']
                 else:
-                    print(f"获取告警数失败: {response}")
-            if name == 'gpu_fallen_count':
-                url = nightingale_base_url + "/api/n9e/alert-cur-events/list"
-                params = {"query": "掉卡"}
-                response = requests.get(url, headers=headers, params=params)
+                    print(f"获取{name}失败: {response}")
+            except (ValueError, KeyError, TypeError) as e:
+                # 返回的不是预期的json（requests的JSONDecodeError也是ValueError），跳过该指标
+                LOG.error(f"parse n9e metrics {name} response failed: {e}")
+            except requests.RequestException as e:
+                # 夜莺超时或不可用时不再查询其余指标，避免每个指标都等待超时
+                LOG.error(f"fetch n9e metrics {name} failed: {e}")
+                return result
+        return result
 
-                if response.status_code == 200:
-                    data = response.json()
-                    return data['dat']['total']
-                else:
-                    print(f"获取掉卡数失败: {response}")
+    @classmethod
+    def __list_n9e_alert_events(self, access_token, params):
+        url = nightingale_base_url + "/api/n9e/alert-cur-events/list"
+        headers = {
+            "Authorization": f"Bearer {access_token}"
+        }
+        # 只需要总数，不需要返回事件列表
+        return n9e_session.get(url, headers=headers, params={**params, "limit": 1}, timeout=N9E_REQUEST_TIMEOUT)
+
+    @classmethod
+    def get_n9e_token(self, stale_token=None):
+        """
+        获取缓存的n9e token，过期或失效时重新登录，并发调用时只登录一次
+        :param stale_token: 调用方确认已失效的token
+        """
+        token = n9e_token_cache.get("access_token")
+        if token and token != stale_token and n9e_token_cache["expire_at"] > time.time():
+            return token
+        with n9e_token_lock:
+            # 其他线程可能已完成登录
+            token = n9e_token_cache.get("access_token")
+            if token and token != stale_token and n9e_token_cache["expire_at"] > time.time():
+                return token
+            token = self.login_n9e()
+            n9e_token_cache["access_token"] = token
+            n9e_token_cache["expire_at"] = self.__parse_n9e_token_expire_at(token) if token else 0
+            return token
+
+    @classmethod
+    def __parse_n9e_token_expire_at(self, token):
+        # 优先使用jwt中的过期时间，提前一分钟刷新；解析失败时使用配置的有效期
+        expire_at = time.time() + CONF.bigscreen.nightingale_token_ttl
+        try:
+            payload = token.split('.')[1]
+            payload += '=' * (-len(payload) % 4)
+            exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+            if exp:
+                expire_at = min(expire_at, exp - 60)
+        except Exception:
+            pass
+        return expire_at
 
     @classmethod
     def login_n9e(self):
@@ -181,13 +313,16 @@ class BigScreensService:
             "username": nightingale_username,
             "password": nightingale_password
         }
-        login_response = requests.post(login_url, json=login_payload)
-
-        if login_response.status_code == 200:
-            login_data = login_response.json()
-            access_token = login_data["dat"]["access_token"]
-            return access_token
-        else:
-            print(f"夜莺登录失败: {login_response}")
+        try:
+            login_response = n9e_session.post(login_url, json=login_payload, timeout=N9E_REQUEST_TIMEOUT)
+            if login_response.status_code == 200:
+                login_data = login_response.json()
+                access_token = login_data["dat"]["access_token"]
+                return access_token
+            else:
+                print(f"夜莺登录失败: {login_response}")
+                return None
+        except (ValueError, KeyError, TypeError, requests.RequestException) as e:
+            # 超时、连接失败或返回的不是预期的json时视为登录失败
+            LOG.error(f"n9e login failed: {e}")
             return None
-
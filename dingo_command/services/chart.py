@@ -2,6 +2,8 @@ import time
 
 import json
 import os
+import re
+import hashlib
 import uuid
 import subprocess
 import requests
@@ -13,6 +15,8 @@ from openpyxl.styles import Border, Side
 from yaml import CLoader
 import yaml
 from harborapi import HarborAsyncClient
+from harborapi.models import Repository, Artifact
+from harborapi.utils import get_repo_path
 import asyncio
 from urllib.parse import urlparse
 from typing import List
@@ -39,6 +43,15 @@ harbor_url = CONF.DEFAULT.chart_harbor_url
 harbor_user = CONF.DEFAULT.chart_harbor_user
 harbor_passwd = CONF.DEFAULT.chart_harbor_passwd
 index_yaml = "index.yaml"
+# repo的extra中保存上次同步index.yaml状态的key
+repo_index_state_key = "index_sync"
+# repo的extra中保存上次同步oci仓库状态的key
+repo_oci_state_key = "oci_sync"
+# index.yaml顶层的generated字段，不解析整个文件即可取到
+index_generated_pattern = re.compile(r"^generated:\s*['\"]?([^'\"\r\n]+)", re.M)
+# 增量同步时对比的chart字段
+chart_sync_fields = ("description", "icon", "version", "latest_version", "deprecated", "create_time", "tag_id",
+                     "tag_name", "repo_name", "cluster_id", "type")
 
 async def create_harbor_repo(repo_name=util.repo_global_name, url=harbor_url, username=harbor_user,
                              password=harbor_passwd):
@@ -557,20 +570,247 @@ class ChartService:
             raise ValueError(f"get url /index.yaml error with {str(e)}")
 
     def handle_http_repo_content(self, url, username=None, password=None):
+        content, _, _ = self.fetch_http_repo_index(url, username, password)
+        return content
+
+    def fetch_http_repo_index(self, url, username=None, password=None, etag=None, last_modified=None):
+        """
+        条件请求index.yaml
+        :return: (内容, etag, last_modified)，index.yaml未修改(304)时内容为None
+        """
         try:
             # 构造 index.yaml 的完整 URL
             index_url = url + "/index.yaml"
+            headers = {}
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
             if not username or not password:
-                response = requests.get(index_url, timeout=util.time_out)
+                response = requests.get(index_url, headers=headers, timeout=util.time_out)
             else:
-                response = requests.get(index_url, auth=HTTPBasicAuth(username, password), timeout=util.time_out)
+                response = requests.get(index_url, auth=HTTPBasicAuth(username, password), headers=headers,
+                                        timeout=util.time_out)
+            if response.status_code == 304:
+                return None, etag, last_modified
             if response.ok:
-                return response.text
+                return response.text, response.headers.get("ETag"), response.headers.get("Last-Modified")
             raise ValueError(f"Unable to access the content in index.yaml, index.yaml is empty, please check")
         except Exception as e:
             raise ValueError(f"Unable to access the content in index.yaml, reason {str(e)}")
 
+    def get_repo_extra(self, repo_id):
+        # 读取repo的extra，里面保存了上次同步index.yaml的状态
+        count, repo_list = RepoSQL.list_repos({"id": repo_id}, 1, -1)
+        if not count or not repo_list[0].extra:
+            return {}
+        try:
+            extra = json.loads(repo_list[0].extra)
+        except ValueError:
+            return {}
+        return extra if isinstance(extra, dict) else {}
+
+    def parse_http_repo_index(self, content, repo_info_db: RepoDB):
+        # 解析index.yaml，每个chart保留最新的util.chart_nubmer个版本
+        index_data = yaml.load(content, Loader=CLoader)
+        if not index_data.get("entries") or not index_data.get("apiVersion") or not index_data.get("generated"):
+            Log.error("the content in index.yaml is empty, please check")
+            raise ValueError(f"the content in index.yaml is empty, please check")
+        chart_list = []
+        for chart_name, versions in index_data["entries"].items():
+            versions = versions[:util.chart_nubmer]
+            dict_version = {}
+            dict_version["description"] = versions[0].get("description")
+            dict_version["icon"] = versions[0].get("icon")
+            if isinstance(versions[0].get("created"), datetime):
+                dict_version["create_time"] = versions[0].get("created").isoformat()
+            else:
+                dict_version["create_time"] = versions[0].get("created")
+            dict_version["latest_version"] = versions[0].get("version")
+            dict_version["deprecated"] = versions[0].get("deprecated") or False
+            dict_version["version"] = dict()
+            for version in versions:
+                dict_info = {}
+                if isinstance(version.get("created"), datetime):
+                    dict_info["create_time"] = version.get("created").isoformat()
+                else:
+                    dict_info["create_time"] = version.get("created")
+                dict_info["urls"] = version.get("urls")
+                dict_info["deprecated"] = version.get("deprecated", False)
+                dict_version["version"][version.get("version")] = dict_info
+            chart_list.append(self.convert_chart_db(chart_name, dict_version, repo_info_db))
+        return chart_list
+
+    def chart_key(self, chart):
+        # repo中chart的唯一标识，oci类型的chart可能同名但前缀不同
+        return chart.prefix_name or "", chart.name
+
+    def diff_repo_charts(self, chart_list, exist_list):
+        """
+        对比index.yaml解析出的chart与数据库中已有的chart
+        :return: (需要新增的chart, 需要更新的chart, 需要删除的chart)
+        """
+        exist_dict = {}
+        delete_list = []
+        for chart in exist_list:
+            if self.chart_key(chart) in exist_dict:
+                # 同名的重复记录
+                delete_list.append(chart)
+            else:
+                exist_dict[self.chart_key(chart)] = chart
+        create_list = []
+        update_list = []
+        for chart in chart_list:
+            exist = exist_dict.pop(self.chart_key(chart), None)
+            if exist is None:
+                create_list.append(chart)
+                continue
+            changed = False
+            for field in chart_sync_fields:
+                if getattr(exist, field) != getattr(chart, field):
+                    setattr(exist, field, getattr(chart, field))
+                    changed = True
+            if changed:
+                update_list.append(exist)
+        # index.yaml中已经没有的chart
+        delete_list.extend(exist_dict.values())
+        return create_list, update_list, delete_list
+
+    def sync_http_repo(self, repo_info_db: RepoDB):
+        """
+        增量同步http类型repo的chart：
+        1、带If-None-Match/If-Modified-Since条件请求index.yaml，未修改(304)时不下载
+        2、index.yaml的摘要或generated与上次同步相同时不解析
+        3、与数据库中已有的chart对比，只新增、更新、删除有变化的chart
+        """
+        extra = self.get_repo_extra(repo_info_db.id)
+        state = extra.get(repo_index_state_key) or {}
+        _, exist_list = ChartSQL.list_charts({"repo_id": repo_info_db.id}, 1, -1)
+        # 地址变化或者没有已同步的chart时，不使用上次的状态，重新全量同步
+        if state.get("url") != repo_info_db.url or not exist_list:
+            state = {}
+        content, etag, last_modified = self.fetch_http_repo_index(repo_info_db.url, repo_info_db.username,
+                                                                  repo_info_db.password, state.get("etag"),
+                                                                  state.get("last_modified"))
+        new_state = {"url": repo_info_db.url, "etag": etag, "last_modified": last_modified,
+                     "digest": state.get("digest"), "generated": state.get("generated")}
+        if content is None:
+            Log.info("index.yaml not modified, skip sync repo %s" % repo_info_db.name)
+        else:
+            digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            match = index_generated_pattern.search(content)
+            generated = match.group(1).strip() if match else None
+            if state and (digest == state.get("digest") or generated and generated == state.get("generated")):
+                Log.info("index.yaml not changed, skip sync repo %s" % repo_info_db.name)
+            else:
+                chart_list = self.parse_http_repo_index(content, repo_info_db)
+                create_list, update_list, delete_list = self.diff_repo_charts(chart_list, exist_list)
+                ChartSQL.sync_chart_list(create_list, update_list, delete_list)
+                Log.info("sync repo %s charts, created %s, updated %s, deleted %s" %
+                         (repo_info_db.name, len(create_list), len(update_list), len(delete_list)))
+            new_state["digest"] = digest
+            new_state["generated"] = generated
+        extra[repo_index_state_key] = new_state
+        repo_info_db.extra = json.dumps(extra)
+
+    async def get_harbor_page(self, client, path, params):
+        # 请求Harbor的一页数据，不跟随分页链接
+        return await asyncio.wait_for(client.get(path, params=params, follow_links=False),
+                                      timeout=util.repo_time_out)
+
+    async def list_oci_repositories(self, client, project_name):
+        # 分页获取项目下的所有仓库，每页失败时重试
+        repositories = []
+        page = 1
+        while True:
+            params = {"page": page, "page_size": util.oci_repository_page_size}
+            try_times = 0
+            while True:
+                try:
+                    data = await self.get_harbor_page(client, f"/projects/{project_name}/repositories", params)
+                    break
+                except Exception as e:
+                    try_times += 1
+                    Log.error(f"list harbor repositories of {project_name} page {page} failed: {e!r}")
+                    if try_times >= util.try_times:
+                        raise ValueError(f"list harbor repositories failed: {e!r}")
+            repositories.extend(client.construct_model(Repository, data or [], is_list=True))
+            if not data or len(data) < util.oci_repository_page_size:
+                return repositories
+            page += 1
+
+    def oci_chart_key(self, project_name, repository_name):
+        # 由仓库名得到chart的唯一标识(前缀, chart名)
+        parts = repository_name.split('/')
+        return '/'.join(parts[parts.index(project_name) + 1: -1]), parts[-1]
+
+    async def crawl_oci_repository(self, client, semaphore, project_name, harbor_url, repository,
+                                   repo_info_db: RepoDB):
+        """
+        获取一个仓库最新的util.chart_nubmer个chart版本，失败时只重试这个仓库
+        :return: chart对象，仓库最新的制品不是chart时返回None
+        """
+        repository_name = repository.name.split(f"{project_name}/", 1)[1]
+        path = f"{get_repo_path(project_name, repository_name)}/artifacts"
+        try_times = 0
+        async with semaphore:
+            while True:
+                try:
+                    versions = []
+                    page = 1
+                    while len(versions) < util.chart_nubmer:
+                        params = {"page": page, "page_size": util.oci_artifact_page_size, "with_tag": True,
+                                  "with_label": True, "sort": "-push_time"}
+                        data = await self.get_harbor_page(client, path, params)
+                        artifacts = client.construct_model(Artifact, data or [], is_list=True)
+                        if page == 1 and (not artifacts or artifacts[0].type != "CHART"):
+                            return None
+                        versions.extend(artifact for artifact in artifacts if artifact.type == "CHART")
+                        if len(artifacts) < util.oci_artifact_page_size:
+                            break
+                        page += 1
+                    break
+                except Exception as e:
+                    try_times += 1
+                    Log.error(f"get artifacts of harbor repository {repository.name} failed: {e!r}")
+                    if try_times >= util.try_times:
+                        raise
+        versions = versions[:util.chart_nubmer]
+        dict_version = {}
+        prefix_name, chartname = self.oci_chart_key(project_name, versions[0].repository_name)
+        dict_info = versions[0].extra_attrs.model_dump()
+        dict_version["description"] = dict_info.get("description")
+        dict_version["icon"] = dict_info.get("icon")
+        if isinstance(versions[0].push_time, datetime):
+            dict_version["create_time"] = versions[0].push_time.isoformat()
+        else:
+            dict_version["create_time"] = versions[0].push_time
+        dict_version["latest_version"] = dict_info.get("version")
+        dict_version["deprecated"] = dict_info.get("deprecated") or False
+        if versions[0].labels:
+            dict_version["label"] = versions[0].labels[0].name
+        if dict_info.get("keywords"):
+            dict_version["keywords"] = dict_info.get("keywords")
+        dict_version["version"] = dict()
+        for artifact_info in versions:
+            dict_info = {}
+            dict_tmp_info = artifact_info.addition_links.model_dump()
+            dict_chart_info = artifact_info.extra_attrs.model_dump()
+            dict_info["create_time"] = dict_version["create_time"]
+            dict_info["readme_url"] = harbor_url + dict_tmp_info.get("readme.md").get("href")
+            dict_info["values_url"] = harbor_url + dict_tmp_info.get("values.yaml").get("href")
+            dict_version["version"][dict_chart_info.get("version")] = dict_info
+        return self.convert_db_harbor(chartname, dict_version, repo_info_db, prefix_name)
+
     async def handle_oci_repo(self, repo_info_db: RepoDB):
+        """
+        增量同步oci类型repo的chart：
+        1、分页获取项目下的所有仓库
+        2、仓库的更新时间与制品数量和上次同步相同时跳过
+        3、其余仓库由信号量限制并发，分页获取制品，失败时只重试该仓库
+        4、与数据库中已有的chart对比，只新增、更新、删除有变化的chart；
+           失败的仓库保留原有的chart且不记录状态，下次同步时继续
+        """
         try:
             parsed_url = urlparse(repo_info_db.url)
             harbor_api_url = f"{parsed_url.scheme}://{parsed_url.netloc}/api/v2.0"
@@ -582,82 +822,60 @@ class ChartService:
                 secret=repo_info_db.password
             )
 
-            try_times = 0
-            e_object = None
-            while try_times < util.try_times:
-                try:
-                    repositories = await asyncio.wait_for(
-                        client.get_repositories(project_name=project_name), timeout=util.repo_time_out
-                    )
-                    artifact_tasks = []
-                    for repository in repositories:
-                        # 为每个项目创建异步任务
-                        task = asyncio.create_task(
-                            asyncio.wait_for(
-                                client.get_artifacts(project_name=project_name,
-                                                     repository_name=repository.name.split(f"{project_name}/")[1],
-                                                     with_label=True), timeout=util.repo_time_out)
-                        )
-                        artifact_tasks.append(task)
-
-                    chart_list = []
-                    await asyncio.gather(*artifact_tasks, return_exceptions=True)
-                    for artifact in artifact_tasks:
-                        if artifact.result()[0].type != "CHART":
-                            continue
-                        dict_version = {}
-                        versions = artifact.result()
-                        # chartname = versions[0].repository_name.split(f"{project_name}/")[-1]
-                        parts = versions[0].repository_name.split('/')
-                        chartname = parts[-1]  # 末尾字段
-                        prefix_name = '/'.join(parts[parts.index(project_name) + 1: -1])
-                        dict_info = versions[0].extra_attrs.model_dump()
-                        dict_version["description"] = dict_info.get("description")
-                        dict_version["icon"] = dict_info.get("icon")
-                        if isinstance(versions[0].push_time, datetime):
-                            dict_version["create_time"] = versions[0].push_time.isoformat()
-                        else:
-                            dict_version["create_time"] = versions[0].push_time
-                        dict_version["latest_version"] = dict_info.get("version")
-                        dict_version["deprecated"] = dict_info.get("deprecated") or False
-                        if versions[0].labels:
-                            dict_version["label"] = versions[0].labels[0].name
-                        if dict_info.get("keywords"):
-                            dict_version["keywords"] = dict_info.get("keywords")
-                        dict_version["version"] = dict()
-                        for artifact_info in artifact.result()[:util.chart_nubmer]:
-                            if artifact_info.type != "CHART":
-                                continue
-                            dict_info = {}
-                            dict_tmp_info = artifact_info.addition_links.model_dump()
-                            dict_chart_info = artifact_info.extra_attrs.model_dump()
-                            dict_info["create_time"] = dict_version["create_time"]
-                            dict_info["readme_url"] = harbor_url + dict_tmp_info.get("readme.md").get("href")
-                            dict_info["values_url"] = harbor_url + dict_tmp_info.get("values.yaml").get("href")
-                            dict_version["version"][dict_chart_info.get("version")] = dict_info
-
-                        chart_info_db = self.convert_db_harbor(chartname, dict_version, repo_info_db, prefix_name)
-                        chart_list.append(chart_info_db)
-                    ChartSQL.create_chart_list(chart_list)
-                    repo_info_db.status = util.repo_status_success
-                    repo_info_db.status_msg = ""
-                    RepoSQL.update_repo(repo_info_db)
-                    break
-                except asyncio.TimeoutError as e:
-                    e_object = e
-                    Log.error("Harbor API请求超时，请检查网络或Harbor服务状态")
-                    try_times += 1
-                except HTTPStatusError as e:
-                    e_object = e
-                    Log.error(f"Harbor API请求失败: {e}")
-                    try_times += 1
-                except Exception as e:
-                    e_object = e
-                    Log.error(f"other failed: {e}")
-                    try_times += 1
-            if try_times >= util.try_times:
-                raise ValueError(f"{str(e_object)}")
+            extra = self.get_repo_extra(repo_info_db.id)
+            state = extra.get(repo_oci_state_key) or {}
+            _, exist_list = ChartSQL.list_charts({"repo_id": repo_info_db.id}, 1, -1)
+            # 地址变化时不使用上次的状态，重新全量同步
+            if state.get("url") != repo_info_db.url:
+                state = {}
+            repository_state = state.get("repositories") or {}
+            exist_keys = {self.chart_key(chart) for chart in exist_list}
+
+            repositories = await self.list_oci_repositories(client, project_name)
+            new_repository_state = {}
+            # 不需要更新的chart
+            keep_keys = set()
+            crawl_list = []
+            for repository in repositories:
+                key = self.oci_chart_key(project_name, repository.name)
+                marker = {"update_time": str(repository.update_time), "artifact_count": repository.artifact_count}
+                last = repository_state.get(repository.name)
+                if last and last.get("marker") == marker and (not last.get("chart") or key in exist_keys):
+                    new_repository_state[repository.name] = last
+                    keep_keys.add(key)
+                else:
+                    crawl_list.append((repository, key, marker))
 
+            semaphore = asyncio.Semaphore(util.oci_crawl_concurrency)
+            results = await asyncio.gather(
+                *[self.crawl_oci_repository(client, semaphore, project_name, harbor_url, repository, repo_info_db)
+                  for repository, _, _ in crawl_list], return_exceptions=True)
+            chart_list = []
+            failed_list = []
+            for (repository, key, marker), result in zip(crawl_list, results):
+                if isinstance(result, BaseException):
+                    failed_list.append(repository.name)
+                    keep_keys.add(key)
+                    continue
+                new_repository_state[repository.name] = {"marker": marker, "chart": result is not None}
+                if result is not None:
+                    chart_list.append(result)
+
+            create_list, update_list, delete_list = self.diff_repo_charts(
+                chart_list, [chart for chart in exist_list if self.chart_key(chart) not in keep_keys])
+            ChartSQL.sync_chart_list(create_list, update_list, delete_list)
+            Log.info("sync repo %s charts, repositories %s, crawled %s, failed %s, created %s, updated %s, "
+                     "deleted %s" % (repo_info_db.name, len(repositories), len(crawl_list), len(failed_list),
+                                     len(create_list), len(update_list), len(delete_list)))
+            extra[repo_oci_state_key] = {"url": repo_info_db.url, "repositories": new_repository_state}
+            repo_info_db.extra = json.dumps(extra)
+            if failed_list:
+                # 保存已完成仓库的进度
+                RepoSQL.update_repo(repo_info_db)
+                raise ValueError(f"get artifacts of harbor repositories failed: {', '.join(failed_list)}")
+            repo_info_db.status = util.repo_status_success
+            repo_info_db.status_msg = ""
+            RepoSQL.update_repo(repo_info_db)
         except Exception as e:
             import traceback
             traceback.print_exc()
@@ -679,38 +897,9 @@ class ChartService:
         else:
             Log.info("sync repo started, repo id %s, name %s, url %s" % (repo_info_db.id,  repo.name, repo.url))
         try:
-            chart_list = []
             if repo.type == util.repo_type_http:
-                # 处理http的repo
-                # 1、处理index.yaml里面的内容
-                content = self.handle_http_repo_content(repo.url, repo.username, repo.password)
-                index_data = yaml.load(content, Loader=CLoader)
-                if not index_data.get("entries") or not index_data.get("apiVersion") or not index_data.get("generated"):
-                    Log.error("the content in index.yaml is empty, please check")
-                    raise ValueError(f"the content in index.yaml is empty, please check")
-                for chart_name, versions in index_data["entries"].items():
-                    if len(versions) > util.chart_nubmer:
-                        index_data["entries"][chart_name] = versions[:util.chart_nubmer]
-                for chart_name, versions in index_data["entries"].items():
-                    dict_version = {}
-                    dict_version["description"] = versions[0].get("description")
-                    dict_version["icon"] = versions[0].get("icon")
-                    dict_version["create_time"] = versions[0].get("created")
-                    dict_version["latest_version"] = versions[0].get("version")
-                    dict_version["deprecated"] = versions[0].get("deprecated") or False
-                    dict_version["version"] = dict()
-                    for version in versions:
-                        dict_info = {}
-                        if isinstance(version.get("created"), datetime):
-                            dict_info["create_time"] = version.get("created").isoformat()
-                        else:
-                            dict_info["create_time"] = version.get("created")
-                        dict_info["urls"] = version.get("urls")
-                        dict_info["deprecated"] = version.get("deprecated", False)
-                        dict_version["version"][version.get("version")] = dict_info
-                    chart_info_db = self.convert_chart_db(chart_name, dict_version, repo_info_db)
-                    chart_list.append(chart_info_db)
-                ChartSQL.create_chart_list(chart_list)
+                # 处理http的repo，增量同步index.yaml里面的chart
+                self.sync_http_repo(repo_info_db)
                 repo_info_db.status = util.repo_status_success
                 repo_info_db.status_msg = ""
                 RepoSQL.update_repo(repo_info_db)
@@ -2,10 +2,13 @@
 import re
 import uuid
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 
 from oslo_log import log
 from oslo_config import cfg
+from oslo_db import exception as db_exception
 from datetime import datetime
 
 from pip._vendor import requests
@@ -17,7 +20,8 @@ from dingo_command.services.aliyundingodb import aliyun_dingodb_utils, aliyun_di
 from dingo_command.services.custom_exception import Fail
 from dingo_command.services.rabbitmqconfig import RabbitMqConfigService
 from dingo_command.services.redis_connection import redis_connection, RedisLock
-from dingo_command.utils.constant import RABBITMQ_EXTERNAL_MESSAGE_QUEUE, MESSAGE_TYPE_TABLE, RABBITMQ_SHOVEL_QUEUE, MQ_MANAGE_PORT
+from dingo_command.utils.constant import RABBITMQ_EXTERNAL_MESSAGE_QUEUE, MESSAGE_TYPE_TABLE, RABBITMQ_SHOVEL_QUEUE, MQ_MANAGE_PORT, \
+    MESSAGE_FORWARD_FETCH_SIZE, MESSAGE_FORWARD_INSERT_BATCH_SIZE, MESSAGE_FORWARD_TIME_BUDGET
 
 LOG = log.getLogger(__name__)
 
@@ -130,12 +134,43 @@ class MessageService:
             return
         self.create_external_message(message_json)
 
+    # 批量消费的回调：解析一批消息并一次写入，写入失败时抛出异常，整批消息重新入队
+    def batch_callback(self, bodies):
+        message_dbs = []
+        for body in bodies:
+            # 转换json对象
+            message_json = None
+            try:
+                message_json = json.loads(body)
+            except Exception as e:
+                import traceback
+                traceback.print_exc()
+            if not message_json:
+                print(f"message is not valid: {body}")
+                continue
+            message_db = self.convert_external_message_db(message_json)
+            if not message_db or not message_db.message_type or not message_db.message_data:
+                print(f"message param not exists: {body}")
+                continue
+            message_dbs.append(message_db)
+        # 批量写入
+        MessageSQL.create_external_messages(message_dbs)
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} Received queue: {RABBITMQ_EXTERNAL_MESSAGE_QUEUE}, messages: {len(bodies)}, saved: {len(message_dbs)}")
+
     # 连接消息队列，消费数据
     def connect_mq_queue(self):
         # 目前只有中心region才需要连接队列，因为目前是从普通region铲消息到中心region
         if CENTER_REGION_FLAG is False:
             print("current region is not center region, no need to connect mq shovel queue")
             return
+        # 批量消费报送数据的消息，写入成功后再确认
+        if CONF.rabbitmq.consume_batch_enabled:
+            rabbitmq_config_service.consume_queue_message_batch(RABBITMQ_EXTERNAL_MESSAGE_QUEUE, self.batch_callback,
+                                                                CONF.rabbitmq.consume_prefetch_count,
+                                                                CONF.rabbitmq.consume_batch_size,
+                                                                CONF.rabbitmq.consume_flush_interval_ms,
+                                                                (db_exception.DBConnectionError, db_exception.DBDeadlock))
+            return
         # 消费报送数据的消息
         rabbitmq_config_service.consume_queue_message(RABBITMQ_EXTERNAL_MESSAGE_QUEUE, self.callback)
 
@@ -174,44 +209,18 @@ class MessageService:
             with RedisLock(redis_connection.redis_connection, "dingo_command_report_message_lock", expire_time=60) as lock:
                 if lock:
                     print("get dingo_command_report_message_lock redis lock success")
-                    # 遍历message_type_table 按照类型进行插入数据
-                    for message_type_key, message_dingo_table in MESSAGE_TYPE_TABLE.items():
-                        # 检查当前类型的数据是否存在ERROR状态的数据，如果存在ERROR状态数据则需要告警，并且不再报送数据
-                        error_status_number = MessageSQL.get_external_message_number_by_status(message_type_key, MessageStatusEnum.ERROR)
-                        if error_status_number > 0:
+                    # 检查每个类型是否存在ERROR状态的数据，如果存在ERROR状态数据则需要告警，并且不再报送数据
+                    message_types = []
+                    for message_type_key in MESSAGE_TYPE_TABLE:
+                        if MessageSQL.exists_external_message_by_status(message_type_key, MessageStatusEnum.ERROR.value):
                             print(f"message type {message_type_key} has error status message, please check it")
                             continue
-                        # 每次读取1000条
-                        query_params = {"message_type":message_type_key}
-                        # 按照创建时间顺序排序
-                        _, message_list = MessageSQL.list_external_message(query_params, 1, 1000, "create_date", "ascend")
-                        # 判空 进入下一种类型
-                        if not message_list:
-                            print(f"{message_type_key} message type no message to send")
-                            continue
-                        # 报送的数据结构可能是变化的，兼容不同的结构，生产不同的插入语句,不同的插入语句对应不同的数据内容
-                        insert_dingodb_sql_value_map = {}
-                        insert_dingodb_sql_message_id_map = {}
-                        # 遍历消息列表
-                        for temp_message in message_list:
-                            # 判断message是否合规
-                            if not temp_message.message_data:
-                                print(f"message is not valid: {temp_message}")
-                                continue
-                            # message_data转化为json对象
-                            message_data_json = self.load_message_data_json(temp_message)
-                            # 判空
-                            if not message_data_json:
-                                print(f"message_data_json is not valid: {temp_message}")
-                                continue
-                            # 组装sql
-                            insert_dingodb_sql = self.create_dingodb_insert_sql(message_data_json, message_dingo_table)
-                            insert_dingodb_values = tuple(message_data_json.values())
-                            # 加入到map中
-                            insert_dingodb_sql_value_map = self.add_sql_and_values_to_map(insert_dingodb_sql_value_map, insert_dingodb_sql, insert_dingodb_values)
-                            insert_dingodb_sql_message_id_map = self.add_sql_and_id_to_map(insert_dingodb_sql_message_id_map, insert_dingodb_sql, temp_message.id)
-                        # 批量多个数据
-                        self.insert_many_message_to_dingodb(insert_dingodb_sql_value_map, insert_dingodb_sql_message_id_map)
+                        message_types.append(message_type_key)
+                    # 在锁的过期时间内持续转发
+                    forward_counts = self.forward_messages_to_dingodb(message_types, time.monotonic() + MESSAGE_FORWARD_TIME_BUDGET)
+                    for message_type_key, forward_count in forward_counts.items():
+                        if forward_count:
+                            print(f"{message_type_key} message type forward {forward_count} messages to dingodb")
                 else:
                     print("get dingo_command_report_message_lock redis lock failed")
         except Fail as e:
@@ -221,81 +230,95 @@ class MessageService:
             traceback.print_exc()
             raise e
 
-
-    # 执行sql与数据分组键值对
-    def add_sql_and_values_to_map(self, insert_dingodb_sql_map, insert_dingodb_sql, insert_dingodb_values):
-        # 判空
-        if not insert_dingodb_sql_map:
-            insert_dingodb_sql_map = {}
-        # 判断当前sql是否存在，如果存在则直接添加值
-        if insert_dingodb_sql in insert_dingodb_sql_map:
-            insert_dingodb_sql_map[insert_dingodb_sql].append(insert_dingodb_values)
-        else:
-            insert_dingodb_sql_map[insert_dingodb_sql] = [insert_dingodb_values]
-        # 返回数据
-        return insert_dingodb_sql_map
-
-
-    # 执行sql与消息id键值对
-    def add_sql_and_id_to_map(self, insert_dingodb_message_id_map, insert_dingodb_sql, message_id):
-        # 判空
-        if not insert_dingodb_message_id_map:
-            insert_dingodb_message_id_map = {}
-        # 判断当前sql是否存在，如果存在则直接添加值
-        if insert_dingodb_sql in insert_dingodb_message_id_map:
-            insert_dingodb_message_id_map[insert_dingodb_sql].append(message_id)
-        else:
-            insert_dingodb_message_id_map[insert_dingodb_sql] = [message_id]
-        # 返回数据
-        return insert_dingodb_message_id_map
-
-
-    def load_message_data_json(self,message_db):
+    # 按类型轮转转发消息：每个类型记录已读取到的 (create_date, id) 游标，读取下一批与写入当前批重叠进行
+    def forward_messages_to_dingodb(self, message_types, deadline):
+        cursors = {message_type: None for message_type in message_types}
+        forward_counts = {message_type: 0 for message_type in message_types}
+        # 还有待转发数据的类型
+        pending_types = deque(message_types)
+        if not pending_types:
+            return forward_counts
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            fetch_type = pending_types[0]
+            fetch_future = executor.submit(self.fetch_forward_messages, fetch_type, None)
+            while pending_types and fetch_future is not None:
+                message_type = pending_types.popleft()
+                message_list = fetch_future.result()
+                fetch_future = None
+                if message_list:
+                    # 更新游标，下一轮继续读取该类型
+                    cursors[message_type] = (message_list[-1].create_date, message_list[-1].id)
+                    pending_types.append(message_type)
+                # 预取下一批
+                if pending_types and time.monotonic() < deadline:
+                    fetch_type = pending_types[0]
+                    fetch_future = executor.submit(self.fetch_forward_messages, fetch_type, cursors[fetch_type])
+                if not message_list:
+                    continue
+                # 写入当前批
+                forward_count = self.forward_message_batch(MESSAGE_TYPE_TABLE[message_type], message_list)
+                if forward_count is None:
+                    # 写入失败，该类型停止报送，丢弃该类型的预取结果
+                    pending_types = deque(temp_type for temp_type in pending_types if temp_type != message_type)
+                    if fetch_future is not None and fetch_type == message_type:
+                        fetch_future.result()
+                        fetch_future = None
+                        if pending_types and time.monotonic() < deadline:
+                            fetch_type = pending_types[0]
+                            fetch_future = executor.submit(self.fetch_forward_messages, fetch_type, cursors[fetch_type])
+                    continue
+                forward_counts[message_type] += forward_count
+            # 超时退出时等待预取结束
+            if fetch_future is not None:
+                fetch_future.result()
+        return forward_counts
+
+    # 读取某个类型游标之后的一批待发送消息
+    def fetch_forward_messages(self, message_type, cursor):
+        return MessageSQL.list_external_message_by_cursor(message_type, MessageStatusEnum.READY.value, cursor, MESSAGE_FORWARD_FETCH_SIZE)
+
+    # 一批消息写入dingodb，成功后批量删除，失败时批量标记为ERROR；返回写入的数量，失败返回None
+    def forward_message_batch(self, message_dingo_table, message_list):
+        # 报送的数据结构可能是变化的，按字段分组，每组生成多行的插入语句
+        row_groups = {}
+        message_ids = []
+        for temp_message in message_list:
+            # 判断message是否合规
+            if not temp_message.message_data:
+                print(f"message is not valid: {temp_message.id}")
+                continue
+            # message_data转化为json对象
+            message_data_json = self.load_message_data_json(temp_message)
+            # 判空
+            if not message_data_json:
+                print(f"message_data_json is not valid: {temp_message.id}")
+                continue
+            row_groups.setdefault(tuple(message_data_json.keys()), []).append(tuple(message_data_json.values()))
+            message_ids.append(temp_message.id)
+        if not message_ids:
+            return 0
         try:
-        # 处理数据
-            message_data_json = json.loads(message_db.message_data)
-            return message_data_json
+            # 一个事务写入整批数据
+            aliyun_dingodb_utils.insert_rows(message_dingo_table, row_groups, MESSAGE_FORWARD_INSERT_BATCH_SIZE)
         except Exception as e:
             import traceback
             traceback.print_exc()
+            # 记录错误日志信息
+            self.update_external_many_message_4error(message_ids, traceback.format_exc())
+            return None
+        # 成功之后删除掉当前数据
+        MessageSQL.delete_external_message_by_ids(message_ids)
+        return len(message_ids)
 
 
-    # 组装dingodb的插入sql语句
-    def create_dingodb_insert_sql(self, message_data_json, message_dingo_table):
-        # 生成字段名和占位符
-        fields = ", ".join(message_data_json.keys())
-        placeholders = ", ".join(["%s"] * len(message_data_json))
-        # 生成sql语句
-        dingodb_sql_template = f"INSERT INTO {message_dingo_table} ({fields}) VALUES ({placeholders})"
-        # 返回组装语句
-        return dingodb_sql_template
-
-
-    # 处理多条message数据
-    def insert_many_message_to_dingodb(self, insert_dingodb_sql_value_map, insert_dingodb_sql_message_id_map)  :
-        # 判空
-        if not insert_dingodb_sql_value_map or not insert_dingodb_sql_message_id_map:
-            print("no message to insert to dingodb")
-            return
-        # 当前处理的message_id
-        message_ids = None
-        # 执行
+    def load_message_data_json(self,message_db):
         try:
-            # 遍历sql语句，执行插入操作
-            for insert_dingodb_sql, insert_dingodb_values in insert_dingodb_sql_value_map.items():
-                # 当前处理的id
-                message_ids = insert_dingodb_sql_message_id_map[insert_dingodb_sql]
-                # 执行插入多条
-                self.insert_many_into_dingodb(insert_dingodb_sql, insert_dingodb_values)
-                # 成功之后删除掉当前数据
-                MessageSQL.delete_external_message_by_ids(message_ids)
-                # 成功记录成功的操作日志
-                print(f"success insert message to dingodb: {message_ids}")
+        # 处理数据
+            message_data_json = json.loads(message_db.message_data)
+            return message_data_json
         except Exception as e:
             import traceback
             traceback.print_exc()
-            # 记录错误日志信息
-            self.update_external_many_message_4error(message_ids, traceback.format_exc())
 
 
     # 处理1条message数据
@@ -328,19 +351,6 @@ class MessageService:
             raise e
 
 
-    # 执行插入dingodb的sql语句
-    def insert_many_into_dingodb(self, insert_dingodb_sql, insert_dingodb_values):
-        # 执行sql
-        try:
-            # 执行插入语句
-            aliyun_dingodb_utils.insert_many(insert_dingodb_sql, insert_dingodb_values)
-            print(f"success execute sql: {insert_dingodb_sql}")
-            print(f"success insert message to dingodb: {insert_dingodb_values}")
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            raise e
-
     def list_messages_from_dingodb(self, message_type, query_conditions, page, page_size, sort_keys, sort_dirs):
         try:
             # 判空
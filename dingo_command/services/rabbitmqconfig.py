@@ -1,5 +1,8 @@
 # rabbit的shovel类, 启动的时候自动add shovel，先删除，再add
 # 每个mq的pod都需要shovel
+import threading
+import time
+
 import pika
 import requests
 from oslo_config import cfg
@@ -13,6 +16,163 @@ TRANSPORT_URL = CONF.DEFAULT.transport_url
 CENTER_TRANSPORT_URL = CONF.DEFAULT.center_transport_url
 CENTER_REGION_FLAG = CONF.DEFAULT.center_region_flag
 
+
+# 批量消费队列消息：按数量或等待时间攒批，批处理成功（数据库提交）后再一次确认整批消息
+# 整批失败时逐条重试，成功的确认，失败的拒绝且不重新入队（配置了死信队列时进入死信队列），避免一条坏消息阻塞队列
+class BatchedQueueConsumer:
+
+    def __init__(self, channel, queue, batch_callback, batch_size, flush_interval_ms, transient_errors=()):
+        """
+        :param channel: mq的channel
+        :param queue: 队列名称
+        :param batch_callback: 批处理函数 batch_callback(bodies)
+        :param batch_size: 每批最多的消息数量
+        :param flush_interval_ms: 不满一批时最长的等待时间（毫秒）
+        :param transient_errors: 暂时性错误的异常类型（如数据库连接失败），出现时未处理的消息重新入队稍后重试
+        """
+        self.channel = channel
+        self.queue = queue
+        self.batch_callback = batch_callback
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.transient_errors = tuple(transient_errors)
+        # 待处理的 (delivery_tag, body)
+        self.buffer = []
+        self.first_received_time = None
+        # 统计信息
+        self.stats = {"messages": 0, "batches": 0, "failed_batches": 0, "rejected": 0}
+
+    def start(self, prefetch_count):
+        # 预取数量不小于批次大小，否则攒不满一批
+        self.channel.basic_qos(prefetch_count=max(prefetch_count, self.batch_size))
+        self.channel.basic_consume(queue=self.queue, on_message_callback=self.on_message, auto_ack=False)
+
+    def on_message(self, ch, method, properties, body):
+        # 只放入缓冲区，在poll中处理，避免在pika的回调中执行数据库写入与等待
+        if not self.buffer:
+            self.first_received_time = time.monotonic()
+        self.buffer.append((method.delivery_tag, body))
+
+    def poll(self):
+        # 处理网络事件，最长等待到当前批次的刷新时间
+        time_limit = self.flush_interval
+        if self.buffer:
+            time_limit = max(0, self.first_received_time + self.flush_interval - time.monotonic())
+        self.channel.connection.process_data_events(time_limit=time_limit)
+        if self.buffer and (len(self.buffer) >= self.batch_size or time.monotonic() - self.first_received_time >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        batch, self.buffer = self.buffer, []
+        last_delivery_tag = batch[-1][0]
+        try:
+            self.batch_callback([body for _, body in batch])
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            self.stats["failed_batches"] += 1
+            if isinstance(e, self.transient_errors):
+                self.requeue(last_delivery_tag)
+                return
+            self.flush_one_by_one(batch)
+            return
+        # 提交成功后一次确认整批消息
+        self.channel.basic_ack(delivery_tag=last_delivery_tag, multiple=True)
+        self.stats["messages"] += len(batch)
+        self.stats["batches"] += 1
+
+    def flush_one_by_one(self, batch):
+        # 逐条重试整批失败的消息
+        for delivery_tag, body in batch:
+            try:
+                self.batch_callback([body])
+            except self.transient_errors as e:
+                print(f"queue: {self.queue} transient error, requeue unprocessed messages: {e}")
+                # 已逐条确认或拒绝的消息之后，剩余未处理的消息重新入队
+                self.requeue(batch[-1][0])
+                return
+            except Exception as e:
+                print(f"queue: {self.queue} reject message: {body}, error: {e}")
+                self.channel.basic_nack(delivery_tag=delivery_tag, requeue=False)
+                self.stats["rejected"] += 1
+                continue
+            self.channel.basic_ack(delivery_tag=delivery_tag)
+            self.stats["messages"] += 1
+
+    def requeue(self, last_delivery_tag):
+        # 未确认的消息重新入队，稍后重试
+        self.channel.basic_nack(delivery_tag=last_delivery_tag, multiple=True, requeue=True)
+        self.channel.connection.sleep(1)
+
+
+# 长连接的mq消息发布器
+class RabbitMqPublisher:
+    """
+    进程内共享、线程安全的消息发布器
+    复用连接与channel，记录已声明的队列；连接或channel异常时重新建立后重试一次；
+    可选开启发布确认，支持一次发布多条消息
+    """
+
+    def __init__(self, parameters_provider, confirm_delivery=False):
+        """
+        :param parameters_provider: 返回 pika.ConnectionParameters 的函数，每次重连时调用
+        :param confirm_delivery: 是否等待broker的发布确认
+        """
+        self.parameters_provider = parameters_provider
+        self.confirm_delivery = confirm_delivery
+        self._lock = threading.Lock()
+        self._connection = None
+        self._channel = None
+        self._declared_queues = set()
+
+    def _get_channel(self):
+        if self._connection is None or self._connection.is_closed:
+            self._connection = pika.BlockingConnection(self.parameters_provider())
+            self._channel = None
+        if self._channel is None or self._channel.is_closed:
+            self._channel = self._connection.channel()
+            if self.confirm_delivery:
+                self._channel.confirm_delivery()
+            self._declared_queues = set()
+        return self._channel
+
+    def _reset(self):
+        try:
+            if self._connection is not None and self._connection.is_open:
+                self._connection.close()
+        except Exception as e:
+            print(f"close mq publisher connection error: {e}")
+        self._connection = None
+        self._channel = None
+        self._declared_queues = set()
+
+    def publish(self, queue, message):
+        self.publish_batch(queue, [message])
+
+    def publish_batch(self, queue, messages):
+        # 发布多条消息到指定的队列，失败重连后整批重试一次（至少一次投递）
+        if not messages:
+            return
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    channel = self._get_channel()
+                    # 每个channel只声明一次队列
+                    if queue not in self._declared_queues:
+                        channel.queue_declare(queue=queue, durable=True)
+                        self._declared_queues.add(queue)
+                    for message in messages:
+                        channel.basic_publish(exchange='', routing_key=queue, body=message, properties=pika.BasicProperties(delivery_mode=2,))
+                    # 处理心跳等网络事件
+                    self._connection.process_data_events(time_limit=0)
+                    return
+                except pika.exceptions.AMQPError as e:
+                    print(f"publish mq message to {queue} failed: {e!r}, attempt: {attempt + 1}")
+                    self._reset()
+                    if attempt > 0:
+                        raise e
+
+
 class RabbitMqConfigService:
 
     def get_convert_mq_url(self):
@@ -141,8 +301,24 @@ class RabbitMqConfigService:
         # 返回数据
         return user_name, password, src_mq_url
 
-    # 发布消息到指定的queue
+    # 当前节点的mq的连接参数
+    def get_current_mq_connection_parameters(self):
+        username, password, _ = self.get_current_mq_config_info()
+        credentials = pika.PlainCredentials(username, password)
+        return pika.ConnectionParameters(MY_IP, MQ_PORT, '/', credentials)
+
+    # 发布消息到指定的queue，使用共享的长连接
     def publish_message_to_queue(self, queue, message):
+        rabbitmq_publisher.publish(queue, message)
+        print(f"send mq message to {queue} success")
+
+    # 批量发布消息到指定的queue
+    def publish_messages_to_queue(self, queue, messages):
+        rabbitmq_publisher.publish_batch(queue, messages)
+        print(f"send {len(messages)} mq messages to {queue} success")
+
+    # 消费当前mq的队列的消息
+    def consume_queue_message(self, queue, callback):
         # 连接到当前节点的RabbitMQ的服务器
         username, password, _ = self.get_current_mq_config_info()
         credentials = pika.PlainCredentials(username, password)
@@ -151,15 +327,14 @@ class RabbitMqConfigService:
         channel = connection.channel()
         # 声明队列
         channel.queue_declare(queue=queue, durable=True)
-        # 发送数据到队列中
-        channel.basic_publish(exchange='', routing_key=queue, body=message, properties=pika.BasicProperties(delivery_mode=2,))
-        print("send mq message success")
-        print(f"message: {message}")
-        # 关闭连接
-        connection.close()
+        # 订阅队列并设置回调函数
+        channel.basic_consume(queue=queue, on_message_callback=callback, auto_ack=True)
+        print(f'Waiting for {queue} queue json messages.')
+        channel.start_consuming()
 
-    # 消费当前mq的队列的消息
-    def consume_queue_message(self, queue, callback):
+    # 批量消费当前mq的队列的消息，手动确认
+    def consume_queue_message_batch(self, queue, batch_callback, prefetch_count, batch_size, flush_interval_ms,
+                                    transient_errors=()):
         # 连接到当前节点的RabbitMQ的服务器
         username, password, _ = self.get_current_mq_config_info()
         credentials = pika.PlainCredentials(username, password)
@@ -168,7 +343,14 @@ class RabbitMqConfigService:
         channel = connection.channel()
         # 声明队列
         channel.queue_declare(queue=queue, durable=True)
-        # 订阅队列并设置回调函数
-        channel.basic_consume(queue=queue, on_message_callback=callback, auto_ack=True)
-        print(f'Waiting for {queue} queue json messages.')
-        channel.start_consuming()
+        # 订阅队列
+        consumer = BatchedQueueConsumer(channel, queue, batch_callback, batch_size, flush_interval_ms, transient_errors)
+        consumer.start(prefetch_count)
+        print(f'Waiting for {queue} queue json messages in batches of {batch_size}.')
+        while True:
+            consumer.poll()
+
+
+# 当前节点mq的共享消息发布器
+rabbitmq_publisher = RabbitMqPublisher(lambda: RabbitMqConfigService().get_current_mq_connection_parameters(),
+                                       confirm_delivery=CONF.rabbitmq.publish_confirm)
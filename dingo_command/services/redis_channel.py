@@ -1,5 +1,8 @@
 # redis的频道服务
+import asyncio
+
 import redis
+import redis.asyncio as aioredis
 
 from dingo_command.services import CONF
 from dingo_command.utils.constant import websocket_channels
@@ -33,17 +36,6 @@ redis_client_instance = RedisClientInstance()
 # redis的频道管理service服务
 class RedisChannelService:
 
-    # 初始化redis的频道信息
-    def __init__(self):
-        try:
-            # redis的连接
-            publisher = redis_client_instance.pubsub()
-            publisher.subscribe(websocket_channels)
-            print(f"subscribe redis channel: {websocket_channels}")
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-
     # 向某个channel发布消息
     def publish_channel_message(self, channel, message):
         # 发布消息
@@ -58,4 +50,84 @@ class RedisChannelService:
             traceback.print_exc()
 
 # redis的频道服务
-redis_channel_service = RedisChannelService()
\ No newline at end of file
+redis_channel_service = RedisChannelService()
+
+
+# 进程内共享的异步redis频道订阅
+class RedisChannelHub:
+    """
+    每个进程每个频道只建立一个asyncio原生的订阅连接，收到消息后分发给注册的处理函数，
+    订阅连接数与websocket连接数无关；连接异常时按退避时间重连
+    """
+
+    def __init__(self):
+        self.redis_client = None
+        # 频道 -> {处理函数名称: 处理函数}
+        self._handlers = {}
+        # 频道 -> 订阅任务
+        self._tasks = {}
+
+    def _get_redis_client(self):
+        if self.redis_client is None:
+            self.redis_client = aioredis.Redis(host=REDIS_HOST, port=REDIS_PORT, password=REDIS_PASSWORD, decode_responses=True)
+        return self.redis_client
+
+    def subscribe(self, channel, handler_name, handler):
+        """
+        注册频道的处理函数 async handler(channel, data)，同名处理函数只保留一个；
+        首次订阅该频道时在当前事件循环中启动订阅任务
+        """
+        if channel not in websocket_channels:
+            print(f"channel not exist: {channel}")
+            return None
+        self._handlers.setdefault(channel, {})[handler_name] = handler
+        task = self._tasks.get(channel)
+        if task is None or task.done():
+            self._tasks[channel] = asyncio.get_running_loop().create_task(self._listen(channel))
+            print(f"subscribe redis channel: {channel}")
+
+    async def _listen(self, channel):
+        backoff = 1
+        while True:
+            pubsub = self._get_redis_client().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(channel)
+                backoff = 1
+                # 阻塞等待消息，不轮询
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        await self._dispatch(channel, message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"redis channel {channel} subscribe error: {e}, retry after {backoff}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception as e:
+                    print(f"close redis channel {channel} pubsub error: {e}")
+
+    async def _dispatch(self, channel, data):
+        for handler_name, handler in list(self._handlers.get(channel, {}).items()):
+            try:
+                await handler(channel, data)
+            except Exception as e:
+                import traceback
+                traceback.print_exc()
+                print(f"redis channel {channel} handler {handler_name} error: {e}")
+
+    async def close(self):
+        # 停止所有订阅任务并关闭连接
+        tasks = list(self._tasks.values())
+        self._tasks = {}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.redis_client is not None:
+            await self.redis_client.aclose()
+            self.redis_client = None
+
+# redis的频道订阅
+redis_channel_hub = RedisChannelHub()
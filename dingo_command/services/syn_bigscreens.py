@@ -1,7 +1,7 @@
 import json
-import pika
 from dingo_command.services.bigscreens import BigScreensService
-from dingo_command.services.bigscreenshovel import SHOVEL_QUEUE, MY_IP, CENTER_REGION_FLAG, TRANSPORT_URL
+from dingo_command.services.bigscreenshovel import SHOVEL_QUEUE, CENTER_REGION_FLAG
+from dingo_command.services.rabbitmqconfig import RabbitMqConfigService, rabbitmq_publisher
 
 
 # 大屏的service
@@ -46,45 +46,8 @@ class BigScreenSyncService:
         if CENTER_REGION_FLAG is False:
             print("current region is not center region, no need to connect mq shovel queue")
             return
-        # 连接到当前节点的RabbitMQ的服务器
-        username, password = cls.get_mq_name_password()
-        credentials = pika.PlainCredentials(username, password)
-        parameters = pika.ConnectionParameters(MY_IP, 5672, '/', credentials)
-        connection = pika.BlockingConnection(parameters)
-        channel = connection.channel()
-        # 声明队列
-        channel.queue_declare(queue=SHOVEL_QUEUE, durable=True)
-        # 订阅队列并设置回调函数
-        channel.basic_consume(queue=SHOVEL_QUEUE, on_message_callback=cls.callback, auto_ack=True)
-        print('Waiting for messages.')
-        channel.start_consuming()
-
-    @classmethod
-    def get_mq_name_password(cls):
-        user_name = None
-        password = None
-        transport_url = TRANSPORT_URL.replace("rabbit:", "").replace("//", "")
-        # 多节点环境
-        transport_url_array = transport_url.split(',')
-        # 空
-        if transport_url_array is None or len(transport_url_array) <= 0:
-            print("rabbit mq transport url array is empty ")
-            return
-        # 遍历
-        for temp_url in transport_url_array:
-        # 当前节点的mq信息
-            if MY_IP in temp_url:
-                # 分割获取用户名和密码
-                temp_url_array = temp_url.split('@')
-                # 非空
-                if temp_url_array:
-                    name_and_password = temp_url_array[0].split(':')
-                    if name_and_password:
-                        user_name = name_and_password[0]
-                        password = name_and_password[1]
-                break
-        # 返回数据
-        return user_name, password
+        # 订阅当前节点mq的shovel队列，连接参数与消息发布器一致
+        RabbitMqConfigService().consume_queue_message(SHOVEL_QUEUE, cls.callback)
 
     @classmethod
     def send_mq_message(cls, message):
@@ -93,27 +56,9 @@ class BigScreenSyncService:
             print("current region is center region, no need to send mq message")
             return
         try:
-            # 连接到当前节点的RabbitMQ的服务器，连接到队列然后发送消息
-            username, password = cls.get_mq_name_password()
-            credentials = pika.PlainCredentials(username, password)
-            parameters = pika.ConnectionParameters(MY_IP, 5672, '/', credentials)
-            connection = pika.BlockingConnection(parameters)
-            channel = connection.channel()
-            # 声明队列
-            channel.queue_declare(queue=SHOVEL_QUEUE, durable=True)
-            # 发送消息
-            channel.basic_publish(
-                exchange='',
-                routing_key=SHOVEL_QUEUE,
-                body=message,
-                properties=pika.BasicProperties(
-                    delivery_mode=2,
-                )
-            )
+            # 使用共享的长连接发送消息
+            rabbitmq_publisher.publish(SHOVEL_QUEUE, message)
             print("send mq message success")
-            print(f"message: {message}")
-            # 关闭连接
-            connection.close()
         except Exception as e:
             import traceback
             traceback.print_exc()
@@ -1,8 +1,60 @@
 # websocket的连接管理器
 from fastapi import WebSocket
 import asyncio
+import time
+
+from dingo_command.utils.constant import websocket_data_type, WEBSOCKET_SEND_QUEUE_SIZE, WEBSOCKET_SEND_TIMEOUT, \
+    WEBSOCKET_SLOW_CONSUMER_POLICY
+
+
+# 单个websocket连接的发送器：有界的待发送队列 + 独立的发送任务
+class WebSocketSender:
+
+    def __init__(self, manager, websocket_type: str, websocket: WebSocket):
+        self.manager = manager
+        self.websocket_type = websocket_type
+        self.websocket = websocket
+        self.queue = asyncio.Queue(maxsize=WEBSOCKET_SEND_QUEUE_SIZE)
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    # 消息入队，不等待发送；队列满时按慢连接策略处理，返回是否需要断开连接
+    def offer(self, message) -> bool:
+        try:
+            self.queue.put_nowait(message)
+            return False
+        except asyncio.QueueFull:
+            if WEBSOCKET_SLOW_CONSUMER_POLICY == "disconnect":
+                return True
+            # 丢弃最早的消息
+            self.queue.get_nowait()
+            self.queue.put_nowait(message)
+            self.manager.stats(self.websocket_type)["dropped"] += 1
+            return False
+
+    async def _run(self):
+        while True:
+            message = await self.queue.get()
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(message), WEBSOCKET_SEND_TIMEOUT)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 发送失败或超时，连接视为失效
+                print(f"websocket_type:{self.websocket_type} send failed, evict connection: {e!r}")
+                await self.manager.evict(self.websocket_type, self.websocket)
+                return
+            stats = self.manager.stats(self.websocket_type)
+            latency = time.perf_counter() - start
+            stats["sent"] += 1
+            stats["send_latency_total"] += latency
+            stats["send_latency_max"] = max(stats["send_latency_max"], latency)
+
+    def close(self):
+        # 非发送任务自身调用时取消发送任务
+        if self.task is not asyncio.current_task():
+            self.task.cancel()
 
-from dingo_command.utils.constant import websocket_data_type
 
 # 单例模式的websocket连接管理器
 class WebSocketConnectionManager:
@@ -21,6 +73,32 @@ class WebSocketConnectionManager:
     def __init__(self):
         self.active_connections = {}
         self.lock = asyncio.Lock()
+        # websocket -> 发送器
+        self.senders = {}
+        # 类型 -> 计数
+        self.type_stats = {}
+
+    # 类型的计数：已发送、丢弃、移除的消息与连接，发送耗时
+    def stats(self, websocket_type: str):
+        if websocket_type not in self.type_stats:
+            self.type_stats[websocket_type] = {"sent": 0, "dropped": 0, "evicted": 0,
+                                               "send_latency_total": 0.0, "send_latency_max": 0.0}
+        return self.type_stats[websocket_type]
+
+    # 返回各类型的连接数与计数
+    def get_stats(self):
+        result = {}
+        for websocket_type in websocket_data_type:
+            stats = self.stats(websocket_type)
+            result[websocket_type] = {
+                "connections": len(self.active_connections.get(websocket_type) or ()),
+                "sent": stats["sent"],
+                "dropped": stats["dropped"],
+                "evicted": stats["evicted"],
+                "send_latency_avg_ms": stats["send_latency_total"] / stats["sent"] * 1000 if stats["sent"] else 0,
+                "send_latency_max_ms": stats["send_latency_max"] * 1000,
+            }
+        return result
 
     # 连接指定类型的websocket
     async def connect(self, websocket_type: str, websocket: WebSocket):
@@ -34,22 +112,13 @@ class WebSocketConnectionManager:
         await websocket.accept()
         # 更新连接组
         async with self.lock:
-            # 定义默认连接
-            connections = None
-            # 检测当前类型是否存在
-            if websocket_type not in self.active_connections:
-                print(f"websocket_type:{websocket_type} not in websocket type connections")
-            else:
-                # 当前类型的所有的连接
-                connections = self.active_connections[websocket_type]
-            # 判空
-            if connections is None:
-                connections = set()
+            # 当前类型的所有的连接
+            connections = self.active_connections.setdefault(websocket_type, set())
             # 加入最新的数据
             connections.add(websocket)
-            # 更新连接
-            self.active_connections[websocket_type] = connections
-            print(f"websocket_type_connections: {self.active_connections}")
+            if websocket not in self.senders:
+                self.senders[websocket] = WebSocketSender(self, websocket_type, websocket)
+            print(f"websocket_type:{websocket_type} connections: {len(connections)}")
 
     # 删除指定类型的websocket
     async def disconnect(self, websocket_type: str, websocket: WebSocket):
@@ -60,66 +129,61 @@ class WebSocketConnectionManager:
             print(f"websocket_type:{websocket_type} not allowed")
             return None
         async with self.lock:
-            # 检测当前类型是否存在
-            if websocket_type not in self.active_connections:
-                print(f"websocket_type:{websocket_type} connection not in websocket type connections")
-                return None
-            # 当前类型的所有的连接
-            connections = self.active_connections[websocket_type]
-            # 判断是否存在对应的类型
-            if not connections:
-                print(f"websocket connections is empty")
-                return None
-            # 判断当前websocket在
-            if websocket in connections:
-                connections.remove(websocket)
-            # 更新连接
-            self.active_connections[websocket_type] = connections
-
-    # 像当前类型的所有连接广播消息
+            return self._remove(websocket_type, websocket)
+
+    # 移除失效的连接并关闭
+    async def evict(self, websocket_type: str, websocket: WebSocket):
+        async with self.lock:
+            removed = self._remove(websocket_type, websocket)
+        if removed:
+            self.stats(websocket_type)["evicted"] += 1
+            try:
+                await asyncio.wait_for(websocket.close(), WEBSOCKET_SEND_TIMEOUT)
+            except Exception as e:
+                print(f"close websocket error: {e!r}")
+
+    # 从连接组中移除，需要在锁内调用，返回是否移除
+    def _remove(self, websocket_type: str, websocket: WebSocket):
+        sender = self.senders.pop(websocket, None)
+        if sender:
+            sender.close()
+        connections = self.active_connections.get(websocket_type)
+        if not connections or websocket not in connections:
+            return False
+        connections.remove(websocket)
+        return True
+
+    # 像当前类型的所有连接广播消息：锁内只复制连接快照，消息放入各连接的发送队列，由发送任务并发发送
     async def broadcast(self, websocket_type: str, message):
         # 判断类型
         if websocket_type not in websocket_data_type or message is None:
             print(f"websocket_type:{websocket_type} not allowed or message is empty")
             return None
         async with self.lock:
-            # 判断websocket_type是否存在
-            if websocket_type not in self.active_connections:
-                print(f"websocket type :{websocket_type} connection not in websocket type connections")
-                return None
-            # 当前类型的所有的连接
-            connections = self.active_connections[websocket_type]
-            # 判断是否存在对应的类型
-            if not connections:
-                print(f"websocket connections is empty")
-                return None
-            # 遍历
-            for connection in connections:
-                # 发送消息
-                await connection.send_text(message)
-
-    # 像当前类型的所有连接广播消息
+            senders = [self.senders[connection] for connection in self.active_connections.get(websocket_type, ())
+                       if connection in self.senders]
+        # 判断是否存在对应的类型
+        if not senders:
+            print(f"websocket connections is empty")
+            return None
+        # 遍历
+        for sender in senders:
+            if sender.offer(message):
+                await self.evict(websocket_type, sender.websocket)
+
+    # 像当前类型的某个连接发送消息
     async def broadcast_websocket(self, websocket_type: str, websocket: WebSocket, message):
         # 判断类型
         if websocket_type not in websocket_data_type or message is None:
             print(f"websocket_type:{websocket_type} not allowed or message is empty")
             return None
         async with self.lock:
-            # 判断websocket_type是否存在
-            if websocket_type not in self.active_connections:
-                print(f"websocket type :{websocket_type} connection not in websocket type connections")
-                return None
-            # 当前类型的所有的连接
-            connections = self.active_connections[websocket_type]
-            # 判断是否存在对应的类型
-            if not connections:
-                print(f"websocket connections is empty")
-                return None
-            # 遍历
-            for connection in connections:
-                # 发送消息
-                if connection == websocket:
-                    await connection.send_text(message)
+            sender = self.senders.get(websocket) if websocket in self.active_connections.get(websocket_type, ()) else None
+        if sender is None:
+            print(f"websocket type :{websocket_type} connection not in websocket type connections")
+            return None
+        if sender.offer(message):
+            await self.evict(websocket_type, websocket)
 
 # websocket连接管理
-websocket_connection_manager = WebSocketConnectionManager()
\ No newline at end of file
+websocket_connection_manager = WebSocketConnectionManager()
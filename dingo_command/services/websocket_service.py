@@ -1,18 +1,19 @@
 # websocket的服务类
 import json
-import asyncio
 
-from fastapi import WebSocket
+from fastapi import WebSocket, WebSocketDisconnect
 
 from dingo_command.db.models.bigscreen.sql import BigscreenSQL
 from dingo_command.jobs import CONF
 from dingo_command.services.custom_exception import Fail
-from dingo_command.services.redis_channel import redis_channel_service, redis_client_instance
+from dingo_command.services.redis_channel import redis_channel_service, redis_channel_hub
 from dingo_command.services.websocket_connection_manager import websocket_connection_manager
 from dingo_command.utils.constant import websocket_data_type, websocket_type_channels
 
 # 当前region名称
 REGION_NAME = CONF.DEFAULT.region_name
+# redis频道消息推送到websocket的处理函数名称
+WEBSOCKET_CHANNEL_HANDLER = "websocket_broadcast"
 
 
 class WebSocketService:
@@ -31,7 +32,7 @@ class WebSocketService:
             print("message is none")
             return None
         # 发送
-        await websocket_connection_manager.broadcast(websocket_type, "message")
+        await websocket_connection_manager.broadcast(websocket_type, message)
 
 
     # 直接发送消息到前端某个websocket，适合redis订阅模式
@@ -59,27 +60,19 @@ class WebSocketService:
             traceback.print_exc()
             raise Fail("send redis channel message fail", error_message="发送redis频道测试消息失败")
 
+    # redis频道消息推送到对应类型的所有websocket
+    async def on_redis_channel_message(self, channel, data):
+        await self.broadcast_redis_message(self.get_websocket_type_by_channel(channel), data)
+
     # 处理redis的频道消息 适合操作类触发的websocket消息
     async def subscribe_redis_channel_ws(self, websocket_type:str, websocket: WebSocket):
         try:
-            # 类型为空或者类型不合法
-            if websocket_type is None or websocket_type not in websocket_data_type or websocket_type not in websocket_type_channels:
-                raise Fail("websocket_type is not valid", error_message="websocket类型不合法")
-            # 开始处理频道消息
-            print(f"subscribe redis channel by websocket_type: {websocket_type}")
-            # redis订阅频道
-            publisher = redis_client_instance.pubsub()
-            publisher.subscribe(websocket_type_channels[websocket_type])
-            # 循环
+            # 订阅频道（进程内每个频道只订阅一次），消息由订阅任务推送到该类型的所有websocket
+            await self.subscribe_redis_channel(websocket_type)
+            # 保持连接直到客户端断开，断开时抛出WebSocketDisconnect
             while True:
-                # 读取消息
-                message = publisher.get_message(ignore_subscribe_messages=True, timeout=1)
-                # 非空
-                if message:
-                    await self.broadcast_redis_message_4ws(websocket_type, websocket, message)
-                # 休息
-                await asyncio.sleep(5)
-        except Fail as e:
+                await websocket.receive_text()
+        except (Fail, WebSocketDisconnect) as e:
             raise e
         except Exception as e:
             import traceback
@@ -92,20 +85,8 @@ class WebSocketService:
             # 类型为空或者类型不合法
             if websocket_type is None or websocket_type not in websocket_data_type or websocket_type not in websocket_type_channels:
                 raise Fail("websocket_type is not valid", error_message="websocket类型不合法")
-            # 开始处理频道消息
-            print(f"subscribe redis channel by websocket_type: {websocket_type}")
-            # redis订阅频道
-            publisher = redis_client_instance.pubsub()
-            publisher.subscribe(websocket_type_channels[websocket_type])
-            # 循环
-            while True:
-                # 读取消息
-                message = publisher.get_message(ignore_subscribe_messages=True, timeout=1)
-                # 非空
-                if message:
-                    await self.broadcast_redis_message(websocket_type, message)
-                # 休息
-                await asyncio.sleep(5)
+            # 共享的异步订阅，已订阅时只更新处理函数
+            redis_channel_hub.subscribe(websocket_type_channels[websocket_type], WEBSOCKET_CHANNEL_HANDLER, self.on_redis_channel_message)
         except Fail as e:
             raise e
         except Exception as e:
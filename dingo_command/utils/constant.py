@@ -3,6 +3,22 @@ import uuid
 
 # k8s kubeconfig指定存放目录
 KUBECONFIG_DIR_DEFAULT = "/home/dingo-command/kubeconfig/"
+# k8s ApiClient 缓存有效期（秒），过期后重新校验kubeconfig配置
+K8S_CLIENT_CACHE_TTL = 300
+# k8s ApiClient 缓存最多保留的集群数量
+K8S_CLIENT_CACHE_MAX_SIZE = 64
+# k8s资源列表快照缓存有效期（秒），同一查询的翻页请求复用同一次LIST结果
+K8S_LIST_SNAPSHOT_TTL = 15
+# k8s资源列表快照缓存最多保留的查询数量
+K8S_LIST_SNAPSHOT_MAX_SIZE = 32
+# k8s API发现结果缓存文件目录，按集群分文件保存
+K8S_DISCOVERY_CACHE_DIR = "/tmp/dingo-command/k8s-discovery/"
+# k8s API发现结果缓存有效期（秒），过期后重新发现；资源类型到 (apiVersion, kind) 的映射使用相同有效期
+K8S_DISCOVERY_CACHE_TTL = 600
+# 资源与资产关联同步中keystone用户、项目名称的缓存有效期（秒）
+ASSET_RELATION_KEYSTONE_CACHE_TTL = 600
+# k8s节点资源同步是否按集群聚合（一次查询集群所有容器实例POD，按节点分组汇总并批量写库）
+AI_K8S_NODE_RESOURCE_SYNC_AGGREGATE = True
 #容器实例命名空间前缀
 NAMESPACE_PREFIX = "ns-"
 #容器实例系统盘默认挂载路径
@@ -38,6 +54,8 @@ ASSET_TEMPLATE_ASSET_SHEET = "asset"
 ASSET_TEMPLATE_PART_SHEET = "part"
 # 资产网络sheet页名称
 ASSET_TEMPLATE_NETWORK_SHEET = "network"
+# 资产批量导入每个事务写入的资产数量
+ASSET_IMPORT_CHUNK_SIZE = 500
 
 # 资产设备状态 0：空闲、1：备机、2：分配、3：故障
 asset_status_dict = ([(0, "空闲"), (0, "备机"), (2, "分配"), (3, "故障")])
@@ -78,6 +96,12 @@ websocket_data_type = {"big_screen"}
 # websocket的频道以及与数据类型的对应关系
 websocket_channels = ["dingoOps:big_screen_websocket_channel"]
 websocket_type_channels = {"big_screen":"dingoOps:big_screen_websocket_channel"}
+# websocket每个连接待发送消息队列的长度
+WEBSOCKET_SEND_QUEUE_SIZE = 16
+# websocket单条消息发送超时时间（秒），超时视为连接失效并移除
+WEBSOCKET_SEND_TIMEOUT = 5
+# websocket慢连接处理策略：drop_oldest 丢弃最早的待发送消息，disconnect 断开连接
+WEBSOCKET_SLOW_CONSUMER_POLICY = "drop_oldest"
 asset_part_type_dict = ["cpu","cpu_cores","data_disk","disk","gpu","ib_card","memory","module","nic","part_update"]
 
 # mq的配置信息
@@ -87,6 +111,10 @@ MQ_SHOVEL_ADD_URL = "/api/parameters/shovel/%2F/"
 # rabbitmq的所有shovel和queue的关系
 RABBITMQ_SHOVEL_QUEUE = {"dingo_command_external_message_shovel":"dingo_command_external_message_queue"}
 RABBITMQ_EXTERNAL_MESSAGE_QUEUE = "dingo_command_external_message_queue"
+# 报送消息转发到dingodb：每次读取的消息数量、每条INSERT语句的最大行数、每次任务的最长执行时间（秒，小于redis锁的过期时间）
+MESSAGE_FORWARD_FETCH_SIZE = 2000
+MESSAGE_FORWARD_INSERT_BATCH_SIZE = 500
+MESSAGE_FORWARD_TIME_BUDGET = 50
 # message类型和dingodb表的对应关系
 MESSAGE_TYPE_TABLE = {
     "Report_Storage": "bsm_dws_storage_capacity_consume_info",
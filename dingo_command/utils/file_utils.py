@@ -19,4 +19,23 @@ def cleanup_temp_file(file_paths: Union[str, List[str]]):
             else:
                 print(f"文件不存在: {file_path}")
         except Exception as e:
-            print(f"删除失败 [{file_path}]: {str(e)}")
\ No newline at end of file
+            print(f"删除失败 [{file_path}]: {str(e)}")
+
+def iter_file_chunks(file_path: str, chunk_size: int = 64 * 1024, cleanup: bool = True):
+    """按块读取文件内容，用于分块流式返回大文件，读取完成后删除临时文件
+
+    Args:
+        file_path: 文件路径
+        chunk_size: 每块大小
+        cleanup: 读取完成后是否删除文件
+    """
+    try:
+        with open(file_path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        if cleanup:
+            cleanup_temp_file(file_path)
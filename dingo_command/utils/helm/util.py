@@ -11,6 +11,11 @@ try_times = 3
 time_out = 10
 repo_time_out = 30
 repo_update_time_out = 900
+# oci类型repo同步时并发请求Harbor的仓库数量
+oci_crawl_concurrency = 8
+# oci类型repo同步时分页获取仓库与制品的每页数量
+oci_repository_page_size = 100
+oci_artifact_page_size = 20
 repo_global_name = "zetyun_harbor"
 repo_global_cluster_id = "all"
 repo_status_create = "creating"
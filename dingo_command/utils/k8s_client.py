@@ -1,6 +1,10 @@
 # k8s的client
+import hashlib
 import json
 import os
+import threading
+import time
+from collections import OrderedDict
 from typing import Optional
 
 from kubernetes import client, config
@@ -9,7 +13,7 @@ from dingo_command.db.models.ai_instance.models import AiK8sKubeConfigConfigs
 from dingo_command.db.models.ai_instance.sql import AiInstanceSQL
 import yaml
 
-from dingo_command.utils.constant import KUBECONFIG_DIR_DEFAULT
+from dingo_command.utils.constant import K8S_CLIENT_CACHE_TTL, K8S_CLIENT_CACHE_MAX_SIZE
 from typing import Type, TypeVar, Any
 import logging
 
@@ -21,6 +25,90 @@ logger = logging.getLogger(__name__)
 T = TypeVar('T')
 
 
+class K8sApiClientPool:
+    """
+    按 k8s_id 缓存的 ApiClient 池
+
+    每个集群持有独立的 Configuration 和 urllib3 连接池，不修改进程全局的默认配置；
+    条目超过有效期后重新读取数据库配置，配置未变化时继续复用，变化时重建；
+    超过最大数量时按最近最少使用淘汰。
+    """
+
+    def __init__(self, ttl: int = K8S_CLIENT_CACHE_TTL, max_size: int = K8S_CLIENT_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # k8s_id -> {"api_client", "fingerprint", "expire_at", "apis"}
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+
+    def get_api(self, k8s_id: str, client_type: Type[T]) -> T:
+        """获取指定类型的 API 对象，同一集群同一类型复用同一个实例"""
+        with self._lock:
+            entry = self._entries.get(k8s_id)
+            if entry and entry["expire_at"] > time.monotonic():
+                self._entries.move_to_end(k8s_id)
+                return self._get_or_create_api(entry, client_type)
+
+        # 缓存不存在或已过期，重新读取数据库配置
+        kubeconfig_configs_db = AiInstanceSQL.get_k8s_kubeconfig_info_by_k8s_id(k8s_id)
+        if not kubeconfig_configs_db:
+            error_msg = f"by {k8s_id} 无法获取 kubeconfig 配置信息"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        _validate_kubeconfig_config(kubeconfig_configs_db, k8s_id)
+        fingerprint = _kubeconfig_fingerprint(kubeconfig_configs_db)
+
+        with self._lock:
+            entry = self._entries.get(k8s_id)
+            if entry and entry["fingerprint"] == fingerprint:
+                # 配置未变化，延长有效期继续复用
+                entry["expire_at"] = time.monotonic() + self.ttl
+                self._entries.move_to_end(k8s_id)
+                return self._get_or_create_api(entry, client_type)
+
+        api_client = _new_api_client(kubeconfig_configs_db)
+        with self._lock:
+            old_entry = self._entries.pop(k8s_id, None)
+            entry = {
+                "api_client": api_client,
+                "fingerprint": fingerprint,
+                "expire_at": time.monotonic() + self.ttl,
+                "apis": {},
+            }
+            self._entries[k8s_id] = entry
+            evicted = [old_entry] if old_entry else []
+            while len(self._entries) > self.max_size:
+                evicted.append(self._entries.popitem(last=False)[1])
+            api = self._get_or_create_api(entry, client_type)
+        for evicted_entry in evicted:
+            _close_api_client(evicted_entry["api_client"])
+        return api
+
+    def invalidate(self, k8s_id: Optional[str] = None) -> None:
+        """kubeconfig 配置变更后失效缓存，k8s_id 为空时清空全部"""
+        with self._lock:
+            if k8s_id is None:
+                evicted = list(self._entries.values())
+                self._entries.clear()
+            else:
+                entry = self._entries.pop(k8s_id, None)
+                evicted = [entry] if entry else []
+        for entry in evicted:
+            _close_api_client(entry["api_client"])
+
+    @staticmethod
+    def _get_or_create_api(entry: dict, client_type: Type[T]) -> T:
+        api = entry["apis"].get(client_type)
+        if api is None:
+            api = client_type(api_client=entry["api_client"])
+            entry["apis"][client_type] = api
+        return api
+
+
+# 进程内共享的 ApiClient 池
+k8s_api_client_pool = K8sApiClientPool()
+
+
 def get_k8s_client(k8s_id: str,client_type: Type[T], **kwargs: Any) -> T:
     """
     通用 Kubernetes 客户端获取函数
@@ -33,45 +121,22 @@ def get_k8s_client(k8s_id: str,client_type: Type[T], **kwargs: Any) -> T:
     Returns:
         指定类型的 Kubernetes 客户端实例
     """
-
-    # 1. 获取数据库配置
-    kubeconfig_configs_db = AiInstanceSQL.get_k8s_kubeconfig_info_by_k8s_id(k8s_id)
-    if not kubeconfig_configs_db:
-        error_msg = f"by {k8s_id} 无法获取 kubeconfig 配置信息"
+    # 检查是否是有效的客户端类型
+    if not hasattr(client, client_type.__name__):
+        error_msg = f"invalid Kubernetes client: {client_type.__name__}"
         logger.error(error_msg)
-        raise ValueError(error_msg)
-
-    _validate_kubeconfig_config(kubeconfig_configs_db, k8s_id)
+        raise TypeError(error_msg)
 
-    # 2. 确定 kubeconfig 文件路径和上下文名称
-    config_file = _resolve_kubeconfig_path(kubeconfig_configs_db)
-    context_name = _resolve_context_name(kubeconfig_configs_db)
-
-    # 3. 加载配置
-    try:
-        config.load_kube_config(
-            config_file=config_file,
-            context=context_name  # None 时自动使用 current-context
-        )
-        print(f"loaded kubeconfig: config_file={config_file}, context={context_name or 'current-context'}")
-    except Exception as e:
-        error_msg = f"load kubeconfig fail: {str(e)}"
-        logger.error(error_msg)
-        raise RuntimeError(error_msg) from e
+    # 显式传入 api_client 时不走缓存
+    if kwargs.get("api_client") is not None:
+        return client_type(**kwargs)
 
-    # 4. 创建并返回请求的客户端
     try:
-        # 检查是否是有效的客户端类型
-        if not hasattr(client, client_type.__name__):
-            error_msg = f"invalid Kubernetes client: {client_type.__name__}"
-            logger.error(error_msg)
-            raise TypeError(error_msg)
-
-        # 实例化客户端
-        api_client = client_type(**kwargs)
-        logger.debug(f"success create {client_type.__name__} client")
-        return api_client
-
+        api = k8s_api_client_pool.get_api(k8s_id, client_type)
+        logger.debug(f"success get {client_type.__name__} client of {k8s_id}")
+        return api
+    except (ValueError, TypeError):
+        raise
     except Exception as e:
         error_msg = f"create {client_type.__name__} client fail: {str(e)}"
         logger.error(error_msg)
@@ -89,6 +154,55 @@ def get_k8s_app_client(k8s_id: str) -> client.AppsV1Api:
     return get_k8s_client(k8s_id, client.AppsV1Api)
 
 
+def invalidate_k8s_client(k8s_id: Optional[str] = None) -> None:
+    """kubeconfig 配置变更后调用，使缓存的客户端失效"""
+    k8s_api_client_pool.invalidate(k8s_id)
+
+
+def _new_api_client(config_info: AiK8sKubeConfigConfigs) -> client.ApiClient:
+    """根据 kubeconfig 配置创建独立的 ApiClient，不修改全局默认配置"""
+    context_name = _resolve_context_name(config_info)
+    try:
+        # 配置中指定的文件已存在时直接使用文件
+        if config_info.kubeconfig_path and os.path.exists(config_info.kubeconfig_path):
+            api_client = config.new_client_from_config(
+                config_file=config_info.kubeconfig_path,
+                context=context_name  # None 时自动使用 current-context
+            )
+        else:
+            api_client = config.new_client_from_config_dict(
+                _load_kubeconfig_dict(config_info),
+                context=context_name
+            )
+        logger.info(f"loaded kubeconfig: k8s_id={config_info.k8s_id}, context={context_name or 'current-context'}")
+        return api_client
+    except Exception as e:
+        error_msg = f"load kubeconfig fail: {str(e)}"
+        logger.error(error_msg)
+        raise RuntimeError(error_msg) from e
+
+
+def _close_api_client(api_client: client.ApiClient) -> None:
+    """关闭被淘汰的 ApiClient 的连接池"""
+    try:
+        api_client.close()
+    except Exception as e:
+        logger.warning(f"close k8s api client fail: {str(e)}")
+
+
+def _kubeconfig_fingerprint(config_info: AiK8sKubeConfigConfigs) -> tuple:
+    """kubeconfig 配置指纹，用于判断配置是否变化"""
+    kubeconfig = config_info.kubeconfig
+    if not isinstance(kubeconfig, str):
+        kubeconfig = json.dumps(kubeconfig, sort_keys=True, default=str)
+    return (
+        config_info.update_time,
+        config_info.kubeconfig_path,
+        config_info.kubeconfig_context_name,
+        hashlib.sha256((kubeconfig or "").encode("utf-8")).hexdigest(),
+    )
+
+
 def _validate_kubeconfig_config(config_info: AiK8sKubeConfigConfigs, k8s_id: str) -> None:
     """验证配置合法性"""
     if not config_info:
@@ -97,34 +211,11 @@ def _validate_kubeconfig_config(config_info: AiK8sKubeConfigConfigs, k8s_id: str
         raise ValueError(f"必须提供{k8s_id} kubeconfig_path或kubeconfig内容")
 
 
-def _resolve_kubeconfig_path(config_info: AiK8sKubeConfigConfigs) -> str:
-    """
-    解析kubeconfig文件路径（优先检查已有文件，否则动态生成）
-
-    Returns:
-        str: 最终使用的kubeconfig文件绝对路径
-    """
-    # 情况1: 配置中指定的文件已存在
-    if config_info.kubeconfig_path and os.path.exists(config_info.kubeconfig_path):
-        logger.debug(f"文件已存在：{config_info.kubeconfig_path}")
-        return config_info.kubeconfig_path
-
-    # 情况2: 需要从内容生成文件
+def _load_kubeconfig_dict(config_info: AiK8sKubeConfigConfigs) -> dict:
+    """将数据库中的kubeconfig内容解析为字典"""
     if not config_info.kubeconfig:
         raise FileNotFoundError("无有效的kubeconfig文件或内容")
 
-    # 确保目录存在
-    os.makedirs(KUBECONFIG_DIR_DEFAULT, mode=0o755, exist_ok=True)
-
-    # 生成文件名格式: kubeconfig_{k8s_id}
-    kubeconfig_file_name = f"kubeconfig_{config_info.k8s_id}"
-    config_file = os.path.join(KUBECONFIG_DIR_DEFAULT, kubeconfig_file_name)
-
-    logger.debug(f"config_file：{config_file}")
-    if os.path.exists(config_file):
-        logger.info(f"文件[{config_file}]已存在不再重复生成")
-        return config_file
-
     # 确保输入是字典格式
     if isinstance(config_info.kubeconfig, str):
         try:
@@ -140,17 +231,7 @@ def _resolve_kubeconfig_path(config_info: AiK8sKubeConfigConfigs) -> str:
     # 验证基本结构
     if not all(key in config_data for key in ['apiVersion', 'kind', 'clusters']):
         raise ValueError("无效的kubeconfig格式")
-
-    # 写入文件
-    with open(config_file, 'w') as f:
-        yaml.dump(
-            config_data,
-            f,
-            indent=2,  # 标准2空格缩进
-            default_flow_style=False  # 保持多行格式
-        )
-
-    return config_file
+    return config_data
 
 
 def _resolve_context_name(config_info: AiK8sKubeConfigConfigs) -> Optional[str]:
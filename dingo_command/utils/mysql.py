@@ -46,6 +46,27 @@ class MySqlUtils:
             connection.rollback()
             raise e
 
+    def insert_rows(self, table_name, row_groups, batch_size=500):
+        """
+        一个事务内使用多行INSERT写入数据
+        :param row_groups: {(字段名, ...): [(值, ...), ...]}，同一组数据的字段相同
+        :param batch_size: 每条INSERT语句最多的行数
+        """
+        with self.connect() as connection:
+            try:
+                with connection.cursor() as cursor:
+                    for fields, rows in row_groups.items():
+                        row_placeholder = "(" + ", ".join(["%s"] * len(fields)) + ")"
+                        for start in range(0, len(rows), batch_size):
+                            chunk = rows[start:start + batch_size]
+                            sql = f"INSERT INTO {table_name} ({', '.join(fields)}) VALUES " + ", ".join([row_placeholder] * len(chunk))
+                            cursor.execute(sql, [value for row in chunk for value in row])
+                connection.commit()
+            except Exception as e:
+                print(f"Error inserting data: {e}")
+                connection.rollback()
+                raise e
+
     def insert_one(self, sql, data):
         try:
             # 连接数据库